@@ -0,0 +1,232 @@
+"""
+Admission Control for the Deepfake Detection Backend
+Limits how many predictions a worker runs at once and how many may wait,
+so that under a burst the backend answers the excess in milliseconds instead
+of letting every request's latency grow without bound:
+
+    - at most MAX_IN_FLIGHT requests run inference; the rest wait in a queue
+    - a request that cannot start before its deadline is refused at once,
+      using the measured per-image service time and the images queued
+      ahead of it and still running to predict its wait
+    - a waiting request whose deadline passes is dropped from the queue
+    - two priority classes: 'interactive' (web UI, popup) is always served
+      before 'batch' (page scans), and batch may only fill part of the queue
+
+Refused requests get 503 (interactive) or 429 (batch, i.e. "slow down") with
+a Retry-After header estimated from the current queue.
+
+Clients choose the class with the X-Priority header (default interactive)
+and may shorten their deadline with X-Deadline-Ms. Settings:
+DEEPFAKE_MAX_IN_FLIGHT, DEEPFAKE_MAX_QUEUE, DEEPFAKE_INTERACTIVE_DEADLINE_MS,
+DEEPFAKE_BATCH_DEADLINE_MS.
+
+The queue lives in the worker process, so the worker must accept more
+connections than it runs (gthread workers, see gunicorn.conf.py).
+"""
+
+import os
+import math
+import time
+import threading
+from collections import deque
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PRIORITIES = (INTERACTIVE, BATCH)  # Highest first
+
+
+class Overloaded(Exception):
+    """A request refused by admission control
+
+    Attributes:
+        status: 503 for interactive requests, 429 for batch requests
+        retry_after: Whole seconds the client should wait before retrying
+        reason: 'queue_full', 'deadline_unreachable' or 'deadline_expired'
+    """
+
+    def __init__(self, reason, priority, retry_after):
+        super().__init__(f'Server busy ({reason.replace("_", " ")}), retry in {retry_after}s')
+        self.reason = reason
+        self.status = 429 if priority == BATCH else 503
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ('deadline', 'units', 'event', 'granted')
+
+    def __init__(self, deadline, units):
+        self.deadline = deadline
+        self.units = units
+        self.event = threading.Event()
+        self.granted = False
+
+
+class _Slot:
+    """Held while a request runs; releasing it hands the slot to the next waiter
+
+    `units` is the number of images the request scores (a page-scan batch,
+    TTA views), given to admit() and corrected by the view once it knows
+    better. The service-time average is kept per image and the wait
+    estimates count the images still running.
+    """
+    __slots__ = ('controller', 'start', '_units')
+
+    def __init__(self, controller, units):
+        self.controller = controller
+        self.start = time.monotonic()
+        self._units = units
+
+    @property
+    def units(self):
+        return self._units
+
+    @units.setter
+    def units(self, units):
+        self.controller._resize(self, max(1, units))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+    def release(self):
+        """Give the slot back (for holders that outlive a with block, such as streamed responses)"""
+        self.controller._release(self, time.monotonic() - self.start)
+
+
+class AdmissionController:
+    """
+    Bounded in-flight limit with a deadline-aware priority queue
+
+    Args:
+        max_in_flight: Requests allowed to run at the same time
+        max_queue: Requests allowed to wait
+        batch_queue_share: Fraction of max_queue batch requests may occupy
+        deadlines: Default deadline in seconds per priority class
+        initial_service_time: Service time assumed until one is measured
+    """
+
+    def __init__(self, max_in_flight=1, max_queue=8, batch_queue_share=0.5,
+                 deadlines=None, initial_service_time=0.5):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_limits = {INTERACTIVE: max_queue, BATCH: max(1, int(max_queue * batch_queue_share))}
+        self.deadlines = deadlines or {INTERACTIVE: 2.0, BATCH: 10.0}
+        self.service_time = initial_service_time
+        self.in_flight = 0
+        self.running_units = 0
+        self.waiting = {priority: deque() for priority in PRIORITIES}
+        self.rejected = {reason: 0 for reason in ('queue_full', 'deadline_unreachable', 'deadline_expired')}
+        self._lock = threading.Lock()
+
+    def _queued(self):
+        return sum(len(q) for q in self.waiting.values())
+
+    def _queued_units(self, priorities=PRIORITIES):
+        return sum(waiter.units for p in priorities for waiter in self.waiting[p])
+
+    def _units_ahead_of(self, priority):
+        """Images of the waiters that would be served before a new request of `priority`"""
+        return self._queued_units(PRIORITIES[:PRIORITIES.index(priority) + 1])
+
+    def _retry_after(self):
+        drain = (self._queued_units() + self.running_units) * self.service_time / self.max_in_flight
+        return max(1, math.ceil(drain))
+
+    def _reject(self, reason, priority):
+        self.rejected[reason] += 1
+        return Overloaded(reason, priority, self._retry_after())
+
+    def admit(self, priority=INTERACTIVE, deadline=None, units=1):
+        """
+        Wait for a slot, or refuse the request
+
+        Args:
+            priority: 'interactive' or 'batch'
+            deadline: Seconds the caller will wait at most (default: the class deadline)
+            units: Images the request will score (its share of the wait estimates)
+
+        Returns:
+            A context manager holding the slot until the request is answered
+
+        Raises:
+            Overloaded: if the queue is full, the deadline cannot be met or it expired while waiting
+        """
+        budget = self.deadlines[priority] if deadline is None else min(deadline, self.deadlines[priority])
+        units = max(1, units)
+        with self._lock:
+            if self.in_flight < self.max_in_flight and self._units_ahead_of(priority) == 0:
+                self.in_flight += 1
+                self.running_units += units
+                return _Slot(self, units)
+            if self._queued() >= self.max_queue or len(self.waiting[priority]) >= self.queue_limits[priority]:
+                raise self._reject('queue_full', priority)
+            # Expected wait: the images queued ahead plus those still running, over the slots
+            units_ahead = self._units_ahead_of(priority) + self.running_units
+            expected = units_ahead * self.service_time / self.max_in_flight
+            if expected > budget:
+                raise self._reject('deadline_unreachable', priority)
+            waiter = _Waiter(time.monotonic() + budget, units)
+            self.waiting[priority].append(waiter)
+
+        waiter.event.wait(budget)
+        with self._lock:
+            if waiter.granted:
+                return _Slot(self, units)
+            # Timed out: leave the queue (release() may also have dropped it already)
+            try:
+                self.waiting[priority].remove(waiter)
+            except ValueError:
+                pass
+            raise self._reject('deadline_expired', priority)
+
+    def _resize(self, slot, units):
+        with self._lock:
+            self.running_units += units - slot._units
+            slot._units = units
+
+    def _release(self, slot, elapsed):
+        with self._lock:
+            # Slow-moving per-image average; one outlier should not make every request look unreachable
+            self.service_time = 0.8 * self.service_time + 0.2 * elapsed / slot._units
+            self.running_units -= slot._units
+            now = time.monotonic()
+            for priority in PRIORITIES:
+                queue = self.waiting[priority]
+                while queue:
+                    waiter = queue.popleft()
+                    if waiter.deadline <= now:
+                        waiter.event.set()  # Wakes up ungranted and reports the expiry
+                        continue
+                    # Hand the slot over directly: in_flight stays the same
+                    self.running_units += waiter.units
+                    waiter.granted = True
+                    waiter.event.set()
+                    return
+            self.in_flight -= 1
+
+    def status(self):
+        """Current load, for the model-status endpoint"""
+        with self._lock:
+            return {
+                'in_flight': self.in_flight,
+                'in_flight_images': self.running_units,
+                'max_in_flight': self.max_in_flight,
+                'queued': {priority: len(q) for priority, q in self.waiting.items()},
+                'queued_images': self._queued_units(),
+                'max_queue': self.max_queue,
+                'service_time_ms': round(self.service_time * 1000, 1),
+                'rejected': dict(self.rejected)
+            }
+
+
+def create_admission_from_env():
+    """AdmissionController configured by the DEEPFAKE_* environment variables"""
+    return AdmissionController(
+        max_in_flight=int(os.environ.get('DEEPFAKE_MAX_IN_FLIGHT', 1)),
+        max_queue=int(os.environ.get('DEEPFAKE_MAX_QUEUE', 8)),
+        deadlines={INTERACTIVE: float(os.environ.get('DEEPFAKE_INTERACTIVE_DEADLINE_MS', 2000)) / 1000,
+                   BATCH: float(os.environ.get('DEEPFAKE_BATCH_DEADLINE_MS', 10000)) / 1000}
+    )
@@ -3,16 +3,37 @@ Flask Web Application for Deepfake Detection
 Provides a web interface to upload images and get predictions
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, Response, g, stream_with_context
 from flask_cors import CORS
 import tensorflow as tf
 from tensorflow.keras.models import load_model
 from tensorflow.keras.preprocessing import image
 import numpy as np
 import os
-from PIL import Image
 import io
+import sys
+import json
 import base64
+import uuid
+import time
+import sqlite3
+import functools
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.utils import secure_filename
+
+# Shared helpers live next to the training code
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'model'))
+from runtime_profile import load_runtime_profile, apply_threading
+from metrics import stage, record_prediction, record_error, set_models_loaded, track_requests, metrics_response
+from tracing import create_tracer_from_env
+from guardrails import MAX_UPLOAD_BYTES, MAX_BATCH_IMAGES, InputRejected, open_header, open_raw_rgb, decode_frames
+from admission import PRIORITIES, INTERACTIVE, Overloaded, create_admission_from_env
+from history_store import make_thumbnail, create_history_store_from_env
+from tta import POLICIES, parse_policy, predict_tta
+from patch_inference import FACE_MIN_OVERLAP, select_patches, crop_patches, score_patches, aggregate_scores
+
+# Tuned thread counts (model/autotune.py) must be set before TensorFlow runs its first op
+INFERENCE_SETTINGS = apply_threading(load_runtime_profile(), 'inference')
 
 app = Flask(__name__, 
             template_folder='../frontend/templates',
@@ -21,16 +42,39 @@ app = Flask(__name__,
 # Enable CORS for browser extension
 CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Latency, in-flight and memory metrics for every /api/ request (served at /metrics)
+track_requests(app)
+
+# Per-request traces (stage spans, OTLP/JSON file export) and the slowest-request buffer
+tracer = create_tracer_from_env()
+tracer.init_app(app)
+
+# Bounded in-flight limit and deadline-aware priority queue for predictions
+admission = create_admission_from_env()
+
 # Configuration
 # Uploads handled in frontend static
 UPLOAD_FOLDER = '../frontend/static/uploads' 
 MODEL_PATH = '../model/checkpoints/final_model.keras'
 IMG_WIDTH = 380
 IMG_HEIGHT = 380
+# Test-time augmentation for requests without a 'tta' field (model/tta.py); 'none' is one plain forward pass
+TTA_POLICY = os.environ.get('DEEPFAKE_TTA_POLICY', 'none')
+TTA_VIEWS = parse_policy(TTA_POLICY)
+# Patch mode (mode=patches): native-resolution patches scored per upload, and the scales they are cut at
+PATCH_MAX = int(os.environ.get('DEEPFAKE_PATCH_MAX', 16))
+PATCH_SCALES = tuple(float(s) for s in os.environ.get('DEEPFAKE_PATCH_SCALES', '1.0,0.5').split(','))
+
+# Oversized bodies are refused from the Content-Length header, before they are read
+# (the slack covers the multipart framing around the file)
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES + 64 * 1024
 
 # Create upload folder if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Past analyses with thumbnails (SQLite); also removes uploads that fall out of retention
+history_store = create_history_store_from_env(UPLOAD_FOLDER)
+
 # Global variable to store the model
 model = None
 
@@ -41,6 +85,7 @@ def load_trained_model():
         if os.path.exists(MODEL_PATH):
             print(f"Loading model from {MODEL_PATH}...")
             model = load_model(MODEL_PATH)
+            set_models_loaded(1)
             print("Model loaded successfully!")
             return True
         else:
@@ -50,51 +95,177 @@ def load_trained_model():
         print(f"Error loading model: {e}")
         return False
 
-def preprocess_image(img):
-    """Preprocess image for prediction"""
-    # Resize image
-    img = img.resize((IMG_WIDTH, IMG_HEIGHT))
+def preprocess_image(frames):
+    """Preprocess one or more frames into a single batch for prediction"""
+    # Resize image (uploads the extension already scaled to the input size skip this)
+    with stage('resize'):
+        frames = [img if img.size == (IMG_WIDTH, IMG_HEIGHT) else img.resize((IMG_WIDTH, IMG_HEIGHT))
+                  for img in frames]
     
-    # Convert to array
-    img_array = image.img_to_array(img)
+    with stage('preprocess'):
+        # Convert to array, one row per frame
+        img_array = np.stack([image.img_to_array(img) for img in frames])
+        
+        # Use EfficientNet preprocessing (expects 0-255 inputs)
+        img_array = tf.keras.applications.efficientnet.preprocess_input(img_array)
     
-    # Expand dimensions to match batch size
-    img_array = np.expand_dims(img_array, axis=0)
+    return img_array
+
+def prediction_result(scores, views=None, view_scores=None):
+    """Result dict for one input's per-frame scores; animations get the mean score"""
+    confidence = float(np.mean(scores))
     
-    # Use EfficientNet preprocessing (expects 0-255 inputs)
-    img_array = tf.keras.applications.efficientnet.preprocess_input(img_array)
+    # Determine class (0 = Fake, 1 = Real)
+    if confidence > 0.5:
+        result = "Real"
+        confidence_percent = confidence * 100
+    else:
+        result = "Fake"
+        confidence_percent = (1 - confidence) * 100
     
-    return img_array
+    result = {
+        'class': result,
+        'confidence': round(confidence_percent, 2),
+        'raw_score': round(confidence, 4)
+    }
+    if len(scores) > 1:
+        result['frame_scores'] = [round(float(score), 4) for score in scores]
+    if views is not None and len(views) > 1:
+        # Per-view scores (averaged over the frames) show how much the views agree
+        result['tta'] = {
+            'views': list(views),
+            'view_scores': [round(float(score), 4) for score in np.mean(view_scores, axis=0)]
+        }
+    return result
+
+def predict_batch(frame_lists, views=TTA_VIEWS):
+    """Make predictions for several inputs' frames with a single forward pass, one result per input
 
-def predict_image(img):
-    """Make prediction on image"""
+    With a TTA policy every view of every frame goes into that same forward pass.
+    """
     if model is None:
         return None, "Model not loaded"
     
     try:
-        # Preprocess the image
-        processed_img = preprocess_image(img)
+        # Preprocess every frame of every input into one batch
+        processed_img = preprocess_image([frame for frames in frame_lists for frame in frames])
         
         # Make prediction
-        prediction = model.predict(processed_img, verbose=0)
-        confidence = float(prediction[0][0])
+        with stage('infer'):
+            scores, view_scores = predict_tta(model, processed_img, views)
         
-        # Determine class (0 = Fake, 1 = Real)
-        if confidence > 0.5:
-            result = "Real"
-            confidence_percent = confidence * 100
-        else:
-            result = "Fake"
-            confidence_percent = (1 - confidence) * 100
+        # Split the scores back up by input
+        results, offset = [], 0
+        for frames in frame_lists:
+            results.append(prediction_result(scores[offset:offset + len(frames)], views,
+                                             view_scores[offset:offset + len(frames)]))
+            offset += len(frames)
+        return results, None
+    except Exception as e:
+        return None, str(e)
+
+def predict_image(frames, views=TTA_VIEWS):
+    """Make prediction on an image's frames (one for still images)"""
+    results, error = predict_batch([frames], views)
+    return (results[0] if results else None), error
+
+def predict_image_patches(img):
+    """Make prediction from native-resolution patches of a full-size image (model/patch_inference.py)"""
+    if model is None:
+        return None, "Model not loaded"
+    
+    try:
+        # Faces first, then the most textured patches, at most PATCH_MAX of them
+        with stage('select'):
+            patches = select_patches(img, (IMG_WIDTH, IMG_HEIGHT), PATCH_SCALES, PATCH_MAX)
+        with stage('preprocess'):
+            batch = crop_patches(img, patches, (IMG_WIDTH, IMG_HEIGHT))
+        with stage('infer'):
+            scores = score_patches(model, batch)
+        patch_result = aggregate_scores(scores, patches)
         
-        return {
-            'class': result,
-            'confidence': round(confidence_percent, 2),
-            'raw_score': round(confidence, 4)
-        }, None
+        result = prediction_result([patch_result.score])
+        heatmap = patch_result.heatmap
+        result['patches'] = {
+            'scored': len(patches),
+            'global_score': round(patch_result.global_score, 4),
+            # Fake probability per patch of the finest scored scale (null: not scored)
+            'heatmap': None if heatmap is None else [[None if np.isnan(v) else round(float(v), 3) for v in row]
+                                                     for row in heatmap],
+            'heatmap_scale': patch_result.heatmap_scale,
+            'most_fake': [{'box': patch['box'], 'scale': patch['scale'], 'score': round(patch['score'], 4),
+                           'face': patch['face'] >= FACE_MIN_OVERLAP}
+                          for patch in sorted(patches, key=lambda p: p['score'])[:5]]
+        }
+        return result, None
     except Exception as e:
         return None, str(e)
 
+def request_tta_views():
+    """TTA views for this request: the 'tta' form field or query argument, else DEEPFAKE_TTA_POLICY"""
+    spec = request.values.get('tta')
+    if not spec:
+        return TTA_VIEWS
+    try:
+        return parse_policy(spec)
+    except ValueError as e:
+        raise InputRejected(str(e), 400, 'invalid_tta')
+
+def request_units():
+    """
+    Images a request will score, for admission control: uploads (1, or the
+    'images' of a batch) times TTA views. Reading request.files parses the
+    form, which an overloaded request would have to drain anyway.
+    """
+    images = min(len(request.files.getlist('images')), MAX_BATCH_IMAGES) or 1
+    try:
+        views = len(request_tta_views())
+    except InputRejected:
+        views = 1  # The view reports the bad policy
+    return images * views
+
+def admitted(view):
+    """Run the view only once admission control grants a slot; answer 503/429 + Retry-After otherwise"""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        priority = request.headers.get('X-Priority', INTERACTIVE).lower()
+        if priority not in PRIORITIES:
+            priority = INTERACTIVE
+        try:
+            deadline = float(request.headers['X-Deadline-Ms']) / 1000
+        except (KeyError, ValueError):
+            deadline = None
+        tracer.annotate(**{'admission.priority': priority})
+        try:
+            with stage('queue'):
+                slot = admission.admit(priority, deadline, units=request_units())
+        except Overloaded as e:
+            record_error(e.reason)
+            # Read and drop the upload here: a connection closed with the body unread stalls
+            # gunicorn's accept loop (it lingers to drain it), and the client could not reuse it
+            while request.stream.read(64 * 1024):
+                pass
+            response = jsonify({
+                'success': False,
+                'error': str(e),
+                'retry_after': e.retry_after
+            })
+            return response, e.status, {'Retry-After': str(e.retry_after)}
+        # Views correct g.admission_slot.units once they know the real image count
+        g.admission_slot = slot
+        try:
+            response = view(*args, **kwargs)
+        except BaseException:
+            slot.release()
+            raise
+        if isinstance(response, Response) and response.is_streamed:
+            # A streamed body is computed while it is sent: hold the slot until the response closes
+            response.call_on_close(slot.release)
+        else:
+            slot.release()
+        return response
+    return wrapper
+
 @app.route('/')
 def index():
     """Render main page (Analysis)"""
@@ -117,15 +288,18 @@ def results():
     return render_template('results.html')
 
 @app.route('/api/predict', methods=['POST'])
+@admitted
 def predict():
     """API endpoint for predictions"""
     if model is None:
+        record_error('model_not_loaded')
         return jsonify({
             'success': False,
             'error': 'Model not loaded. Please train the model first.'
         }), 503
     
     if 'image' not in request.files:
+        record_error('no_image')
         return jsonify({
             'success': False,
             'error': 'No image file provided'
@@ -134,68 +308,314 @@ def predict():
     file = request.files['image']
     
     if file.filename == '':
+        record_error('empty_filename')
         return jsonify({
             'success': False,
             'error': 'No file selected'
         }), 400
     
+    started = time.perf_counter()
     try:
-        # Save file (optional but good for results page)
-        filename = file.filename
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(filepath)
+        # Each TTA view is one more image in the forward pass
+        views = request_tta_views()
+        tracer.annotate(**{'tta.views': len(views)})
+        
+        # mode=patches scores native-resolution patches instead of the squashed image (TTA does not apply)
+        mode = request.values.get('mode', 'resize')
+        if mode not in ('resize', 'patches'):
+            raise InputRejected(f"Unknown mode '{mode}' (use 'resize' or 'patches')", 400, 'invalid_mode')
+        
+        with stage('read'):
+            data = file.read()
         
-        # Read for prediction
-        img = Image.open(filepath)
+        # Header-only checks: bad uploads are rejected before any pixel is decoded
+        raw_rgb = request.form.get('encoding') == 'rgb'
+        with stage('validate'):
+            if raw_rgb:
+                img, info = open_raw_rgb(data, request.form.get('width', type=int),
+                                         request.form.get('height', type=int))
+            else:
+                img, info = open_header(data)
+            tracer.annotate(**{'image.format': info.format, 'image.width': info.width,
+                               'image.height': info.height, 'image.frames': info.frames,
+                               'image.bytes': info.bytes})
         
-        # Convert to RGB if necessary
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
+        # Read for prediction (RGB; a few sampled frames for animations; patch mode needs full resolution)
+        with stage('decode'):
+            if mode == 'patches':
+                frames = decode_frames(img, info, (info.width, info.height), max_frames=1)
+            else:
+                frames = decode_frames(img, info, (IMG_WIDTH, IMG_HEIGHT))
         
         # Make prediction
-        result, error = predict_image(img)
+        if mode == 'patches':
+            result, error = predict_image_patches(frames[0])
+            if result:
+                g.admission_slot.units = result['patches']['scored'] + 1
+        else:
+            result, error = predict_image(frames, views)
         
         if error:
+            record_error('inference')
             return jsonify({
                 'success': False,
                 'error': error
             }), 500
+        
+        # Save file for the results page, under a unique name so concurrent uploads never collide,
+        # and record the analysis in the history (raw pixels are not saved; the thumbnail stands in)
+        with stage('save'):
+            base, ext = os.path.splitext(secure_filename(file.filename))
+            filename = f"{base or 'upload'}_{uuid.uuid4().hex[:12]}{ext.lower() or '.img'}"
+            if not raw_rgb:
+                with open(os.path.join(UPLOAD_FOLDER, filename), 'wb') as f:
+                    f.write(data)
+            try:
+                # Raw RGB uploads are not saved, so they take no upload space in the history
+                result['history_id'] = history_store.add(
+                    file.filename, result, info._replace(bytes=0) if raw_rgb else info,
+                    processing_ms=(time.perf_counter() - started) * 1000,
+                    thumbnail=make_thumbnail(frames[0]), upload_name=None if raw_rgb else filename)
+            except sqlite3.Error as e:
+                print(f"⚠️  Could not record analysis in history: {e}")
             
         # Add filename to result
         result['filename'] = filename
         result['image_url'] = f'/static/uploads/{filename}' # Assuming uploads is mapped or we map it
+        if raw_rgb:
+            result['image_url'] = f"/api/history/{result['history_id']}/thumbnail" if 'history_id' in result else None
         
         # We need to make sure 'uploads' is served. 
         # By default Flask static folder is 'static'. 
         # If UPLOAD_FOLDER is 'uploads' (root), we need to move it to 'static/uploads' or add route.
         # Let's verify UPLOAD_FOLDER definition.
         
+        record_prediction(result['class'])
+        with stage('serialize'):
+            response = jsonify({
+                'success': True,
+                'prediction': result
+            })
+        return response
+    
+    except InputRejected as e:
+        record_error(e.error_type)
         return jsonify({
-            'success': True,
-            'prediction': result
-        })
+            'success': False,
+            'error': str(e)
+        }), e.status
     
     except Exception as e:
+        record_error(type(e).__name__)
         return jsonify({
             'success': False,
             'error': f'Error processing image: {str(e)}'
         }), 500
 
+@app.route('/api/predict-batch', methods=['POST'])
+@admitted
+def predict_batch_endpoint():
+    """
+    API endpoint for page scans: several images (form field 'images', repeated) scored in one
+    forward pass. Answers streamed NDJSON, one line per image with its upload index: images
+    rejected by validation are sent at once, the scored ones after the forward pass, in upload
+    order. Results are not recorded in the history.
+    """
+    if model is None:
+        record_error('model_not_loaded')
+        return jsonify({
+            'success': False,
+            'error': 'Model not loaded. Please train the model first.'
+        }), 503
+    
+    files = request.files.getlist('images')
+    if not files:
+        record_error('no_image')
+        return jsonify({
+            'success': False,
+            'error': 'No image files provided'
+        }), 400
+    if len(files) > MAX_BATCH_IMAGES:
+        record_error('too_many_images')
+        return jsonify({
+            'success': False,
+            'error': f'At most {MAX_BATCH_IMAGES} images per batch'
+        }), 413
+    
+    try:
+        views = request_tta_views()
+    except InputRejected as e:
+        record_error(e.error_type)
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), e.status
+    
+    raw_rgb = request.form.get('encoding') == 'rgb'
+    lines = [{'index': index, 'id': file.filename} for index, file in enumerate(files)]
+    decoded = []
+    for line, file in zip(lines, files):
+        # Same checks as /api/predict; a bad image fails its own line, not the batch
+        try:
+            with stage('read'):
+                data = file.read()
+            with stage('validate'):
+                if raw_rgb:
+                    img, info = open_raw_rgb(data, request.form.get('width', type=int),
+                                             request.form.get('height', type=int))
+                else:
+                    img, info = open_header(data)
+            with stage('decode'):
+                decoded.append((line, decode_frames(img, info, (IMG_WIDTH, IMG_HEIGHT))))
+        except InputRejected as e:
+            record_error(e.error_type)
+            line.update(success=False, error=str(e))
+    tracer.annotate(**{'batch.images': len(files), 'batch.rejected': len(files) - len(decoded),
+                       'tta.views': len(views)})
+    
+    @stream_with_context
+    def generate():
+        # Rejected images need no inference: the client can mark them while the rest is scored
+        for line in lines:
+            if 'error' in line:
+                yield json.dumps(line) + '\n'
+        if not decoded:
+            return
+        results, error = predict_batch([frames for _, frames in decoded], views)
+        for index, (line, _) in enumerate(decoded):
+            if error:
+                record_error('inference')
+                line.update(success=False, error=error)
+            else:
+                record_prediction(results[index]['class'])
+                line.update(success=True, prediction=results[index])
+            with stage('serialize'):
+                encoded = json.dumps(line) + '\n'
+            yield encoded
+    
+    return Response(generate(), mimetype='application/x-ndjson')
+
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(e):
+    """JSON answer for bodies over MAX_CONTENT_LENGTH (sent before the body is read)"""
+    record_error('too_large')
+    return jsonify({
+        'success': False,
+        'error': f'File is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB'
+    }), 413
+
+def history_entry_json(entry):
+    """History row as returned by the /api/history endpoints"""
+    entry['class'] = entry.pop('result')
+    upload_name = entry.pop('upload_name')
+    entry['image_url'] = f'/static/uploads/{upload_name}' if upload_name else None
+    entry['thumbnail_url'] = f"/api/history/{entry['id']}/thumbnail"
+    return entry
+
+@app.route('/api/history')
+def history_list():
+    """Past analyses, newest first (?limit=, ?before=<next_before>, ?result=Real|Fake, ?q=filename)"""
+    result = request.args.get('result')
+    search = request.args.get('q', '').strip() or None
+    result = result if result in ('Real', 'Fake') else None
+    entries, next_before = history_store.page(limit=request.args.get('limit', 20, type=int),
+                                              before=request.args.get('before', type=int),
+                                              result=result, search=search)
+    return jsonify({
+        'success': True,
+        'items': [history_entry_json(entry) for entry in entries],
+        'next_before': next_before,
+        'total': history_store.count(result, search)
+    })
+
+@app.route('/api/history/stats')
+def history_stats():
+    """Number of stored analyses, per class, and the bytes they take"""
+    return jsonify({'success': True, **history_store.stats()})
+
+@app.route('/api/history/<int:entry_id>')
+def history_entry(entry_id):
+    """One past analysis"""
+    entry = history_store.get(entry_id)
+    if entry is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    return jsonify({'success': True, 'entry': history_entry_json(entry)})
+
+@app.route('/api/history/<int:entry_id>/thumbnail')
+def history_thumbnail(entry_id):
+    """WebP thumbnail of a past analysis (never changes, so browsers may cache it for good)"""
+    thumbnail = history_store.thumbnail(entry_id)
+    if thumbnail is None:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+    return Response(thumbnail, mimetype='image/webp',
+                    headers={'Cache-Control': 'public, max-age=31536000, immutable'})
+
 @app.route('/api/model-status')
 def model_status():
     """Get model status"""
     return jsonify({
         'loaded': model is not None,
         'model_path': MODEL_PATH,
-        'exists': os.path.exists(MODEL_PATH)
+        'exists': os.path.exists(MODEL_PATH),
+        # Clients that scale images to this size themselves (the extension) skip the server-side resize;
+        # 'stretch' means no aspect-ratio preservation, 'rgb' means raw pixels with width/height fields
+        'input': {
+            'width': IMG_WIDTH,
+            'height': IMG_HEIGHT,
+            'resize': 'stretch',
+            'encodings': ['image', 'rgb']
+        },
+        # Test-time augmentation: applied without a 'tta' field, and the named policies
+        'tta': {
+            'default': TTA_POLICY,
+            'policies': list(POLICIES)
+        },
+        # Patch mode limits (mode=patches)
+        'patches': {
+            'max_patches': PATCH_MAX,
+            'scales': list(PATCH_SCALES)
+        },
+        # Page scans: images per /api/predict-batch request and the size limit of the whole request
+        'batch': {
+            'max_images': MAX_BATCH_IMAGES,
+            'max_bytes': MAX_UPLOAD_BYTES
+        },
+        'admission': admission.status()
     })
 
-if __name__ == '__main__':
-    print("\n" + "="*50)
-    print("Deepfake Detection Web Application")
-    print("="*50)
-    
-# Load the model directly when app starts (for production/Vercel)
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics (per-stage latency, results, errors, in-flight requests, memory)"""
+    body, content_type = metrics_response()
+    if body is None:
+        return "prometheus_client is not installed\n", 501
+    return Response(body, mimetype=content_type)
+
+def admin_allowed():
+    """Admin endpoints need the DEEPFAKE_ADMIN_TOKEN (X-Admin-Token header), or a local client if none is set"""
+    token = os.environ.get('DEEPFAKE_ADMIN_TOKEN')
+    if token:
+        return request.headers.get('X-Admin-Token') == token
+    return request.remote_addr in ('127.0.0.1', '::1')
+
+@app.route('/admin/slow-requests')
+def slow_requests():
+    """Slowest recent requests of this worker, with stage timings and input size (?reset=1 clears them)"""
+    if not admin_allowed():
+        return jsonify({'success': False, 'error': 'Forbidden'}), 403
+    requests_seen = tracer.slow_requests.snapshot()
+    if request.args.get('reset') == '1':
+        tracer.slow_requests.reset()
+    return jsonify({
+        'success': True,
+        'worker_pid': os.getpid(),
+        'capacity': tracer.slow_requests.capacity,
+        'requests': requests_seen
+    })
+
+# Load the model directly when app starts (for production/Vercel).
+# Runs once per process: the development server below does not use the
+# reloader, and gunicorn (serve.py) imports the app once in each worker.
 if load_trained_model():
     print("✓ Model loaded successfully!")
 else:
@@ -207,8 +627,12 @@ if __name__ == '__main__':
     print("Deepfake Detection Web Application")
     print("="*50)
     
-    print("\nStarting web server...")
-    print("Open your browser and navigate to: http://localhost:5001")
+    # Development server only; use serve.py (gunicorn, one worker per core) in production
+    debug = os.environ.get('FLASK_DEBUG') == '1'
+    port = int(os.environ.get('PORT', 5001))
+    print("\nStarting development web server...")
+    print(f"Open your browser and navigate to: http://localhost:{port}")
+    print("For production: python serve.py")
     print("="*50 + "\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5001)
+    app.run(debug=debug, use_reloader=False, host='0.0.0.0', port=port)
@@ -0,0 +1,167 @@
+"""
+Input Guardrails for the Deepfake Detection Backend
+Checks an upload using only its image header (format, dimensions, frame
+count) before any pixel is decoded, so decompression bombs, 100-megapixel
+photos and long animations are turned away in microseconds instead of
+occupying a worker for a full decode and resize:
+
+    - request bodies larger than MAX_UPLOAD_BYTES never reach the handler
+      (Flask answers 413 from the Content-Length header)
+    - unknown formats are rejected with 415, oversized images with 413
+    - JPEGs much larger than the model input are decoded at a reduced DCT
+      scale (1/2, 1/4 or 1/8) instead of at full size
+    - animated GIF/WEBP/PNG uploads are reduced to a few evenly spaced
+      frames, which predict() scores as one batch; frames are sampled only
+      from as far into the animation as FRAME_DECODE_BUDGET pixels reach,
+      because seeking to frame n decodes every frame before it
+    - raw RGB uploads (the extension's pre-scaled pixels) are checked
+      against their declared size and used without any decoding
+
+Limits can be changed with environment variables:
+DEEPFAKE_MAX_UPLOAD_MB, DEEPFAKE_MAX_MEGAPIXELS, DEEPFAKE_MAX_SIDE,
+DEEPFAKE_MAX_FRAMES and DEEPFAKE_MAX_BATCH_IMAGES.
+"""
+
+import io
+import os
+import warnings
+from collections import namedtuple
+
+from PIL import Image
+
+MAX_UPLOAD_BYTES = int(float(os.environ.get('DEEPFAKE_MAX_UPLOAD_MB', 10)) * 1024 * 1024)
+MAX_PIXELS = int(float(os.environ.get('DEEPFAKE_MAX_MEGAPIXELS', 40)) * 1_000_000)
+MAX_SIDE = int(os.environ.get('DEEPFAKE_MAX_SIDE', 10000))
+MAX_FRAMES = int(os.environ.get('DEEPFAKE_MAX_FRAMES', 4))
+# Most pixels decoded while seeking through an animation (MAX_FRAMES frames of the largest allowed size)
+FRAME_DECODE_BUDGET = MAX_PIXELS * MAX_FRAMES
+# Images per /api/predict-batch request (the whole request must still fit in MAX_UPLOAD_BYTES)
+MAX_BATCH_IMAGES = int(os.environ.get('DEEPFAKE_MAX_BATCH_IMAGES', 16))
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF', 'BMP'}
+# ImageInfo.format of raw pixel uploads
+RAW_RGB_FORMAT = 'RGB'
+
+# Pillow refuses (DecompressionBombError) anything above twice this on open
+Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+
+ImageInfo = namedtuple('ImageInfo', ['format', 'width', 'height', 'frames', 'bytes'])
+
+
+class InputRejected(Exception):
+    """An upload that fails validation
+
+    Attributes:
+        status: HTTP status to answer with
+        error_type: Short fixed name for the error metrics
+    """
+
+    def __init__(self, message, status=400, error_type='invalid_image'):
+        super().__init__(message)
+        self.status = status
+        self.error_type = error_type
+
+
+def open_header(data):
+    """
+    Open an upload lazily (Pillow reads the header only) and check it against the limits
+
+    Args:
+        data: Uploaded file bytes
+
+    Returns:
+        (img, ImageInfo): the still-undecoded image and its header facts
+
+    Raises:
+        InputRejected: if the upload is too big, not an image or not an allowed format
+    """
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise InputRejected(f'File is larger than {MAX_UPLOAD_BYTES // (1024 * 1024)} MB', 413, 'too_large')
+    try:
+        with warnings.catch_warnings():
+            # Between 1x and 2x MAX_IMAGE_PIXELS Pillow only warns; the check below rejects those too
+            warnings.simplefilter('ignore', Image.DecompressionBombWarning)
+            img = Image.open(io.BytesIO(data))
+    except Image.DecompressionBombError:
+        raise InputRejected('Image has too many pixels', 413, 'too_many_pixels')
+    except (OSError, SyntaxError, ValueError):
+        raise InputRejected('File is not a readable image', 400, 'invalid_image')
+
+    if img.format not in ALLOWED_FORMATS:
+        raise InputRejected(f'Unsupported image format: {img.format}', 415, 'unsupported_format')
+    width, height = img.size
+    if width < 1 or height < 1:
+        raise InputRejected('Image has no pixels', 400, 'invalid_image')
+    if width > MAX_SIDE or height > MAX_SIDE or width * height > MAX_PIXELS:
+        raise InputRejected(f'Image is too large ({width}x{height}); the limit is {MAX_PIXELS / 1e6:.0f} '
+                            f'megapixels and {MAX_SIDE} pixels per side', 413, 'too_many_pixels')
+
+    frames = getattr(img, 'n_frames', 1) if getattr(img, 'is_animated', False) else 1
+    return img, ImageInfo(img.format, width, height, frames, len(data))
+
+
+def open_raw_rgb(data, width, height):
+    """
+    Wrap raw RGB bytes (row-major, 3 bytes per pixel) as an image, without decoding
+
+    Args:
+        data: Uploaded bytes
+        width, height: Declared dimensions (form fields of the upload)
+
+    Returns:
+        (img, ImageInfo) like open_header()
+
+    Raises:
+        InputRejected: if the dimensions are missing, too large or do not match the byte count
+    """
+    if not width or not height or width < 1 or height < 1:
+        raise InputRejected('Raw RGB uploads need positive width and height fields', 400, 'invalid_image')
+    if width > MAX_SIDE or height > MAX_SIDE or width * height > MAX_PIXELS:
+        raise InputRejected(f'Image is too large ({width}x{height})', 413, 'too_many_pixels')
+    if len(data) != width * height * 3:
+        raise InputRejected(f'Expected {width * height * 3} bytes of RGB data for {width}x{height}, '
+                            f'got {len(data)}', 400, 'invalid_image')
+    img = Image.frombuffer('RGB', (width, height), data, 'raw', 'RGB', 0, 1)
+    return img, ImageInfo(RAW_RGB_FORMAT, width, height, 1, len(data))
+
+
+def decode_frames(img, info, target_size, max_frames=MAX_FRAMES):
+    """
+    Decode the frames to score as RGB images
+
+    Args:
+        img: Image returned by open_header() or open_raw_rgb()
+        info: Its ImageInfo
+        target_size: (width, height) the model needs; large JPEGs are decoded near this size
+        max_frames: Most frames to take from an animation (evenly spaced, first and last
+            reachable frame included; see FRAME_DECODE_BUDGET)
+
+    Returns:
+        List of RGB PIL images (one for still images)
+
+    Raises:
+        InputRejected: if the pixel data turns out to be corrupt
+    """
+    if info.format == RAW_RGB_FORMAT:
+        return [img]
+    if info.frames > 1 and max_frames > 1:
+        # Seeking decodes all earlier frames: stay within the frames the budget can pay for
+        reachable = max(1, min(info.frames, FRAME_DECODE_BUDGET // (info.width * info.height)))
+        count = min(max_frames, reachable)
+        step = (reachable - 1) / max(1, count - 1)
+        indices = sorted({round(i * step) for i in range(count)})
+    else:
+        indices = [0]
+
+    frames = []
+    try:
+        for index in indices:
+            if info.frames > 1:
+                img.seek(index)
+            elif img.format == 'JPEG':
+                # Let libjpeg scale down while decoding; never below the model input size
+                img.draft('RGB', target_size)
+            frame = img.convert('RGB') if img.mode != 'RGB' else img.copy()
+            frames.append(frame)
+    except (OSError, SyntaxError, ValueError, EOFError) as e:
+        raise InputRejected(f'Image data is corrupt: {e}', 400, 'corrupt_image')
+    return frames
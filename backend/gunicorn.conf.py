@@ -0,0 +1,96 @@
+"""
+Gunicorn configuration for the Deepfake Detection backend
+Runs one worker process per core (by default) instead of Flask's
+single-process development server. Each worker loads its own copy of the
+model after the fork (TensorFlow is not fork-safe, so the app is not
+preloaded) and is limited to its share of the cores:
+
+    - TensorFlow's intra-op pool gets cores // workers threads, so N workers
+      never run more compute threads than there are cores
+    - on Linux each worker is pinned to its own block of cores, so workers do
+      not migrate between cores and fight over the same caches
+
+Each worker accepts several connections at once (gthread), but admission.py
+lets only DEEPFAKE_MAX_IN_FLIGHT of them run inference; the others wait in
+its deadline-aware queue or are refused at once with 503/429, instead of
+piling up unseen in the kernel's accept queue.
+
+Every setting can be overridden with an environment variable (serve.py sets
+them from its command-line flags). Workers share their Prometheus metrics
+through PROMETHEUS_MULTIPROC_DIR, so /metrics covers all of them.
+
+Usage:
+    cd backend && gunicorn -c gunicorn.conf.py app:app
+    DEEPFAKE_WORKERS=2 DEEPFAKE_INTRA_OP_THREADS=4 gunicorn -c gunicorn.conf.py app:app
+"""
+
+import os
+import shutil
+import tempfile
+import multiprocessing
+
+
+def available_cores():
+    """Cores this process may run on (respects taskset/cgroup CPU sets on Linux)"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(multiprocessing.cpu_count()))
+
+
+CORES = available_cores()
+
+bind = os.environ.get('DEEPFAKE_BIND', '0.0.0.0:5001')
+# Process per core: one model inference at a time per worker (admission.py queues the rest)
+workers = int(os.environ.get('DEEPFAKE_WORKERS') or 0) or len(CORES)
+worker_class = 'gthread'
+# Connection threads mostly sit in admission.py's queue or answer 503 at once; there must be
+# plenty, since gunicorn queues requests that find no free thread where admission control can't see them
+threads = int(os.environ.get('DEEPFAKE_WORKER_THREADS') or 0) or 64
+# Keep connections open across a Retry-After pause, so a client's retry does not race the close
+keepalive = 30
+intra_op_threads = int(os.environ.get('DEEPFAKE_INTRA_OP_THREADS') or 0) or max(1, len(CORES) // workers)
+pin_cpus = os.environ.get('DEEPFAKE_PIN_CPUS', '1') == '1' and hasattr(os, 'sched_setaffinity')
+
+# Workers share their Prometheus metrics through files in this directory (see metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'deepfake_metrics'))
+
+# Model loading happens while the worker boots and can take a while
+timeout = int(os.environ.get('DEEPFAKE_WORKER_TIMEOUT', 120))
+graceful_timeout = 30
+preload_app = False
+accesslog = '-'
+
+
+def on_starting(server):
+    """Start with empty metrics (files of a previous run would be added in)"""
+    metrics_dir = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(metrics_dir, ignore_errors=True)
+    os.makedirs(metrics_dir, exist_ok=True)
+
+
+def pre_fork(server, worker):
+    """Give the new worker the lowest slot no live worker uses (runs in the master)"""
+    used = {getattr(w, 'cpu_slot', None) for w in server.WORKERS.values()}
+    worker.cpu_slot = next(slot for slot in range(workers + 1) if slot not in used)
+
+
+def post_fork(server, worker):
+    """Limit the worker's TensorFlow threads and pin it to its cores (runs in the worker, before app import)"""
+    os.environ['DEEPFAKE_INTRA_OP_THREADS'] = str(intra_op_threads)
+    os.environ['DEEPFAKE_INTER_OP_THREADS'] = '1'
+    cores = ''
+    if pin_cpus and workers * intra_op_threads <= len(CORES):
+        first = (worker.cpu_slot % workers) * intra_op_threads
+        assigned = CORES[first:first + intra_op_threads]
+        os.sched_setaffinity(0, assigned)
+        cores = f", cores {assigned}"
+    server.log.info(f"Worker {worker.pid} (slot {worker.cpu_slot}): {intra_op_threads} intra-op threads{cores}")
+
+
+def child_exit(server, worker):
+    """Remove a stopped worker's live gauges from the metrics"""
+    try:
+        from prometheus_client import multiprocess
+    except ImportError:
+        return
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,256 @@
+"""
+Analysis History Store for the Deepfake Detection Backend
+Keeps every analysis in one SQLite file: a small WebP thumbnail, the
+prediction, the input's size and format and how long it took. The /history
+page and the /api/history endpoints read from it.
+
+    - Pages are keyset queries on indexed columns (newest first, optionally
+      one result class), so a page costs the same with 100 or 1,000,000 rows
+    - Thumbnails (at most THUMBNAIL_SIZE px, ~2-8 KB) live in the database,
+      in a table of their own so that listing and pruning never read them;
+      the full-size upload stays on disk only while its row exists
+    - Retention by count, bytes (thumbnails + uploads) and age runs every
+      PRUNE_EVERY inserts and deletes the oldest rows and their uploads
+
+The database runs in WAL mode, so gunicorn workers can read while one of
+them writes. Each process uses one connection behind a lock.
+"""
+
+import io
+import os
+import time
+import sqlite3
+import threading
+
+THUMBNAIL_SIZE = 160
+THUMBNAIL_QUALITY = 70
+PRUNE_EVERY = 50
+MAX_PAGE_SIZE = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    filename TEXT NOT NULL,
+    upload_name TEXT,
+    result TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    raw_score REAL NOT NULL,
+    format TEXT,
+    width INTEGER,
+    height INTEGER,
+    frames INTEGER NOT NULL DEFAULT 1,
+    upload_bytes INTEGER NOT NULL DEFAULT 0,
+    processing_ms REAL,
+    thumbnail_bytes INTEGER NOT NULL DEFAULT 0
+);
+-- Blobs in their own table keep analyses rows small, so scans and pruning never read image data
+CREATE TABLE IF NOT EXISTS thumbnails (
+    id INTEGER PRIMARY KEY,
+    data BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_analyses_result_id ON analyses (result, id);
+CREATE INDEX IF NOT EXISTS idx_analyses_created ON analyses (created);
+"""
+
+COLUMNS = ('id', 'created', 'filename', 'upload_name', 'result', 'confidence', 'raw_score', 'format',
+           'width', 'height', 'frames', 'upload_bytes', 'processing_ms')
+
+
+def make_thumbnail(img, size=THUMBNAIL_SIZE, quality=THUMBNAIL_QUALITY):
+    """WebP bytes of `img` scaled to fit in size x size (the image itself is not modified)"""
+    thumb = img.copy()
+    # reducing_gap lets Pillow shrink by whole factors first, much faster on large frames
+    thumb.thumbnail((size, size), reducing_gap=2.0)
+    buffer = io.BytesIO()
+    thumb.save(buffer, format='WEBP', quality=quality, method=4)
+    return buffer.getvalue()
+
+
+class HistoryStore:
+    """
+    SQLite-backed analysis history with retention
+
+    Args:
+        path: Database file (created with its directory if missing)
+        upload_folder: Where the full-size uploads named in `upload_name` are kept
+        max_entries: Most rows to keep
+        max_bytes: Most thumbnail + upload bytes to keep
+        max_age_days: Oldest row to keep, in days
+    """
+
+    def __init__(self, path, upload_folder=None, max_entries=10000, max_bytes=500 * 1024 * 1024,
+                 max_age_days=90):
+        self.path = path
+        self.upload_folder = upload_folder
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            # With WAL, NORMAL only risks the last commits on power loss, never corruption
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+
+    def add(self, filename, prediction, info=None, processing_ms=None, thumbnail=None, upload_name=None):
+        """
+        Record one analysis
+
+        Args:
+            filename: Name the user uploaded
+            prediction: Dict with 'class', 'confidence' and 'raw_score' (as returned by predict_image)
+            info: guardrails.ImageInfo of the upload
+            processing_ms: Time from receiving the request to the prediction
+            thumbnail: WebP bytes from make_thumbnail()
+            upload_name: Name of the saved upload in upload_folder
+
+        Returns:
+            Id of the new entry
+        """
+        row = (time.time(), filename, upload_name, prediction['class'], prediction['confidence'],
+               prediction['raw_score'], info.format if info else None, info.width if info else None,
+               info.height if info else None, info.frames if info else 1, info.bytes if info else 0,
+               processing_ms, len(thumbnail) if thumbnail else 0)
+        with self._lock:
+            with self._db:
+                entry_id = self._db.execute(
+                    'INSERT INTO analyses (created, filename, upload_name, result, confidence, raw_score, format, '
+                    'width, height, frames, upload_bytes, processing_ms, thumbnail_bytes) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row).lastrowid
+                if thumbnail:
+                    self._db.execute('INSERT INTO thumbnails (id, data) VALUES (?, ?)', (entry_id, thumbnail))
+            self._inserts += 1
+            if self._inserts % PRUNE_EVERY == 0:
+                self._prune()
+        return entry_id
+
+    def page(self, limit=20, before=None, result=None, search=None):
+        """
+        One page of entries, newest first
+
+        Args:
+            limit: Entries per page (at most MAX_PAGE_SIZE)
+            before: Only entries with a smaller id (the `next_before` of the previous page)
+            result: Only 'Real' or only 'Fake' entries
+            search: Only entries whose filename contains this text
+
+        Returns:
+            (entries, next_before): next_before is None on the last page
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        where, params = self._filters(result, search)
+        if before is not None:
+            where.append('id < ?')
+            params.append(int(before))
+        sql = f"SELECT {', '.join(COLUMNS)} FROM analyses"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        # One extra row tells whether another page follows
+        sql += ' ORDER BY id DESC LIMIT ?'
+        with self._lock:
+            rows = self._db.execute(sql, params + [limit + 1]).fetchall()
+        entries = [dict(row) for row in rows[:limit]]
+        next_before = entries[-1]['id'] if len(rows) > limit else None
+        return entries, next_before
+
+    def count(self, result=None, search=None):
+        """Number of entries matching the filters of page()"""
+        where, params = self._filters(result, search)
+        sql = 'SELECT COUNT(*) FROM analyses' + (' WHERE ' + ' AND '.join(where) if where else '')
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()[0]
+
+    def get(self, entry_id):
+        """One entry (without the thumbnail), or None"""
+        with self._lock:
+            row = self._db.execute(f"SELECT {', '.join(COLUMNS)} FROM analyses WHERE id = ?",
+                                   (entry_id,)).fetchone()
+        return dict(row) if row else None
+
+    def thumbnail(self, entry_id):
+        """WebP bytes of an entry's thumbnail, or None"""
+        with self._lock:
+            row = self._db.execute('SELECT data FROM thumbnails WHERE id = ?', (entry_id,)).fetchone()
+        return row[0] if row else None
+
+    def stats(self):
+        """Entry count, stored bytes and per-class counts"""
+        with self._lock:
+            total, thumb_bytes, upload_bytes = self._db.execute(
+                'SELECT COUNT(*), COALESCE(SUM(thumbnail_bytes), 0), COALESCE(SUM(upload_bytes), 0) '
+                'FROM analyses').fetchone()
+            by_result = dict(self._db.execute('SELECT result, COUNT(*) FROM analyses GROUP BY result').fetchall())
+        return {'entries': total, 'thumbnail_bytes': thumb_bytes, 'upload_bytes': upload_bytes,
+                'by_result': by_result}
+
+    @staticmethod
+    def _filters(result, search):
+        where, params = [], []
+        if result:
+            where.append('result = ?')
+            params.append(result)
+        if search:
+            where.append("filename LIKE ? ESCAPE '\\'")
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            params.append(f'%{escaped}%')
+        return where, params
+
+    def prune(self):
+        """Apply the retention limits now (also runs every PRUNE_EVERY inserts)"""
+        with self._lock:
+            return self._prune()
+
+    def _prune(self):
+        # Deletes every row up to a boundary id: ids grow with time, so the oldest rows form one id range
+        count, total_bytes = self._db.execute(
+            'SELECT COUNT(*), COALESCE(SUM(thumbnail_bytes + upload_bytes), 0) FROM analyses').fetchone()
+        boundaries = []
+        if count > self.max_entries:
+            boundaries.append(self._db.execute('SELECT id FROM analyses ORDER BY id DESC LIMIT 1 OFFSET ?',
+                                               (self.max_entries,)).fetchone()[0])
+        excess = total_bytes - self.max_bytes
+        if excess > 0:
+            # Walk from the oldest row only as far as needed to free the excess
+            freed = 0
+            for entry_id, size in self._db.execute('SELECT id, thumbnail_bytes + upload_bytes FROM analyses '
+                                                   'ORDER BY id'):
+                freed += size
+                if freed >= excess:
+                    boundaries.append(entry_id)
+                    break
+        cutoff = time.time() - self.max_age_days * 86400
+        expired = self._db.execute('SELECT MAX(id) FROM analyses WHERE created < ?', (cutoff,)).fetchone()[0]
+        if expired is not None:
+            boundaries.append(expired)
+        if not boundaries:
+            return 0
+        boundary = max(boundaries)
+        uploads = [row[0] for row in self._db.execute(
+            'SELECT upload_name FROM analyses WHERE id <= ? AND upload_name IS NOT NULL', (boundary,))]
+        with self._db:
+            removed = self._db.execute('DELETE FROM analyses WHERE id <= ?', (boundary,)).rowcount
+            self._db.execute('DELETE FROM thumbnails WHERE id <= ?', (boundary,))
+        if self.upload_folder:
+            for upload_name in uploads:
+                try:
+                    os.remove(os.path.join(self.upload_folder, upload_name))
+                except OSError:
+                    pass
+        return removed
+
+
+def create_history_store_from_env(upload_folder):
+    """HistoryStore configured by DEEPFAKE_HISTORY_DB and the DEEPFAKE_HISTORY_MAX_* variables"""
+    return HistoryStore(
+        os.environ.get('DEEPFAKE_HISTORY_DB', '../history/history.db'),
+        upload_folder=upload_folder,
+        max_entries=int(os.environ.get('DEEPFAKE_HISTORY_MAX_ENTRIES', 10000)),
+        max_bytes=int(float(os.environ.get('DEEPFAKE_HISTORY_MAX_MB', 500)) * 1024 * 1024),
+        max_age_days=float(os.environ.get('DEEPFAKE_HISTORY_MAX_DAYS', 90))
+    )
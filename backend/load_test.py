@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Load Test for the Deepfake Detection API
+Sends /api/predict requests from a growing number of concurrent clients and
+reports throughput and latency percentiles for each concurrency level. Run
+it against the development server and against serve.py to compare them.
+
+Each client thread has its own HTTP session and sends its next request as
+soon as the previous one answers (closed loop), so the measured latency
+includes queueing inside the server.
+
+Requests refused by admission control (429/503) are counted as SHED, not as
+errors; a shed client waits for the Retry-After the server sent, as the web
+UI and extension do (--ignore-retry-after retries at once). Run levels well
+above the server's capacity to check that p99 of the accepted requests stays
+bounded while the excess is shed.
+
+Usage:
+    python load_test.py
+    python load_test.py --url http://localhost:5001 --concurrency 1 4 16 32 --duration 20
+    python load_test.py --image ../frontend/static/uploads/face.jpg --output load_test.json
+    python load_test.py --concurrency 2 8 32 64 --priority batch
+"""
+
+import io
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from PIL import Image
+
+
+def test_image(path=None, size=380):
+    """JPEG bytes to upload: the given file, or a random-noise image"""
+    if path:
+        with open(path, 'rb') as f:
+            return f.read()
+    pixels = np.random.default_rng(0).integers(0, 256, (size, size, 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=90)
+    return buffer.getvalue()
+
+
+def client(url, image_bytes, deadline, timeout, headers, retry_after=True):
+    """One closed-loop client; returns (latencies of successful requests, shed latencies, error count)"""
+    latencies, shed, errors = [], [], 0
+    with requests.Session() as session:
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                response = session.post(url, files={'image': ('load_test.jpg', image_bytes, 'image/jpeg')},
+                                        headers=headers, timeout=timeout)
+                status = response.status_code
+                ok = status == 200 and response.json().get('success')
+            except (requests.RequestException, ValueError):
+                status, ok = None, False
+            elapsed = time.perf_counter() - start
+            if ok:
+                latencies.append(elapsed)
+            elif status in (429, 503):
+                shed.append(elapsed)
+                if retry_after:
+                    wait = float(response.headers.get('Retry-After', 1))
+                    time.sleep(max(0, min(wait, deadline - time.perf_counter())))
+            else:
+                errors += 1
+    return latencies, shed, errors
+
+
+def run_level(url, image_bytes, concurrency, duration, timeout, headers=None, retry_after=True):
+    """Run `concurrency` clients for `duration` seconds"""
+    start = time.perf_counter()
+    deadline = start + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda _: client(url, image_bytes, deadline, timeout, headers, retry_after),
+                                range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([l for lats, _, _ in results for l in lats]) * 1000
+    shed = np.array([l for _, sheds, _ in results for l in sheds]) * 1000
+    errors = sum(e for _, _, e in results)
+    stats = {'concurrency': concurrency, 'requests': int(len(latencies)), 'shed': int(len(shed)),
+             'errors': errors, 'seconds': elapsed, 'rps': len(latencies) / elapsed}
+    if len(shed):
+        stats['shed_p99_ms'] = float(np.percentile(shed, 99))
+    if len(latencies):
+        stats.update({f'p{q}_ms': float(np.percentile(latencies, q)) for q in (50, 90, 99)})
+        stats['mean_ms'] = float(latencies.mean())
+    return stats
+
+
+def main(args):
+    url = args.url.rstrip('/') + '/api/predict'
+    headers = {'X-Priority': args.priority}
+    retry_after = not args.ignore_retry_after
+    image_bytes = test_image(args.image, args.size)
+
+    status = requests.get(args.url.rstrip('/') + '/api/model-status', timeout=args.timeout).json()
+    if not status.get('loaded'):
+        print("❌ The server has no model loaded; /api/predict would only return errors")
+        return
+
+    print("\n" + "="*87)
+    print(" "*30 + "🔥 API LOAD TEST 🔥")
+    print("="*87)
+    print(f"Endpoint: {url}")
+    print(f"Image: {args.image or f'random {args.size}x{args.size} JPEG'} ({len(image_bytes) / 1024:.0f} KB)")
+    print(f"Duration per level: {args.duration}s | Warm-up: {args.warmup}s | Priority: {args.priority}")
+    print("="*87)
+
+    # Warm-up at the highest concurrency, so every worker has loaded and traced its model
+    run_level(url, image_bytes, max(args.concurrency), args.warmup, args.timeout, headers)
+
+    print(f"\n{'CLIENTS':>7} | {'REQUESTS':>8} | {'REQ/SEC':>8} | {'P50 (ms)':>9} | {'P90 (ms)':>9} | "
+          f"{'P99 (ms)':>9} | {'SHED':>6} | {'ERRORS':>6}")
+    print("-"*87)
+    results = []
+    for concurrency in args.concurrency:
+        stats = run_level(url, image_bytes, concurrency, args.duration, args.timeout, headers, retry_after)
+        results.append(stats)
+        if stats['requests']:
+            print(f"{concurrency:>7} | {stats['requests']:>8} | {stats['rps']:>8.1f} | {stats['p50_ms']:>9.1f} | "
+                  f"{stats['p90_ms']:>9.1f} | {stats['p99_ms']:>9.1f} | {stats['shed']:>6} | {stats['errors']:>6}")
+        else:
+            print(f"{concurrency:>7} | {0:>8} | {0:>8.1f} | {'-':>9} | {'-':>9} | {'-':>9} | "
+                  f"{stats['shed']:>6} | {stats['errors']:>6}")
+    print("="*87 + "\n")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'url': url, 'duration': args.duration, 'levels': results}, f, indent=2)
+        print(f"✓ Results saved to: {args.output}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Measure /api/predict latency and throughput under load')
+    parser.add_argument('--url', type=str, default='http://localhost:5001', help='Server base URL')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8, 16],
+                        help='Concurrent clients per level')
+    parser.add_argument('--duration', type=float, default=15, help='Seconds per concurrency level')
+    parser.add_argument('--warmup', type=float, default=5, help='Warm-up seconds (not measured)')
+    parser.add_argument('--image', type=str, default=None, help='Image to upload (default: random JPEG)')
+    parser.add_argument('--size', type=int, default=380, help='Side of the random image')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds')
+    parser.add_argument('--priority', type=str, default='interactive', choices=['interactive', 'batch'],
+                        help='Admission priority class sent in X-Priority')
+    parser.add_argument('--ignore-retry-after', action='store_true',
+                        help='Retry refused requests at once instead of waiting for Retry-After')
+    parser.add_argument('--output', type=str, default=None, help='Optional JSON file for the results')
+
+    main(parser.parse_args())
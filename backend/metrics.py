@@ -0,0 +1,181 @@
+"""
+Prometheus Metrics for the Deepfake Detection Backend
+Records how long each stage of a prediction takes, how requests end and how
+much memory the workers use, and serves it all at /metrics in the Prometheus
+text format:
+
+    deepfake_stage_seconds{stage}        histogram: queue, read, validate, decode, save, resize,
+                                         preprocess, infer, serialize
+    deepfake_request_seconds{endpoint}   histogram: whole API requests
+    deepfake_predictions_total{result}   counter: Real / Fake answers
+    deepfake_errors_total{type}          counter: failed requests by error type
+    deepfake_requests_in_flight          gauge: requests accepted and not yet answered
+    deepfake_models_loaded               gauge: workers with a model in memory
+    deepfake_resident_memory_bytes       gauge: resident memory of all workers
+
+Recording is a perf_counter() pair and one pre-bound histogram update per
+stage, so it can stay on the hot path. Under gunicorn every worker writes to
+files in PROMETHEUS_MULTIPROC_DIR (set up by gunicorn.conf.py) and /metrics
+adds up all workers, whichever one answers the scrape.
+
+prometheus_client is optional: without it every recording call is a no-op
+and /metrics answers 501.
+"""
+
+import os
+import time
+
+try:
+    from prometheus_client import (Counter, Gauge, Histogram, CollectorRegistry, generate_latest,
+                                   CONTENT_TYPE_LATEST, REGISTRY)
+    from prometheus_client import multiprocess
+except ImportError:
+    Counter = None
+
+STAGES = ('queue', 'read', 'validate', 'decode', 'save', 'resize', 'select', 'preprocess', 'infer', 'serialize')
+# From sub-millisecond (serialize) to seconds (inference on a busy CPU)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+ENABLED = Counter is not None
+
+if ENABLED:
+    STAGE_SECONDS = Histogram('deepfake_stage_seconds', 'Time spent in each prediction pipeline stage',
+                              ['stage'], buckets=LATENCY_BUCKETS)
+    REQUEST_SECONDS = Histogram('deepfake_request_seconds', 'API request latency', ['endpoint'],
+                                buckets=LATENCY_BUCKETS)
+    PREDICTIONS = Counter('deepfake_predictions_total', 'Predictions by result class', ['result'])
+    ERRORS = Counter('deepfake_errors_total', 'Failed requests by error type', ['type'])
+    IN_FLIGHT = Gauge('deepfake_requests_in_flight', 'Requests accepted and not yet answered',
+                      multiprocess_mode='livesum')
+    MODELS_LOADED = Gauge('deepfake_models_loaded', 'Worker processes with a model loaded',
+                          multiprocess_mode='livesum')
+    RESIDENT_MEMORY = Gauge('deepfake_resident_memory_bytes', 'Resident memory of the worker processes',
+                            multiprocess_mode='livesum')
+    # Label lookups are done once here instead of on every observation
+    _STAGE_HISTOGRAMS = {name: STAGE_SECONDS.labels(name) for name in STAGES}
+
+
+# Called as listener(name, start_ns, end_ns) after every stage (tracing.py registers one)
+_stage_listeners = []
+
+
+def add_stage_listener(listener):
+    """Also report every timed stage to `listener(name, start_ns, end_ns)` (wall-clock nanoseconds)"""
+    _stage_listeners.append(listener)
+
+
+class _Stage:
+    """Context manager timing one pipeline stage"""
+    __slots__ = ('name', 'histogram', 'start', 'start_ns')
+
+    def __init__(self, name, histogram):
+        self.name = name
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if self.histogram is not None:
+            self.histogram.observe(elapsed)
+        for listener in _stage_listeners:
+            listener(self.name, self.start_ns, self.start_ns + int(elapsed * 1e9))
+        return False
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def stage(name):
+    """
+    Time a block as one pipeline stage
+
+    Example:
+        with stage('infer'):
+            prediction = model.predict(batch, verbose=0)
+    """
+    if ENABLED:
+        return _Stage(name, _STAGE_HISTOGRAMS[name])
+    return _Stage(name, None) if _stage_listeners else _NO_STAGE
+
+
+def record_prediction(result):
+    """Count one prediction ('Real' or 'Fake')"""
+    if ENABLED:
+        PREDICTIONS.labels(result).inc()
+
+
+def record_error(error_type):
+    """Count one failed request (error_type: short fixed name, e.g. 'no_image')"""
+    if ENABLED:
+        ERRORS.labels(error_type).inc()
+
+
+def set_models_loaded(count):
+    """Number of models this process holds in memory"""
+    if ENABLED:
+        MODELS_LOADED.set(count)
+
+
+def _resident_memory_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        # ru_maxrss is the peak, in KB on Linux and bytes on macOS; good enough as a fallback
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def track_requests(app, prefix='/api/'):
+    """Time every request under `prefix` and keep the in-flight and memory gauges current"""
+    if not ENABLED:
+        return
+    from flask import request, g
+
+    @app.before_request
+    def _start_timer():
+        if request.path.startswith(prefix):
+            g.metrics_start = time.perf_counter()
+            IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def _stop_timer(exc=None):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        IN_FLIGHT.dec()
+        endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_SECONDS.labels(endpoint).observe(time.perf_counter() - start)
+        RESIDENT_MEMORY.set(_resident_memory_bytes())
+
+
+def metrics_response():
+    """
+    Body and content type for the /metrics endpoint
+
+    Returns:
+        (body, content_type), or (None, None) if prometheus_client is not installed
+    """
+    if not ENABLED:
+        return None, None
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Production launcher for the Deepfake Detection backend
+Starts gunicorn with gunicorn.conf.py (one worker process per core, each with
+its own model and its own share of the cores). On systems without gunicorn
+(Windows) it falls back to a single-process server without the debugger or
+reloader, which still loads the model only once.
+
+Usage:
+    python serve.py
+    python serve.py --workers 2 --threads-per-worker 4 --port 8000
+    python serve.py --no-pin
+    python serve.py --max-in-flight 1 --max-queue 4
+"""
+
+import os
+import sys
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def main(args):
+    env = os.environ
+    env['DEEPFAKE_BIND'] = f"{args.host}:{args.port}"
+    if args.workers:
+        env['DEEPFAKE_WORKERS'] = str(args.workers)
+    if args.threads_per_worker:
+        env['DEEPFAKE_INTRA_OP_THREADS'] = str(args.threads_per_worker)
+    env['DEEPFAKE_PIN_CPUS'] = '0' if args.no_pin else '1'
+    env['DEEPFAKE_WORKER_TIMEOUT'] = str(args.timeout)
+    if args.max_in_flight:
+        env['DEEPFAKE_MAX_IN_FLIGHT'] = str(args.max_in_flight)
+    if args.max_queue is not None:
+        env['DEEPFAKE_MAX_QUEUE'] = str(args.max_queue)
+
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        gunicorn = None
+
+    print("\n" + "="*50)
+    print("Deepfake Detection Web Application (production)")
+    print("="*50)
+    print(f"Listening on: http://{args.host}:{args.port}")
+
+    if gunicorn is not None:
+        print("Server: gunicorn (see gunicorn.conf.py)")
+        print("="*50 + "\n")
+        os.execv(sys.executable, [sys.executable, '-m', 'gunicorn', '--chdir', BACKEND_DIR,
+                                  '-c', os.path.join(BACKEND_DIR, 'gunicorn.conf.py'), 'app:app'])
+
+    print("⚠️  gunicorn is not installed (or not available on this OS): single worker process")
+    print("="*50 + "\n")
+    if args.threads_per_worker:
+        env['DEEPFAKE_INTER_OP_THREADS'] = '1'
+    os.chdir(BACKEND_DIR)
+    sys.path.insert(0, BACKEND_DIR)
+    from app import app
+    app.run(host=args.host, port=args.port, debug=False, use_reloader=False, threaded=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run the backend with production settings')
+    parser.add_argument('--host', type=str, default='0.0.0.0', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=5001, help='Port')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes (default: one per core)')
+    parser.add_argument('--threads-per-worker', type=int, default=0,
+                        help='TensorFlow intra-op threads per worker (default: cores / workers)')
+    parser.add_argument('--no-pin', action='store_true', help='Do not pin workers to CPU cores')
+    parser.add_argument('--max-in-flight', type=int, default=0,
+                        help='Predictions each worker runs at once (default: 1)')
+    parser.add_argument('--max-queue', type=int, default=None,
+                        help='Predictions each worker lets wait before refusing more (default: 8)')
+    parser.add_argument('--timeout', type=int, default=120, help='Worker boot/request timeout in seconds')
+
+    main(parser.parse_args())
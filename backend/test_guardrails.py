@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Frame Sampling Check for the Input Guardrails
+Builds small animated GIFs in memory and checks which frames decode_frames()
+samples: every frame of short animations, evenly spaced frames with the first
+and last included for long ones, and only the reachable frames when the
+FRAME_DECODE_BUDGET limits how far an animation may be seeked.
+
+Usage:
+    python -m pytest -q test_guardrails.py
+    python test_guardrails.py
+"""
+
+import io
+
+from PIL import Image
+
+import guardrails
+from guardrails import open_header, decode_frames, MAX_FRAMES
+
+
+def animated_gif(frames, size=(32, 32)):
+    """GIF bytes whose frame i is filled with red value i * 8 (so frames can be told apart)"""
+    images = [Image.new('RGB', size, (i * 8, 0, 0)) for i in range(frames)]
+    buffer = io.BytesIO()
+    images[0].save(buffer, 'GIF', save_all=True, append_images=images[1:])
+    return buffer.getvalue()
+
+
+def sampled_frames(data, max_frames=MAX_FRAMES):
+    img, info = open_header(data)
+    return [frame.getpixel((0, 0))[0] // 8 for frame in decode_frames(img, info, (380, 380), max_frames)]
+
+
+def test_short_animations_keep_every_frame():
+    assert sampled_frames(animated_gif(2), max_frames=4) == [0, 1]
+    assert sampled_frames(animated_gif(3), max_frames=4) == [0, 1, 2]
+
+
+def test_long_animations_are_evenly_sampled():
+    assert sampled_frames(animated_gif(30), max_frames=4) == [0, 10, 19, 29]
+    assert sampled_frames(animated_gif(30), max_frames=1) == [0]
+
+
+def test_budget_limits_seeking():
+    budget = guardrails.FRAME_DECODE_BUDGET
+    try:
+        # Room for 3 frames of 32x32: sample only from frames 0-2
+        guardrails.FRAME_DECODE_BUDGET = 3 * 32 * 32
+        assert sampled_frames(animated_gif(30), max_frames=4) == [0, 1, 2]
+    finally:
+        guardrails.FRAME_DECODE_BUDGET = budget
+
+
+if __name__ == "__main__":
+    for check in (test_short_animations_keep_every_frame, test_long_animations_are_evenly_sampled,
+                  test_budget_limits_seeking):
+        check()
+        print(f"✅ {check.__name__}")
@@ -0,0 +1,262 @@
+"""
+Request Tracing for the Deepfake Detection Backend
+Gives every /api/ request a trace: a root span for the whole request and one
+child span per pipeline stage timed by metrics.stage() (queue, read,
+validate, decode, save, resize, preprocess, infer, serialize). The root span
+carries the input's format, dimensions and byte size, so a slow request
+shows whether the queue, the image, the disk write or the model was to blame.
+
+    - Export: spans are appended to a local file as OTLP/JSON (the
+      OpenTelemetry protocol's JSON encoding), one export request per line.
+      The OpenTelemetry Collector's otlpjsonfile receiver reads these files
+      directly, so traces can go on to Jaeger/Tempo without the OpenTelemetry
+      SDK in the server. Enable with DEEPFAKE_TRACE_FILE=/path/traces.jsonl
+      (DEEPFAKE_TRACE_SAMPLE=0.1 exports one request in ten).
+    - Slow requests: the slowest DEEPFAKE_SLOW_REQUESTS (default 50) requests
+      of each worker are kept, with their stage breakdown and input
+      attributes, in a fixed-size buffer exposed at /admin/slow-requests.
+
+Incoming W3C traceparent headers are continued, and every response carries
+its trace id in X-Trace-Id.
+"""
+
+import os
+import json
+import time
+import heapq
+import random
+import threading
+
+from flask import request, g, has_request_context
+
+from metrics import add_stage_listener
+
+SERVICE_NAME = 'deepfake-backend'
+SCOPE_NAME = 'deepfake.backend'
+# OTLP span kinds
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+
+
+def _new_id(num_bytes):
+    return os.urandom(num_bytes).hex()
+
+
+def _otlp_attribute(key, value):
+    if isinstance(value, bool):
+        encoded = {'boolValue': value}
+    elif isinstance(value, int):
+        encoded = {'intValue': str(value)}
+    elif isinstance(value, float):
+        encoded = {'doubleValue': value}
+    else:
+        encoded = {'stringValue': str(value)}
+    return {'key': key, 'value': encoded}
+
+
+class Span:
+    """One timed operation inside a trace"""
+    __slots__ = ('name', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'kind', 'attributes')
+
+    def __init__(self, name, start_ns, parent_id=None, kind=SPAN_KIND_INTERNAL):
+        self.name = name
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.start_ns = start_ns
+        self.end_ns = None
+        self.kind = kind
+        self.attributes = {}
+
+    def to_otlp(self, trace_id):
+        span = {
+            'traceId': trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [_otlp_attribute(k, v) for k, v in self.attributes.items()]
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class Trace:
+    """Root span of one request plus its stage spans"""
+
+    def __init__(self, name, trace_id=None, parent_id=None):
+        self.trace_id = trace_id or _new_id(16)
+        self.root = Span(name, time.time_ns(), parent_id=parent_id, kind=SPAN_KIND_SERVER)
+        self.spans = []
+
+    def add_span(self, name, start_ns, end_ns):
+        span = Span(name, start_ns, parent_id=self.root.span_id)
+        span.end_ns = end_ns
+        self.spans.append(span)
+
+    def finish(self):
+        self.root.end_ns = time.time_ns()
+
+    @property
+    def duration_ms(self):
+        return (self.root.end_ns - self.root.start_ns) / 1e6
+
+    def summary(self):
+        """Plain-JSON view for the admin endpoint; repeated stages (one per image of a batch) are summed"""
+        stages_ms, stage_counts = {}, {}
+        for s in self.spans:
+            stages_ms[s.name] = stages_ms.get(s.name, 0.0) + (s.end_ns - s.start_ns) / 1e6
+            stage_counts[s.name] = stage_counts.get(s.name, 0) + 1
+        return {
+            'trace_id': self.trace_id,
+            'name': self.root.name,
+            'start': self.root.start_ns / 1e9,
+            'duration_ms': round(self.duration_ms, 2),
+            'attributes': self.root.attributes,
+            'stages_ms': {name: round(ms, 2) for name, ms in stages_ms.items()},
+            'stage_counts': stage_counts
+        }
+
+
+def parse_traceparent(header):
+    """(trace_id, parent_span_id) from a W3C traceparent header, or (None, None)"""
+    parts = (header or '').split('-')
+    if len(parts) == 4 and len(parts[1]) == 32 and len(parts[2]) == 16 and parts[1] != '0' * 32:
+        return parts[1], parts[2]
+    return None, None
+
+
+class FileSpanExporter:
+    """Append traces to a file as OTLP/JSON, one ExportTraceServiceRequest per line"""
+
+    def __init__(self, path, service_name=SERVICE_NAME):
+        self.path = path
+        self.resource = {'attributes': [_otlp_attribute('service.name', service_name),
+                                        _otlp_attribute('process.pid', os.getpid())]}
+        self._lock = threading.Lock()
+        self._file = None
+
+    def export(self, trace):
+        line = json.dumps({'resourceSpans': [{
+            'resource': self.resource,
+            'scopeSpans': [{
+                'scope': {'name': SCOPE_NAME},
+                'spans': [trace.root.to_otlp(trace.trace_id)] + [s.to_otlp(trace.trace_id) for s in trace.spans]
+            }]
+        }]})
+        with self._lock:
+            if self._file is None:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                # Whole-line appends: several gunicorn workers can share one file
+                self._file = open(self.path, 'a', buffering=1)
+            self._file.write(line + '\n')
+
+
+class SlowRequestSampler:
+    """Keep the `capacity` slowest requests seen (a min-heap, so each offer is O(log capacity))"""
+
+    def __init__(self, capacity=50):
+        self.capacity = capacity
+        self._heap = []
+        self._lock = threading.Lock()
+        self._counter = 0
+
+    def offer(self, trace):
+        duration = trace.duration_ms
+        with self._lock:
+            self._counter += 1
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, (duration, self._counter, trace))
+            elif duration > self._heap[0][0]:
+                heapq.heapreplace(self._heap, (duration, self._counter, trace))
+
+    def snapshot(self):
+        """Slowest first"""
+        with self._lock:
+            entries = sorted(self._heap, reverse=True)
+        return [trace.summary() for _, _, trace in entries]
+
+    def reset(self):
+        with self._lock:
+            self._heap = []
+
+
+class RequestTracer:
+    """Flask extension creating a trace for every request under `prefix`"""
+
+    def __init__(self, exporter=None, sample_rate=1.0, slow_capacity=50, prefix='/api/'):
+        self.exporter = exporter
+        self.sample_rate = sample_rate
+        self.slow_requests = SlowRequestSampler(slow_capacity)
+        self.prefix = prefix
+
+    def init_app(self, app):
+        app.before_request(self._start)
+        app.after_request(self._tag_response)
+        app.teardown_request(self._finish)
+        add_stage_listener(self._record_stage)
+
+    def _start(self):
+        if request.path.startswith(self.prefix):
+            trace_id, parent_id = parse_traceparent(request.headers.get('traceparent'))
+            trace = Trace(f"{request.method} {request.path}", trace_id, parent_id)
+            trace.root.attributes.update({'http.method': request.method, 'http.target': request.path,
+                                          'http.request_content_length': request.content_length or 0})
+            g.trace = trace
+
+    def _tag_response(self, response):
+        trace = g.get('trace')
+        if trace is not None:
+            trace.root.attributes['http.status_code'] = response.status_code
+            response.headers['X-Trace-Id'] = trace.trace_id
+            if response.is_streamed:
+                # Stages of a streamed body run after teardown: finish the trace once it is sent
+                g.trace_streamed = True
+                name = self._trace_name()
+                response.call_on_close(lambda: self._complete(trace, name))
+        return response
+
+    def _trace_name(self):
+        if request.url_rule is not None:
+            return f"{request.method} {request.url_rule.rule}"
+        return None
+
+    def _finish(self, exc=None):
+        if g.get('trace_streamed'):
+            return
+        trace = g.pop('trace', None)
+        if trace is not None:
+            self._complete(trace, self._trace_name(), exc)
+
+    def _complete(self, trace, name=None, exc=None):
+        trace.finish()
+        if name is not None:
+            trace.root.name = name
+        if exc is not None:
+            trace.root.attributes['exception.type'] = type(exc).__name__
+        self.slow_requests.offer(trace)
+        if self.exporter is not None and random.random() < self.sample_rate:
+            self.exporter.export(trace)
+
+    def _record_stage(self, name, start_ns, end_ns):
+        if has_request_context():
+            trace = g.get('trace')
+            if trace is not None:
+                trace.add_span(name, start_ns, end_ns)
+
+    def annotate(self, **attributes):
+        """Add attributes to the current request's root span (no-op outside a traced request)"""
+        trace = g.get('trace') if has_request_context() else None
+        if trace is not None:
+            trace.root.attributes.update(attributes)
+
+
+def create_tracer_from_env():
+    """RequestTracer configured by DEEPFAKE_TRACE_FILE, DEEPFAKE_TRACE_SAMPLE and DEEPFAKE_SLOW_REQUESTS"""
+    path = os.environ.get('DEEPFAKE_TRACE_FILE')
+    return RequestTracer(
+        exporter=FileSpanExporter(path) if path else None,
+        sample_rate=float(os.environ.get('DEEPFAKE_TRACE_SAMPLE', 1.0)),
+        slow_capacity=int(os.environ.get('DEEPFAKE_SLOW_REQUESTS', 50))
+    )
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Grayscale Check Benchmark for Dataset Curation
+Compares the original full-resolution grayscale checks (from
+generate_dataset.py and check_colors.py) against the curation module's
+draft-mode colourfulness score, serially and across a process pool, on a
+folder of images. Reports images/sec and how often the new check agrees with
+the original one.
+
+Usage:
+    python benchmark_curation.py dataset/real
+    python benchmark_curation.py dataset/real dataset/fake --workers 8 --limit 2000
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+
+from curation import score_files, score_colorfulness, list_images, GRAYSCALE_THRESHOLD
+
+
+def original_generate_dataset(path):
+    """generate_dataset.is_grayscale() before the curation module"""
+    try:
+        img = Image.open(path)
+        if img.mode == 'L':
+            return True
+        if img.mode == 'RGB':
+            stat = np.array(img)
+            if np.allclose(stat[:,:,0], stat[:,:,1], atol=5) and np.allclose(stat[:,:,1], stat[:,:,2], atol=5):
+                return True
+        return False
+    except Exception:
+        return False
+
+
+def original_check_colors(path):
+    """check_colors.check_colors() per-file test before the curation module"""
+    try:
+        img = Image.open(path)
+        if img.mode == 'L':
+            return True
+        if img.mode == 'RGB':
+            stat = np.array(img)
+            return bool(np.all(stat[:,:,0] == stat[:,:,1]) and np.all(stat[:,:,1] == stat[:,:,2]))
+        return False
+    except Exception:
+        return False
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(args):
+    paths = []
+    for directory in args.directories:
+        paths += list_images(directory)
+    paths = paths[:args.limit] if args.limit else paths
+    if not paths:
+        print("❌ No images found")
+        return
+
+    print("\n" + "="*70)
+    print(" "*18 + "🎨 GRAYSCALE CHECK BENCHMARK 🎨")
+    print("="*70)
+    print(f"Images: {len(paths)} from {', '.join(args.directories)}")
+    print(f"Draft size: {args.max_side}px | Threshold: {args.threshold} | Workers: {args.workers or os.cpu_count()}")
+    print("="*70)
+
+    reference, t_gen = timed(lambda: [original_generate_dataset(p) for p in paths])
+    _, t_check = timed(lambda: [original_check_colors(p) for p in paths])
+    serial, t_serial = timed(lambda: [score_colorfulness(p, args.max_side) for p in paths])
+    parallel, t_parallel = timed(lambda: score_files(paths, workers=args.workers, max_side=args.max_side))
+
+    rows = [
+        ("Original (generate_dataset, allclose)", t_gen),
+        ("Original (check_colors, exact)", t_check),
+        ("Draft + colourfulness (serial)", t_serial),
+        ("Draft + colourfulness (parallel)", t_parallel),
+    ]
+    print(f"\n{'METHOD':<40} | {'TIME (s)':>9} | {'IMAGES/SEC':>11} | {'SPEEDUP':>8}")
+    print("-"*70)
+    for name, seconds in rows:
+        print(f"{name:<40} | {seconds:>9.2f} | {len(paths) / seconds:>11.1f} | {t_gen / seconds:>7.1f}x")
+
+    flagged = [s is not None and s < args.threshold for s in serial]
+    agree = sum(a == b for a, b in zip(flagged, reference))
+    print("-"*70)
+    print(f"Grayscale: original {sum(reference)} | new {sum(flagged)} | "
+          f"agreement {agree / len(paths):.1%} ({len(paths) - agree} differ)")
+    assert [s is None for s in serial] == [s is None for s in parallel]
+    for path, old, new, score in zip(paths, reference, flagged, serial):
+        if old != new and args.show_disagreements:
+            print(f"   {path}: original {'gray' if old else 'color'}, new {'gray' if new else 'color'} "
+                  f"(score {score})")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark grayscale detection for dataset curation')
+    parser.add_argument('directories', nargs='+', help='Image folders')
+    parser.add_argument('--workers', type=int, default=None, help='Processes for the parallel run')
+    parser.add_argument('--max-side', type=int, default=256, help='Draft decode size')
+    parser.add_argument('--threshold', type=float, default=GRAYSCALE_THRESHOLD, help='Colourfulness threshold')
+    parser.add_argument('--limit', type=int, default=0, help='Use at most this many images (0 = all)')
+    parser.add_argument('--show-disagreements', action='store_true', help='List images the methods disagree on')
+
+    main(parser.parse_args())
@@ -1,44 +1,42 @@
 import os
-from PIL import Image
-import numpy as np
+import argparse
 
-def check_colors(directory):
+from curation import score_files, list_images, GRAYSCALE_THRESHOLD
+
+def check_colors(directory, workers=None, threshold=GRAYSCALE_THRESHOLD):
     print(f"Checking images in {directory}...")
-    grayscale_count = 0
-    color_count = 0
-    total = 0
-    
+
     if not os.path.exists(directory):
         print("Directory not found.")
         return
 
-    for filename in os.listdir(directory):
-        if filename.lower().endswith(('.png', '.jpg', '.jpeg')):
-            total += 1
-            path = os.path.join(directory, filename)
-            try:
-                img = Image.open(path)
-                # Check mode
-                if img.mode == 'L':
-                    grayscale_count += 1
-                elif img.mode == 'RGB':
-                    # Sometimes RGB images are actually just gray pixels
-                    stat = np.array(img)
-                    if np.all(stat[:,:,0] == stat[:,:,1]) and np.all(stat[:,:,1] == stat[:,:,2]):
-                        grayscale_count += 1
-                    else:
-                        color_count += 1
-                else:
-                    # RGBA etc
-                    color_count += 1
-            except Exception as e:
-                print(f"Error reading {filename}: {e}")
-    
-    print(f"Total: {total}")
+    paths = list_images(directory)
+    # Decoded at reduced size in parallel; one colourfulness score per image
+    scores = score_files(paths, workers=workers)
+
+    grayscale_count = 0
+    color_count = 0
+    for path, score in zip(paths, scores):
+        if score is None:
+            print(f"Error reading {os.path.basename(path)}")
+        elif score < threshold:
+            grayscale_count += 1
+        else:
+            color_count += 1
+
+    print(f"Total: {len(paths)}")
     print(f"Grayscale (B&W): {grayscale_count}")
     print(f"Color: {color_count}")
 
-print("--- Real Images ---")
-check_colors("dataset/real")
-print("\n--- Fake Images ---")
-check_colors("dataset/fake")
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Count grayscale and colour images')
+    parser.add_argument('directories', nargs='*', default=['dataset/real', 'dataset/fake'],
+                        help='Folders to check (default: dataset/real dataset/fake)')
+    parser.add_argument('--workers', type=int, default=None, help='Decoder processes (default: all cores)')
+    parser.add_argument('--threshold', type=float, default=GRAYSCALE_THRESHOLD,
+                        help='Colourfulness below which an image counts as grayscale')
+    args = parser.parse_args()
+
+    for i, directory in enumerate(args.directories):
+        print(("\n" if i else "") + f"--- {os.path.basename(os.path.normpath(directory)).title()} Images ---")
+        check_colors(directory, workers=args.workers, threshold=args.threshold)
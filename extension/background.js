@@ -11,11 +11,22 @@ chrome.runtime.onInstalled.addListener(() => {
         contexts: ['image']
     });
 
+    chrome.contextMenus.create({
+        id: 'scanPage',
+        title: 'Scan Page for Deepfakes',
+        contexts: ['page']
+    });
+
     console.log('DeepGuard extension installed successfully!');
 });
 
 // Handle context menu clicks
 chrome.contextMenus.onClicked.addListener((info, tab) => {
+    if (info.menuItemId === 'scanPage') {
+        scanPage(tab.id);
+        return;
+    }
+
     if (info.menuItemId === 'checkDeepfake' && info.srcUrl) {
         // Send message to content script to fetch the image
         chrome.tabs.sendMessage(
@@ -69,6 +80,24 @@ chrome.contextMenus.onClicked.addListener((info, tab) => {
     }
 });
 
+/**
+ * Ask the content script to scan every image on the page; it annotates them itself
+ */
+function scanPage(tabId, callback) {
+    chrome.tabs.sendMessage(tabId, { action: 'scanPage' }, (response) => {
+        if (chrome.runtime.lastError) {
+            console.error('Error sending message:', chrome.runtime.lastError);
+            if (callback) callback({ success: false, error: 'Page cannot be scanned' });
+            return;
+        }
+
+        if (response && response.success) {
+            chrome.storage.local.set({ lastScan: { timestamp: Date.now(), ...response.summary } });
+        }
+        if (callback) callback(response);
+    });
+}
+
 // Show notification with result
 function showNotification(result) {
     const isReal = result.class === 'Real';
@@ -88,6 +117,17 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
         return true; // Keep channel open for async response
     }
 
+    if (request.action === 'scanActiveTab') {
+        chrome.tabs.query({ active: true, currentWindow: true }, (tabs) => {
+            if (tabs.length === 0) {
+                sendResponse({ success: false, error: 'No active tab' });
+                return;
+            }
+            scanPage(tabs[0].id, sendResponse);
+        });
+        return true;
+    }
+
     if (request.action === 'clearHistory') {
         chrome.storage.local.set({ history: [] }, () => {
             sendResponse({ success: true });
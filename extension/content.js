@@ -4,6 +4,16 @@
  */
 
 const API_URL = 'http://localhost:5001/api/predict';
+const API_STATUS_URL = 'http://localhost:5001/api/model-status';
+const API_BATCH_URL = 'http://localhost:5001/api/predict-batch';
+
+// Page scan settings
+const SCAN_MIN_SIDE = 100;        // Smallest natural width/height worth checking (skips icons, avatars)
+const SCAN_MIN_RENDERED = 64;     // Smallest displayed width/height (skips hidden and tracking images)
+const SCAN_CONCURRENCY = 4;       // Images fetched and downscaled at the same time
+const SCAN_MAX_RETRIES = 3;       // Attempts per batch the server sheds (429/503 + Retry-After)
+// Used when the backend does not report its batch limits
+const FALLBACK_BATCH_LIMITS = { max_images: 16, max_bytes: 10 * 1024 * 1024 };
 
 // Listen for messages from background script
 chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
@@ -19,6 +29,19 @@ chrome.runtime.onMessage.addListener((request, sender, sendResponse) => {
 
         return true; // Keep channel open for async response
     }
+
+    if (request.action === 'scanPage') {
+        scanPage()
+            .then(summary => {
+                sendResponse({ success: true, summary });
+            })
+            .catch(error => {
+                console.error('Error scanning page:', error);
+                sendResponse({ success: false, error: error.message });
+            });
+
+        return true; // Keep channel open for async response
+    }
 });
 
 /**
@@ -30,9 +53,8 @@ async function analyzeImageFromUrl(imageUrl) {
         const response = await fetch(imageUrl);
         const blob = await response.blob();
 
-        // Create FormData
-        const formData = new FormData();
-        formData.append('image', blob, 'image.png');
+        // Scale to the model input size before uploading (see downscale.js)
+        const formData = await buildUploadForm(blob, 'image.png', API_STATUS_URL);
 
         // Send to API
         const apiResponse = await fetch(API_URL, {
@@ -73,3 +95,212 @@ if (isEnabled) {
         }
     }, true);
 }
+
+/**
+ * Page scan: check every visible image on the page with batched requests
+ *
+ * Images are deduplicated by URL and by a hash of their bytes (the same
+ * picture is often served under several URLs), downscaled in the browser
+ * and sent to /api/predict-batch in batches the server scores with one
+ * forward pass each. Batches go out while later images are still being
+ * prepared, and every image is annotated as soon as its result line arrives.
+ */
+async function scanPage() {
+    clearScanBadges();
+    const groups = collectPageImages();
+    const status = await getModelStatus(API_STATUS_URL);
+    const limits = status.batch || FALLBACK_BATCH_LIMITS;
+    const summary = { images: [...groups.values()].reduce((n, elements) => n + elements.length, 0), duplicates: 0, real: 0, fake: 0, failed: 0 };
+    const byHash = new Map();
+    const queue = [...groups.entries()];
+    let batch = [];
+    let batchBytes = 0;
+    let sending = Promise.resolve();
+
+    const report = (item, line) => {
+        item.line = line;
+        if (line.success) {
+            summary[line.prediction.class === 'Real' ? 'real' : 'fake'] += item.elements.length;
+        } else {
+            summary.failed += item.elements.length;
+        }
+        item.elements.forEach(img => showScanBadge(img, line));
+    };
+    const flush = () => {
+        if (batch.length === 0) return;
+        const items = batch;
+        batch = [];
+        batchBytes = 0;
+        sending = sending.then(() => sendScanBatch(items, line => report(items[line.index], line)));
+    };
+
+    groups.forEach(elements => elements.forEach(img => showScanBadge(img, null)));
+
+    // A few workers fetch and downscale images; full batches are sent right away
+    const worker = async () => {
+        while (queue.length > 0) {
+            const [url, elements] = queue.shift();
+            try {
+                const response = await fetch(url);
+                const blob = await response.blob();
+                const hash = await hashBlob(blob);
+                if (hash && byHash.has(hash)) {
+                    // Same bytes as an image already queued: share its result
+                    const original = byHash.get(hash);
+                    summary.duplicates++;
+                    if (original.line) {
+                        report({ elements }, original.line);
+                    } else {
+                        original.elements.push(...elements);
+                    }
+                    continue;
+                }
+                const item = { upload: null, elements, line: null };
+                if (hash) byHash.set(hash, item);
+                // Raw RGB would make batches 10x larger; page scans always send JPEG
+                const upload = await downscaleForUpload(blob, url.split('/').pop().split('?')[0], API_STATUS_URL,
+                    'jpeg');
+                item.upload = upload;
+                if (batch.length >= limits.max_images || batchBytes + upload.blob.size > limits.max_bytes) {
+                    flush();
+                }
+                batch.push(item);
+                batchBytes += upload.blob.size;
+                if (batch.length >= limits.max_images) flush();
+            } catch (error) {
+                report({ elements }, { success: false, error: 'Image could not be fetched' });
+            }
+        }
+    };
+    await Promise.all(Array.from({ length: SCAN_CONCURRENCY }, worker));
+    flush();
+    await sending;
+    return summary;
+}
+
+/**
+ * Visible images above the size threshold, grouped by URL
+ */
+function collectPageImages() {
+    const groups = new Map();
+    for (const img of document.images) {
+        const url = img.currentSrc || img.src;
+        if (!url || !img.complete || img.naturalWidth < SCAN_MIN_SIDE || img.naturalHeight < SCAN_MIN_SIDE) {
+            continue;
+        }
+        const rect = img.getBoundingClientRect();
+        const style = getComputedStyle(img);
+        if (rect.width < SCAN_MIN_RENDERED || rect.height < SCAN_MIN_RENDERED ||
+            style.visibility === 'hidden' || style.opacity === '0' ||
+            rect.right + window.scrollX < 0 || rect.bottom + window.scrollY < 0) {
+            continue;
+        }
+        if (!groups.has(url)) groups.set(url, []);
+        groups.get(url).push(img);
+    }
+    return groups;
+}
+
+/**
+ * SHA-256 of the image bytes, or null where WebCrypto is unavailable (plain-http pages)
+ */
+async function hashBlob(blob) {
+    if (!window.crypto || !crypto.subtle) return null;
+    const digest = await crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+    return Array.from(new Uint8Array(digest), byte => byte.toString(16).padStart(2, '0')).join('');
+}
+
+/**
+ * Send one batch and call onLine for each NDJSON result line as it arrives
+ */
+async function sendScanBatch(items, onLine) {
+    const formData = new FormData();
+    items.forEach(item => formData.append('images', item.upload.blob, item.upload.filename));
+
+    try {
+        for (let attempt = 1; ; attempt++) {
+            const response = await fetch(API_BATCH_URL, {
+                method: 'POST',
+                headers: { 'X-Priority': 'batch' },
+                body: formData
+            });
+
+            // Shed by admission control: wait as long as the server asks, then try again
+            if ((response.status === 429 || response.status === 503) && attempt < SCAN_MAX_RETRIES) {
+                const retryAfter = parseInt(response.headers.get('Retry-After'), 10) || 1;
+                await response.body.cancel();
+                await new Promise(resolve => setTimeout(resolve, retryAfter * 1000));
+                continue;
+            }
+            if (!response.ok) {
+                const data = await response.json().catch(() => ({}));
+                throw new Error(data.error || `Server answered ${response.status}`);
+            }
+
+            await readNdjson(response, onLine);
+            return;
+        }
+    } catch (error) {
+        items.forEach((item, index) => onLine({ index, success: false, error: error.message }));
+    }
+}
+
+/**
+ * Parse a newline-delimited JSON response line by line while it streams in
+ */
+async function readNdjson(response, onLine) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onLine(JSON.parse(line));
+        }
+        if (done) break;
+    }
+}
+
+// Badges drawn over scanned images
+const scanBadges = new Map();
+
+/**
+ * Show (or update) the badge over an image: pending while line is null, then the result
+ */
+function showScanBadge(img, line) {
+    let badge = scanBadges.get(img);
+    if (!badge) {
+        badge = document.createElement('div');
+        badge.className = 'deepguard-scan-badge';
+        badge.style.cssText = 'position:absolute;z-index:2147483647;padding:3px 8px;border-radius:6px;' +
+            'font:600 12px/1.4 system-ui,sans-serif;color:#fff;pointer-events:none;' +
+            'box-shadow:0 1px 4px rgba(0,0,0,.4)';
+        const rect = img.getBoundingClientRect();
+        badge.style.left = `${rect.left + window.scrollX + 6}px`;
+        badge.style.top = `${rect.top + window.scrollY + 6}px`;
+        document.body.appendChild(badge);
+        scanBadges.set(img, badge);
+    }
+
+    if (!line) {
+        badge.textContent = 'Scanning...';
+        badge.style.background = 'rgba(55, 65, 81, 0.85)';
+    } else if (line.success) {
+        const isReal = line.prediction.class === 'Real';
+        badge.textContent = `${isReal ? '✓ Real' : '⚠ Deepfake'} ${line.prediction.confidence}%`;
+        badge.style.background = isReal ? 'rgba(16, 185, 129, 0.9)' : 'rgba(239, 68, 68, 0.9)';
+    } else {
+        badge.textContent = 'Not checked';
+        badge.style.background = 'rgba(107, 114, 128, 0.85)';
+    }
+}
+
+function clearScanBadges() {
+    scanBadges.forEach(badge => badge.remove());
+    scanBadges.clear();
+}
@@ -0,0 +1,115 @@
+/**
+ * DeepGuard Browser Extension - Client-side Downscaling
+ * Scales images to the model's input resolution (read from /api/model-status)
+ * on an OffscreenCanvas before uploading them. A multi-megabyte photo becomes
+ * a ~40 KB JPEG, and the backend skips its own resize because the image
+ * already has the input size. Shared by content.js and popup.js; the page
+ * scan in content.js uses downscaleForUpload() for every image it batches.
+ */
+
+// 'jpeg' (smallest upload) or 'rgb' (raw pixels: ~430 KB, but the server does not even decode)
+const UPLOAD_ENCODING = 'jpeg';
+const JPEG_QUALITY = 0.92;
+// Used when the backend is too old to report its input size
+const FALLBACK_MODEL_INPUT = { width: 380, height: 380, resize: 'stretch', encodings: ['image'] };
+
+let modelStatusPromise = null;
+
+/**
+ * The backend's /api/model-status answer (fetched once; {} if unreachable)
+ */
+function getModelStatus(statusUrl) {
+    if (!modelStatusPromise) {
+        modelStatusPromise = fetch(statusUrl)
+            .then(response => response.json())
+            .catch(() => {
+                modelStatusPromise = null; // Ask again next time
+                return {};
+            });
+    }
+    return modelStatusPromise;
+}
+
+/**
+ * Input size and accepted encodings of the backend's model
+ */
+async function getModelInput(statusUrl) {
+    const status = await getModelStatus(statusUrl);
+    return status.input || FALLBACK_MODEL_INPUT;
+}
+
+/**
+ * Pack canvas RGBA pixels into tightly packed RGB bytes
+ */
+function rgbaToRgb(rgba) {
+    const rgb = new Uint8Array((rgba.length / 4) * 3);
+    for (let i = 0, j = 0; i < rgba.length; i += 4, j += 3) {
+        rgb[j] = rgba[i];
+        rgb[j + 1] = rgba[i + 1];
+        rgb[j + 2] = rgba[i + 2];
+    }
+    return rgb;
+}
+
+/**
+ * The image scaled to the model input size, ready to upload
+ *
+ * Returns { blob, filename, encoding } where encoding is 'image' (a file the
+ * server decodes) or 'rgb' (raw pixels; then also width and height). Falls
+ * back to the original file for animations (a canvas keeps only the first
+ * frame, the server samples several) and whenever the browser cannot decode
+ * or scale the image itself.
+ */
+async function downscaleForUpload(blob, filename, statusUrl, encoding = UPLOAD_ENCODING) {
+    const original = { blob, filename: filename || 'image', encoding: 'image' };
+    const baseName = (filename || 'image').replace(/\.[^.]*$/, '') || 'image';
+
+    if (typeof OffscreenCanvas === 'undefined' || blob.type === 'image/gif') {
+        return original;
+    }
+
+    try {
+        const input = await getModelInput(statusUrl);
+        // Same stretch-to-size the server would apply (no aspect ratio preservation)
+        const bitmap = await createImageBitmap(blob, {
+            resizeWidth: input.width,
+            resizeHeight: input.height,
+            resizeQuality: 'high'
+        });
+        const canvas = new OffscreenCanvas(input.width, input.height);
+        const ctx = canvas.getContext('2d');
+        ctx.drawImage(bitmap, 0, 0);
+        bitmap.close();
+
+        if (encoding === 'rgb' && input.encodings.includes('rgb')) {
+            const pixels = ctx.getImageData(0, 0, input.width, input.height).data;
+            return {
+                blob: new Blob([rgbaToRgb(pixels)]),
+                filename: `${baseName}.rgb`,
+                encoding: 'rgb',
+                width: input.width,
+                height: input.height
+            };
+        }
+        const jpeg = await canvas.convertToBlob({ type: 'image/jpeg', quality: JPEG_QUALITY });
+        return { blob: jpeg, filename: `${baseName}.jpg`, encoding: 'image' };
+    } catch (error) {
+        console.warn('Client-side downscaling failed, uploading the original:', error);
+        return original;
+    }
+}
+
+/**
+ * Form data for /api/predict with the image scaled to the model input size
+ */
+async function buildUploadForm(blob, filename, statusUrl) {
+    const upload = await downscaleForUpload(blob, filename, statusUrl);
+    const formData = new FormData();
+    formData.append('image', upload.blob, upload.filename);
+    if (upload.encoding === 'rgb') {
+        formData.append('encoding', 'rgb');
+        formData.append('width', upload.width);
+        formData.append('height', upload.height);
+    }
+    return formData;
+}
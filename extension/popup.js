@@ -21,6 +21,7 @@ const newCheckBtn = document.getElementById('newCheckBtn');
 const historyGrid = document.getElementById('historyGrid');
 const clearHistoryBtn = document.getElementById('clearHistoryBtn');
 const apiStatus = document.getElementById('apiStatus');
+const scanPageBtn = document.getElementById('scanPageBtn');
 
 // State
 let selectedFile = null;
@@ -67,6 +68,26 @@ function setupEventListeners() {
 
     newCheckBtn.addEventListener('click', resetToUpload);
     clearHistoryBtn.addEventListener('click', clearHistory);
+    scanPageBtn.addEventListener('click', scanActivePage);
+}
+
+// Scan every image on the current page (the page itself shows the results)
+function scanActivePage() {
+    scanPageBtn.disabled = true;
+    scanPageBtn.textContent = 'Scanning page...';
+
+    chrome.runtime.sendMessage({ action: 'scanActiveTab' }, (response) => {
+        scanPageBtn.disabled = false;
+        if (response && response.success) {
+            const summary = response.summary;
+            scanPageBtn.textContent = summary.images === 0
+                ? 'No images to scan'
+                : `${summary.images} images: ${summary.fake} deepfake, ${summary.real} real`;
+        } else {
+            scanPageBtn.textContent = 'Scan This Page';
+            showError((response && response.error) || 'Page scan failed');
+        }
+    });
 }
 
 // Check API Status
@@ -125,8 +146,8 @@ async function analyzeImage() {
     resultsSection.style.display = 'none';
 
     try {
-        const formData = new FormData();
-        formData.append('image', selectedFile);
+        // Scale to the model input size before uploading (see downscale.js)
+        const formData = await buildUploadForm(selectedFile, selectedFile.name, API_STATUS_URL);
 
         const response = await fetch(API_URL, {
             method: 'POST',
@@ -0,0 +1,125 @@
+/**
+ * DeepGuard - History Page
+ * Loads past analyses from /api/history one page at a time
+ */
+
+const PAGE_SIZE = 10;
+
+const historyBody = document.getElementById('historyBody');
+const pageInfo = document.getElementById('pageInfo');
+const prevBtn = document.getElementById('prevPage');
+const nextBtn = document.getElementById('nextPage');
+const searchInput = document.getElementById('historySearch');
+const resultFilter = document.getElementById('resultFilter');
+
+// Keyset pagination: `before` cursors of the pages visited so far (null = newest page)
+let cursors = [null];
+let nextBefore = null;
+let searchTimer = null;
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function formatDate(seconds) {
+    return new Date(seconds * 1000).toLocaleString(undefined, {
+        month: 'short', day: 'numeric', year: 'numeric', hour: 'numeric', minute: '2-digit'
+    });
+}
+
+function resultBadge(entry) {
+    if (entry.class === 'Fake') {
+        return `<span class="badge badge-fake">${Math.round(entry.confidence)}% Deepfake <i class="fa-solid fa-triangle-exclamation"></i></span>`;
+    }
+    return `<span class="badge badge-real">Genuine <i class="fa-solid fa-circle-check"></i></span>`;
+}
+
+function renderRows(items) {
+    if (!items.length) {
+        historyBody.innerHTML = '<tr><td colspan="7" class="empty-row">No analyses yet</td></tr>';
+        return;
+    }
+    historyBody.innerHTML = items.map(entry => `
+        <tr data-id="${entry.id}">
+            <td><input type="checkbox"></td>
+            <td>
+                <div class="table-thumb">
+                    <img src="${entry.thumbnail_url}" alt="thumb" loading="lazy" width="50" height="50">
+                    ${entry.frames > 1 ? '<i class="fa-solid fa-play play-overlay"></i>' : ''}
+                </div>
+            </td>
+            <td>${escapeHtml(entry.filename)}</td>
+            <td>${formatDate(entry.created)}</td>
+            <td><i class="${entry.frames > 1 ? 'fa-solid fa-film' : 'fa-regular fa-image'} type-icon"></i></td>
+            <td>${resultBadge(entry)}</td>
+            <td><button class="btn-view">View Report</button></td>
+        </tr>`).join('');
+
+    historyBody.querySelectorAll('.btn-view').forEach((button, i) => {
+        button.addEventListener('click', () => openReport(items[i]));
+    });
+}
+
+function openReport(entry) {
+    // Same hand-off as the analysis page (see script.js)
+    sessionStorage.setItem('analysisResult', JSON.stringify(entry));
+    sessionStorage.setItem('analysisImage', entry.image_url || entry.thumbnail_url);
+    sessionStorage.setItem('analysisFilename', entry.filename);
+    window.location.href = '/results';
+}
+
+async function loadPage() {
+    const params = new URLSearchParams({ limit: PAGE_SIZE });
+    const before = cursors[cursors.length - 1];
+    if (before !== null) params.set('before', before);
+    if (resultFilter.value) params.set('result', resultFilter.value);
+    if (searchInput.value.trim()) params.set('q', searchInput.value.trim());
+
+    try {
+        const response = await fetch(`/api/history?${params}`);
+        const data = await response.json();
+        if (!data.success) throw new Error(data.error || 'Could not load history');
+
+        renderRows(data.items);
+        nextBefore = data.next_before;
+
+        const first = (cursors.length - 1) * PAGE_SIZE + (data.items.length ? 1 : 0);
+        const last = (cursors.length - 1) * PAGE_SIZE + data.items.length;
+        pageInfo.textContent = `Showing ${first}-${last} of ${data.total} results`;
+        prevBtn.disabled = cursors.length === 1;
+        nextBtn.disabled = nextBefore === null;
+    } catch (error) {
+        console.error('Error loading history:', error);
+        historyBody.innerHTML = '<tr><td colspan="7" class="empty-row">Could not load history</td></tr>';
+    }
+}
+
+function restart() {
+    cursors = [null];
+    loadPage();
+}
+
+prevBtn.addEventListener('click', () => {
+    if (cursors.length > 1) {
+        cursors.pop();
+        loadPage();
+    }
+});
+
+nextBtn.addEventListener('click', () => {
+    if (nextBefore !== null) {
+        cursors.push(nextBefore);
+        loadPage();
+    }
+});
+
+resultFilter.addEventListener('change', restart);
+
+searchInput.addEventListener('input', () => {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(restart, 250);
+});
+
+loadPage();
@@ -1,10 +1,7 @@
 import os
-import time
-import requests
-from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from PIL import Image
-import numpy as np
+
+from bulk_downloader import download_source
+from curation import is_color_bytes
 
 def create_dirs(base_path="dataset"):
     """Creates the necessary directories for the dataset."""
@@ -14,88 +11,15 @@ def create_dirs(base_path="dataset"):
     os.makedirs(fake_path, exist_ok=True)
     return real_path, fake_path
 
-def is_grayscale(filepath):
-    """Checks if an image is grayscale or effectively grayscale."""
-    try:
-        img = Image.open(filepath)
-        if img.mode == 'L':
-            return True
-        if img.mode == 'RGB':
-            # Check if all channels are equal (R=G=B)
-            stat = np.array(img)
-            # Check a sample of pixels for speed if needed, but for 1024x1024 numpy is fast enough
-            # effective check: if std dev of (R-G) and (G-B) is near 0
-            if np.allclose(stat[:,:,0], stat[:,:,1], atol=5) and np.allclose(stat[:,:,1], stat[:,:,2], atol=5):
-                return True
-        return False
-    except Exception:
-        return False # Assume not grayscale if we can't read it, or handle as error elsewhere
-
-def download_image(url, save_path, retries=3):
-    """Downloads an image from a URL to a specific path."""
-    for i in range(retries):
-        try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                with open(save_path, 'wb') as f:
-                    f.write(response.content)
-                return True
-        except Exception:
-            time.sleep(1)
-    return False
-
-def download_single_fake(i, save_dir):
-    """Helper to download a single fake image."""
-    url = "https://thispersondoesnotexist.com/"
-    filename = f"fake_{int(time.time())}_{i}.jpg"
-    filepath = os.path.join(save_dir, filename)
-    if download_image(url, filepath):
-        return True
-    return False
-
-def download_single_real(i, save_dir):
-    """Helper to download a single real image. Enforces color."""
-    base_url = "https://loremflickr.com/1024/1024/portrait,face,woman,man"
-    filename = f"real_{int(time.time())}_{i}.jpg"
-    filepath = os.path.join(save_dir, filename)
-    
-    max_attempts = 5
-    for attempt in range(max_attempts):
-        # Adding random param
-        url = f"{base_url}?random={i}_{attempt}"
-        if download_image(url, filepath):
-            # Check if grayscale
-            if is_grayscale(filepath):
-                # Delete and try again
-                try:
-                    os.remove(filepath)
-                except:
-                    pass
-                time.sleep(0.5)
-                continue
-            else:
-                return True
-        else:
-            time.sleep(1)
-            
-    return False
-
 def generate_images_concurrently(count, save_dir, type_label):
-    """Downloads images concurrently using ThreadPoolExecutor."""
+    """Downloads `count` new images with the async bulk downloader (rate-limited, deduplicated)."""
     print(f"Downloading {count} {type_label} images...")
-    
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = []
-        if type_label == "FAKE":
-            for i in range(count):
-                futures.append(executor.submit(download_single_fake, i, save_dir))
-        else:
-            for i in range(count):
-                futures.append(executor.submit(download_single_real, i, save_dir))
-        
-        # Use tqdm to show progress as futures complete
-        for _ in tqdm(as_completed(futures), total=count):
-            pass
+    source = 'fake' if type_label == "FAKE" else 'real'
+    # Real photos are sometimes black & white: reject those before they are written
+    accept = is_color_bytes if source == 'real' else None
+    stats = download_source(source, save_dir, count, accept=accept, concurrency=10)
+    print(f"Saved {stats['saved']} | duplicates {stats['duplicate']} | "
+          f"rejected {stats['rejected']} | failed {stats['failed']}")
 
 def main():
     print("Starting Dataset Generation...")
@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Batch-Size and Thread-Count Tuner for Deepfake Detection
+Sweeps TensorFlow intra/inter-op thread counts and batch sizes for a given
+checkpoint on this machine, for training steps and for inference, and writes
+the best settings to the runtime profile read by main_optimized.py,
+setup_and_finetune.py, predict_video.py and the backend.
+
+Every configuration runs in a fresh process: thread pools can only be set
+before TensorFlow starts, and peak memory must be measured in isolation.
+
+Search:
+    1. Thread counts are swept at a reference batch size.
+    2. Batch sizes are swept with the best thread counts, stopping at the
+       memory budget (or the first out-of-memory failure).
+    3. The chosen batch size is the "knee": the smallest batch reaching
+       --knee-fraction of the best throughput. Bigger batches beyond it cost
+       memory and latency for little gain.
+
+Usage:
+    python autotune.py --model checkpoints/final_model.keras
+    python autotune.py --model checkpoints/final_model.keras --mode inference --memory-budget-mb 4000
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import resource
+import argparse
+import subprocess
+from datetime import datetime
+
+from runtime_profile import save_runtime_profile, profile_path
+
+
+def total_memory_mb():
+    """Physical memory of this machine in MB"""
+    try:
+        import psutil
+        return psutil.virtual_memory().total / (1024 * 1024)
+    except ImportError:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') / (1024 * 1024)
+
+
+def default_thread_options(cores):
+    """Intra-op candidates: all cores, then halving; inter-op: 1 and 2"""
+    intra = []
+    n = cores
+    while n >= 1 and len(intra) < 4:
+        intra.append(n)
+        n //= 2
+    return [(i, j) for i in intra for j in (1, 2)]
+
+
+def run_trial(args, mode, batch_size, intra, inter):
+    """
+    Measure one configuration in a child process
+
+    Returns:
+        dict with images_per_sec, ms_per_batch and peak_rss_mb, or None on failure (e.g. OOM)
+    """
+    cmd = [sys.executable, os.path.abspath(__file__), '--model', args.model, '--run-trial', mode,
+           '--trial-batch', str(batch_size), '--trial-intra', str(intra), '--trial-inter', str(inter),
+           '--steps', str(args.steps), '--warmup-steps', str(args.warmup_steps)]
+    try:
+        proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                              timeout=args.trial_timeout)
+    except subprocess.TimeoutExpired:
+        print(f"   ⏳ batch {batch_size}, threads {intra}/{inter}: timed out")
+        return None
+
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT '):
+            result = json.loads(line[len('RESULT '):])
+            print(f"   batch {batch_size:>4}, threads {intra:>3}/{inter}: "
+                  f"{result['images_per_sec']:>8.1f} img/s, {result['ms_per_batch']:>8.1f} ms/batch, "
+                  f"peak {result['peak_rss_mb']:>7.0f} MB")
+            return result
+
+    print(f"   ❌ batch {batch_size}, threads {intra}/{inter}: failed (exit code {proc.returncode})")
+    return None
+
+
+def trial_worker(args):
+    """Body of a trial process: time training steps or inference batches on synthetic data"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(args.trial_intra)
+    tf.config.threading.set_inter_op_parallelism_threads(args.trial_inter)
+
+    import numpy as np
+    from tensorflow.keras.models import load_model
+    from tensorflow.keras.applications.efficientnet import preprocess_input
+
+    model = load_model(args.model)
+    height, width = model.input_shape[1], model.input_shape[2]
+    batch = args.trial_batch
+    images = preprocess_input(np.random.uniform(0, 255, (batch, height, width, 3)).astype(np.float32))
+    labels = np.random.randint(0, 2, (batch, 1)).astype(np.float32)
+
+    if args.run_trial == 'training':
+        # Same trainable setup as fine-tuning: the top layers (except BatchNorm) are trained
+        for layer in model.layers[-20:]:
+            if not isinstance(layer, tf.keras.layers.BatchNormalization):
+                layer.trainable = True
+        model.compile(optimizer='adam', loss=tf.keras.losses.BinaryFocalCrossentropy(gamma=2.0),
+                      metrics=['accuracy'])
+        step = lambda: model.train_on_batch(images, labels)
+    else:
+        step = lambda: model.predict_on_batch(images)
+
+    for _ in range(args.warmup_steps):
+        step()
+    start = time.perf_counter()
+    for _ in range(args.steps):
+        step()
+    elapsed = time.perf_counter() - start
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    print("RESULT " + json.dumps({
+        'images_per_sec': batch * args.steps / elapsed,
+        'ms_per_batch': elapsed / args.steps * 1000,
+        'peak_rss_mb': peak_mb
+    }), flush=True)
+
+
+def pick_knee(trials, knee_fraction):
+    """Smallest batch size whose throughput reaches knee_fraction of the best"""
+    best = max(t['images_per_sec'] for t in trials)
+    for t in sorted(trials, key=lambda t: t['batch_size']):
+        if t['images_per_sec'] >= knee_fraction * best:
+            return t
+    return max(trials, key=lambda t: t['images_per_sec'])
+
+
+def tune_mode(args, mode, budget_mb):
+    """
+    Tune one mode ('training' or 'inference')
+
+    Returns:
+        (chosen settings dict or None, list of all trials)
+    """
+    print(f"\n▶ Tuning {mode}")
+    trials = []
+
+    # 1. Thread counts at the reference batch size
+    reference_batch = args.reference_batch or (8 if mode == 'training' else 16)
+    print(f"  Thread sweep at batch {reference_batch}:")
+    best_threads = None
+    for intra, inter in args.thread_options:
+        result = run_trial(args, mode, reference_batch, intra, inter)
+        if result is None or result['peak_rss_mb'] > budget_mb:
+            continue
+        result.update(mode=mode, batch_size=reference_batch, intra_op_threads=intra, inter_op_threads=inter)
+        trials.append(result)
+        if best_threads is None or result['images_per_sec'] > best_threads['images_per_sec']:
+            best_threads = result
+    if best_threads is None:
+        print(f"  ❌ No thread configuration fit in {budget_mb:.0f} MB")
+        return None, trials
+
+    intra, inter = best_threads['intra_op_threads'], best_threads['inter_op_threads']
+
+    # 2. Batch sizes with the best threads, stopping at the memory budget
+    print(f"  Batch sweep with threads {intra}/{inter}:")
+    batch_trials = [best_threads]
+    for batch_size in args.batch_sizes:
+        if batch_size == reference_batch:
+            continue
+        result = run_trial(args, mode, batch_size, intra, inter)
+        if result is None:
+            break  # most likely out of memory: larger batches will fail too
+        result.update(mode=mode, batch_size=batch_size, intra_op_threads=intra, inter_op_threads=inter)
+        trials.append(result)
+        if result['peak_rss_mb'] > budget_mb:
+            print(f"   ↳ over the {budget_mb:.0f} MB budget, stopping")
+            break
+        batch_trials.append(result)
+
+    # 3. Knee of the throughput curve
+    knee = pick_knee(batch_trials, args.knee_fraction)
+    chosen = {key: knee[key] for key in ('batch_size', 'intra_op_threads', 'inter_op_threads',
+                                         'images_per_sec', 'ms_per_batch', 'peak_rss_mb')}
+    return chosen, trials
+
+
+def main(args):
+    cores = os.cpu_count() or 1
+    budget_mb = args.memory_budget_mb or 0.8 * total_memory_mb()
+    args.thread_options = ([(i, j) for i in args.intra_op for j in args.inter_op]
+                           if args.intra_op else default_thread_options(cores))
+    modes = ['training', 'inference'] if args.mode == 'both' else [args.mode]
+
+    print("\n" + "="*70)
+    print(" "*20 + "⚙️  RUNTIME AUTOTUNER ⚙️")
+    print("="*70)
+    print(f"Machine: {socket.gethostname()} ({cores} cores, {total_memory_mb():.0f} MB RAM)")
+    print(f"Model: {args.model}")
+    print(f"Memory budget: {budget_mb:.0f} MB | Knee: {args.knee_fraction:.0%} of best throughput")
+    print(f"Batch sizes: {args.batch_sizes}")
+    print(f"Thread options (intra/inter): {', '.join(f'{i}/{j}' for i, j in args.thread_options)}")
+    print("="*70)
+
+    profile = {
+        'model': os.path.abspath(args.model),
+        'generated': datetime.now().isoformat(timespec='seconds'),
+        'cpu_count': cores,
+        'memory_budget_mb': round(budget_mb),
+        'trials': []
+    }
+    for mode in modes:
+        chosen, trials = tune_mode(args, mode, budget_mb)
+        profile['trials'].extend(trials)
+        if chosen:
+            profile[mode] = chosen
+
+    print("\n" + "="*70)
+    for mode in modes:
+        chosen = profile.get(mode)
+        if chosen:
+            print(f"{mode.upper():<10} batch {chosen['batch_size']:>4} | threads {chosen['intra_op_threads']}/"
+                  f"{chosen['inter_op_threads']} | {chosen['images_per_sec']:.1f} img/s | "
+                  f"peak {chosen['peak_rss_mb']:.0f} MB")
+        else:
+            print(f"{mode.upper():<10} no setting found")
+    print("="*70)
+
+    if any(mode in profile for mode in modes):
+        output = args.output or profile_path()
+        save_runtime_profile(profile, output)
+        print(f"\n✓ Runtime profile saved to: {output}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Tune batch size and TensorFlow threads for this machine')
+    parser.add_argument('--model', type=str, required=True, help='Checkpoint to tune for (.keras)')
+    parser.add_argument('--mode', choices=['training', 'inference', 'both'], default='both',
+                        help='What to tune (default: both)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 2, 4, 8, 16, 24, 32, 48, 64],
+                        help='Batch sizes to sweep (ascending)')
+    parser.add_argument('--reference-batch', type=int, default=None,
+                        help='Batch size for the thread sweep (default: 8 training, 16 inference)')
+    parser.add_argument('--intra-op', type=int, nargs='+', default=None,
+                        help='Intra-op thread counts to try (default: cores, cores/2, ...)')
+    parser.add_argument('--inter-op', type=int, nargs='+', default=[1, 2],
+                        help='Inter-op thread counts to try with --intra-op')
+    parser.add_argument('--memory-budget-mb', type=float, default=None,
+                        help='Peak RSS limit per process (default: 80%% of RAM)')
+    parser.add_argument('--knee-fraction', type=float, default=0.95,
+                        help='Pick the smallest batch reaching this share of the best throughput')
+    parser.add_argument('--steps', type=int, default=5, help='Timed steps per trial')
+    parser.add_argument('--warmup-steps', type=int, default=2, help='Untimed steps per trial')
+    parser.add_argument('--trial-timeout', type=int, default=900, help='Seconds before a trial is abandoned')
+    parser.add_argument('--output', type=str, default=None, help='Profile file (default: runtime profile path)')
+
+    parser.add_argument('--run-trial', choices=['training', 'inference'], default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--trial-batch', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--trial-intra', type=int, default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--trial-inter', type=int, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.run_trial:
+        trial_worker(args)
+    else:
+        main(args)
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+"""
+Offline Batch Scoring for Deepfake Detection
+Streams a directory tree or a CSV/Parquet manifest of image paths through
+parallel decoding and batched inference, writing results incrementally.
+
+Usage:
+    # Score every image under a directory tree
+    python batch_score.py --input /data/images --output scores.csv
+
+    # Score the paths listed in a manifest (resumes automatically after a crash)
+    python batch_score.py --manifest paths.parquet --column path --output scores.parquet
+"""
+
+import os
+import csv
+import json
+import time
+import argparse
+import itertools
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.bmp')
+
+RESULT_COLUMNS = ['path', 'prediction', 'confidence', 'raw_score', 'error']
+
+DecodedBatch = namedtuple('DecodedBatch', ['paths', 'images', 'ok', 'errors'])
+
+
+# ==================== Input Sources ====================
+
+def iter_directory(root, extensions=IMAGE_EXTENSIONS):
+    """
+    Walk a directory tree and yield image paths in a stable order
+
+    Entries are sorted per directory so that the n-th yielded path is the same
+    on every run, which is what lets a resumed run skip what it already scored.
+
+    Args:
+        root: Directory to walk
+        extensions: Lower-case file extensions to keep
+
+    Yields:
+        Absolute image paths
+    """
+    stack = [os.path.abspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError as e:
+            print(f"⚠ Skipping unreadable directory {directory}: {e}")
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                yield entry.path
+        # Reversed so the stack pops sub-directories in sorted order
+        stack.extend(reversed(subdirs))
+
+
+def iter_manifest(manifest_path, column='path'):
+    """
+    Stream image paths from a CSV or Parquet manifest
+
+    Relative paths are resolved against the manifest's directory.
+
+    Args:
+        manifest_path: Path to a .csv or .parquet file
+        column: Name of the column holding image paths
+
+    Yields:
+        Image paths
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    def resolve(p):
+        return p if os.path.isabs(p) else os.path.join(base_dir, p)
+
+    if manifest_path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        parquet_file = pq.ParquetFile(manifest_path)
+        for record_batch in parquet_file.iter_batches(batch_size=65536, columns=[column]):
+            for p in record_batch.column(0).to_pylist():
+                if p:
+                    yield resolve(p)
+    else:
+        with open(manifest_path, newline='') as f:
+            reader = csv.DictReader(f)
+            if column not in (reader.fieldnames or []):
+                raise ValueError(f"Column '{column}' not found in {manifest_path}. "
+                                 f"Available: {reader.fieldnames}")
+            for row in reader:
+                p = row[column]
+                if p:
+                    yield resolve(p)
+
+
+def count_manifest_rows(manifest_path):
+    """Return the row count of a Parquet manifest from its footer, or None for CSV"""
+    if manifest_path.lower().endswith('.parquet'):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(manifest_path).metadata.num_rows
+    return None
+
+
+# ==================== Parallel Decoding ====================
+
+def decode_image(path, img_width, img_height, draft=True):
+    """
+    Decode an image file into an RGB uint8 array at the model resolution
+
+    Args:
+        path: Path to the image
+        img_width: Target width
+        img_height: Target height
+        draft: Let the JPEG decoder downscale in the DCT domain before resizing.
+            Much faster for large photos, at the cost of tiny pixel differences
+            compared to a full decode.
+
+    Returns:
+        numpy array of shape (img_height, img_width, 3)
+    """
+    return decode_image_sizes(path, [(img_width, img_height)], draft)[0]
+
+
+def decode_image_sizes(path, sizes, draft=True):
+    """
+    Decode an image file once and resize it to several resolutions
+
+    Args:
+        path: Path to the image
+        sizes: List of (width, height) targets
+        draft: Use JPEG draft-mode decoding, bounded by the largest target
+
+    Returns:
+        List of uint8 arrays, one per entry in `sizes`
+    """
+    with Image.open(path) as img:
+        if draft:
+            img.draft('RGB', (max(w for w, _ in sizes), max(h for _, h in sizes)))
+        img = img.convert('RGB')
+        return [np.asarray(img if img.size == tuple(size) else img.resize(tuple(size)), dtype=np.uint8)
+                for size in sizes]
+
+
+def _safe_decode(path, sizes, draft):
+    try:
+        return decode_image_sizes(path, sizes, draft), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _chunked(iterable, size):
+    it = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_multi_resolution_batches(paths, sizes, batch_size=64, workers=None,
+                                  prefetch_batches=2, draft=True):
+    """
+    Decode image paths in parallel and yield batches at one or more resolutions
+
+    Every file is decoded once and resized to each entry in `sizes`. Up to
+    `prefetch_batches` batches are decoded ahead of the consumer, so decoding
+    overlaps with inference while memory stays bounded.
+
+    Args:
+        paths: Iterable of image paths
+        sizes: List of (width, height) targets
+        batch_size: Images per batch
+        workers: Number of decode threads (default: CPU count)
+        prefetch_batches: Number of batches decoded ahead of the consumer
+        draft: Use JPEG draft-mode decoding (see decode_image)
+
+    Yields:
+        DecodedBatch(paths, images, ok, errors) where `images` is a list with one
+        array per size holding only the successfully decoded files, and `ok` is
+        a boolean mask over `paths`
+    """
+    workers = workers or os.cpu_count() or 4
+    sizes = [tuple(s) for s in sizes]
+
+    def collect(chunk, futures):
+        results = [f.result() for f in futures]
+        ok = np.array([arrays is not None for arrays, _ in results], dtype=bool)
+        images = []
+        for i, (w, h) in enumerate(sizes):
+            if ok.any():
+                images.append(np.stack([arrays[i] for arrays, _ in results if arrays is not None]))
+            else:
+                images.append(np.empty((0, h, w, 3), dtype=np.uint8))
+        errors = [err for _, err in results]
+        return DecodedBatch(chunk, images, ok, errors)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for chunk in _chunked(paths, batch_size):
+            futures = [pool.submit(_safe_decode, p, sizes, draft) for p in chunk]
+            pending.append((chunk, futures))
+            if len(pending) > prefetch_batches:
+                yield collect(*pending.popleft())
+        while pending:
+            yield collect(*pending.popleft())
+
+
+def iter_decoded_batches(paths, img_width, img_height, batch_size=64, workers=None,
+                         prefetch_batches=2, draft=True):
+    """
+    Decode image paths in parallel and yield them as model-ready batches
+
+    Single-resolution form of iter_multi_resolution_batches: `images` is one
+    uint8 array of shape (N_ok, img_height, img_width, 3).
+    """
+    for batch in iter_multi_resolution_batches(paths, [(img_width, img_height)], batch_size=batch_size,
+                                               workers=workers, prefetch_batches=prefetch_batches,
+                                               draft=draft):
+        yield batch._replace(images=batch.images[0])
+
+
+def score_batch(model, images):
+    """
+    Run a single batched forward pass
+
+    Args:
+        model: Loaded Keras model
+        images: uint8 array of shape (N, H, W, 3)
+
+    Returns:
+        float32 array of N "Real" probabilities (Fake=0, Real=1)
+    """
+    from tensorflow.keras.applications.efficientnet import preprocess_input
+
+    if len(images) == 0:
+        return np.empty((0,), dtype=np.float32)
+    batch = preprocess_input(images.astype(np.float32))
+    return np.asarray(model.predict_on_batch(batch), dtype=np.float32).reshape(-1)
+
+
+# ==================== Result Writers & Progress State ====================
+
+def _atomic_write_json(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class CsvResultWriter:
+    """Append-only CSV writer that can roll back to the last checkpointed offset"""
+
+    def __init__(self, path, resume_offset=None):
+        self.path = path
+        exists = os.path.exists(path)
+        if resume_offset is not None and exists:
+            # Drop rows written after the last checkpoint (they will be rescored)
+            with open(path, 'r+b') as f:
+                f.truncate(resume_offset)
+        elif exists:
+            os.remove(path)
+        self._file = open(path, 'a', newline='')
+        self._writer = csv.writer(self._file)
+        if self._file.tell() == 0:
+            self._writer.writerow(RESULT_COLUMNS)
+
+    def write_rows(self, rows):
+        self._writer.writerows([[row[c] for c in RESULT_COLUMNS] for row in rows])
+
+    def flush(self):
+        """Flush to disk and return the state needed to resume from here"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'output_offset': self._file.tell()}
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetResultWriter:
+    """Writes one Parquet part file per flush into an output directory"""
+
+    def __init__(self, directory, resume_parts=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        self._pa = pa
+        self._pq = pq
+        # One explicit schema for every part; inferred types differ between parts (an all-None
+        # `error` column becomes null-typed) and the directory could no longer be read as one dataset
+        self._schema = pa.schema([
+            ('path', pa.string()),
+            ('prediction', pa.string()),
+            ('confidence', pa.float64()),
+            ('raw_score', pa.float64()),
+            ('error', pa.string()),
+        ])
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.parts = resume_parts or 0
+        # Remove parts written after the last checkpoint (or all parts on a fresh run)
+        for name in os.listdir(directory):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                if int(name[5:-8]) >= self.parts:
+                    os.remove(os.path.join(directory, name))
+        self._rows = []
+
+    def write_rows(self, rows):
+        self._rows.extend(rows)
+
+    def flush(self):
+        if self._rows:
+            table = self._pa.Table.from_pydict({c: [r[c] for r in self._rows] for c in RESULT_COLUMNS},
+                                               schema=self._schema)
+            part_path = os.path.join(self.directory, f"part-{self.parts:06d}.parquet")
+            self._pq.write_table(table, part_path + '.tmp')
+            os.replace(part_path + '.tmp', part_path)
+            self.parts += 1
+            self._rows = []
+        return {'output_parts': self.parts}
+
+    def close(self):
+        self.flush()
+
+
+def create_writer(output_path, state=None):
+    """Pick a result writer from the output path (.parquet directory or .csv file)"""
+    state = state or {}
+    if output_path.lower().endswith('.parquet'):
+        return ParquetResultWriter(output_path, state.get('output_parts'))
+    return CsvResultWriter(output_path, state.get('output_offset'))
+
+
+def load_state(state_path, source_id):
+    """Load a previous progress checkpoint if it belongs to the same input"""
+    if not os.path.exists(state_path):
+        return None
+    with open(state_path) as f:
+        state = json.load(f)
+    if state.get('source') != source_id:
+        raise ValueError(f"State file {state_path} was written for '{state.get('source')}', "
+                         f"not '{source_id}'. Use --restart to start over.")
+    return state
+
+
+def _format_result(path, score, error):
+    if error is not None:
+        return {'path': path, 'prediction': None, 'confidence': None, 'raw_score': None, 'error': error}
+    is_real = score > 0.5
+    return {
+        'path': path,
+        'prediction': 'Real' if is_real else 'Fake',
+        'confidence': round(float(score if is_real else 1 - score) * 100, 2),
+        'raw_score': round(float(score), 4),
+        'error': None
+    }
+
+
+# ==================== Scoring Loop ====================
+
+def run_batch_scoring(model, paths, output_path, source_id, state_path=None, total=None,
+                      batch_size=64, workers=None, flush_every=20, report_every=10.0,
+                      restart=False, draft=True):
+    """
+    Score a stream of image paths and write the results incrementally
+
+    Progress is checkpointed after every `flush_every` batches. The checkpoint
+    records how many input paths were consumed and how far the output got, so
+    a crashed run continues from the last checkpoint without duplicate rows.
+
+    Args:
+        model: Loaded Keras model
+        paths: Iterable of image paths in a stable order
+        output_path: .csv file or .parquet directory for the results
+        source_id: Identifier of the input (used to validate the state file)
+        state_path: Progress checkpoint path (default: <output_path>.state.json)
+        total: Total number of paths if known (for ETA reporting)
+        batch_size: Images per forward pass
+        workers: Number of decode threads
+        flush_every: Batches between durable checkpoints
+        report_every: Seconds between throughput reports
+        restart: Ignore any existing checkpoint and start from scratch
+        draft: Use JPEG draft-mode decoding
+
+    Returns:
+        dict with the number of images scored, errors and throughput
+    """
+    img_height, img_width = model.input_shape[1], model.input_shape[2]
+    state_path = state_path or output_path.rstrip(os.sep) + '.state.json'
+
+    state = None if restart else load_state(state_path, source_id)
+    if state:
+        print(f"🔁 Resuming after {state['consumed']:,} already scored images")
+    else:
+        state = {'source': source_id, 'consumed': 0, 'errors': 0, 'elapsed': 0.0}
+
+    writer = create_writer(output_path, state if state['consumed'] else None)
+    remaining = itertools.islice(paths, state['consumed'], None)
+
+    start = time.perf_counter()
+    elapsed_before = state['elapsed']
+    last_report = start
+    processed = 0
+    report_processed = 0
+    batches_since_flush = 0
+
+    def checkpoint():
+        state.update(writer.flush())
+        state['elapsed'] = elapsed_before + (time.perf_counter() - start)
+        _atomic_write_json(state_path, state)
+
+    try:
+        for batch in iter_decoded_batches(remaining, img_width, img_height, batch_size=batch_size,
+                                          workers=workers, draft=draft):
+            scores = score_batch(model, batch.images)
+            score_iter = iter(scores)
+            rows = [
+                _format_result(path, next(score_iter) if ok else None, None if ok else error)
+                for path, ok, error in zip(batch.paths, batch.ok, batch.errors)
+            ]
+            writer.write_rows(rows)
+
+            state['consumed'] += len(batch.paths)
+            state['errors'] += int((~batch.ok).sum())
+            processed += len(batch.paths)
+            batches_since_flush += 1
+
+            if batches_since_flush >= flush_every:
+                checkpoint()
+                batches_since_flush = 0
+
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                window_rate = (processed - report_processed) / (now - last_report)
+                overall_rate = processed / (now - start)
+                msg = (f"⚡ {state['consumed']:,} images | {window_rate:,.1f} img/s "
+                       f"(avg {overall_rate:,.1f}) | errors: {state['errors']:,}")
+                if total and overall_rate > 0:
+                    eta = (total - state['consumed']) / overall_rate
+                    msg += f" | ETA {eta / 60:.1f} min"
+                print(msg)
+                last_report = now
+                report_processed = processed
+    finally:
+        checkpoint()
+        writer.close()
+
+    duration = time.perf_counter() - start
+    summary = {
+        'scored': processed,
+        'total_consumed': state['consumed'],
+        'errors': state['errors'],
+        'seconds': duration,
+        'images_per_sec': processed / duration if duration > 0 else 0.0
+    }
+
+    print("\n" + "="*60)
+    print("✅ Batch scoring completed")
+    print("="*60)
+    print(f"Images scored this run: {processed:,}")
+    print(f"Total images scored:    {state['consumed']:,} (errors: {state['errors']:,})")
+    print(f"Throughput:             {summary['images_per_sec']:,.1f} images/sec")
+    print(f"Results written to:     {output_path}")
+    print("="*60 + "\n")
+
+    return summary
+
+
+def main(args):
+    from tensorflow.keras.models import load_model
+
+    if bool(args.input) == bool(args.manifest):
+        raise SystemExit("Provide exactly one of --input or --manifest")
+
+    if args.input:
+        source_id = os.path.abspath(args.input)
+        paths = iter_directory(args.input)
+        total = None
+    else:
+        source_id = os.path.abspath(args.manifest)
+        paths = iter_manifest(args.manifest, column=args.column)
+        total = count_manifest_rows(args.manifest)
+
+    print(f"Loading model: {args.model}")
+    model = load_model(args.model)
+    print(f"Model input shape: {model.input_shape[2]}x{model.input_shape[1]}")
+
+    run_batch_scoring(
+        model,
+        paths,
+        args.output,
+        source_id,
+        state_path=args.state,
+        total=total,
+        batch_size=args.batch_size,
+        workers=args.workers,
+        flush_every=args.flush_every,
+        report_every=args.report_every,
+        restart=args.restart,
+        draft=not args.exact_decode
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Bulk offline scoring of images for deepfake detection')
+    parser.add_argument('--input', type=str, default=None, help='Directory tree of images to score')
+    parser.add_argument('--manifest', type=str, default=None, help='CSV or Parquet manifest of image paths')
+    parser.add_argument('--column', type=str, default='path', help='Manifest column holding image paths')
+    parser.add_argument('--output', type=str, required=True,
+                        help='Output .csv file or .parquet directory')
+    parser.add_argument('--model', type=str, default='checkpoints/final_model.keras', help='Path to trained model')
+    parser.add_argument('--batch-size', type=int, default=64, help='Images per forward pass')
+    parser.add_argument('--workers', type=int, default=None, help='Decode threads (default: CPU count)')
+    parser.add_argument('--flush-every', type=int, default=20, help='Batches between progress checkpoints')
+    parser.add_argument('--report-every', type=float, default=10.0, help='Seconds between throughput reports')
+    parser.add_argument('--state', type=str, default=None,
+                        help='Progress checkpoint file (default: <output>.state.json)')
+    parser.add_argument('--restart', action='store_true', help='Ignore previous progress and start over')
+    parser.add_argument('--exact-decode', action='store_true',
+                        help='Disable JPEG draft-mode decoding and decode at full resolution before resizing '
+                             '(slower; the web app decodes JPEGs in draft mode too)')
+
+    main(parser.parse_args())
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Gradient Accumulation Benchmark for Deepfake Detection Training
+Trains for a few steps at a fixed effective batch size with different
+accumulation factors and reports peak memory and throughput for each.
+
+Every factor runs in a fresh process so peak memory is measured in isolation.
+
+Usage:
+    python benchmark_accumulation.py --model-type EfficientNetB4 --effective-batch-size 48 --factors 1 2 4 8
+    python benchmark_accumulation.py --model-type EfficientNetB4 --fine-tune --unfreeze-layers 60
+"""
+
+import sys
+import json
+import time
+import resource
+import argparse
+import subprocess
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def run_factor(factor, args):
+    """
+    Run one accumulation factor in a child process
+
+    Returns:
+        dict with images_per_sec and peak memory, or None if the run failed (e.g. OOM)
+    """
+    cmd = [sys.executable, __file__, '--run-factor', str(factor),
+           '--model-type', args.model_type, '--img-size', str(args.img_size),
+           '--effective-batch-size', str(args.effective_batch_size),
+           '--steps', str(args.steps), '--warmup-steps', str(args.warmup_steps),
+           '--unfreeze-layers', str(args.unfreeze_layers)]
+    if args.fine_tune:
+        cmd.append('--fine-tune')
+
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+
+    print(f"❌ Factor {factor} failed (exit code {proc.returncode}). Last output:")
+    print(proc.stdout[-2000:])
+    return None
+
+
+def run_single(args):
+    """Body of the child process: build the model, train a few steps, report"""
+    import numpy as np
+    import tensorflow as tf
+
+    # Same mixed-precision policy as the optimized training pipeline (set on import)
+    import data_preparation_optimized  # noqa: F401
+    from model import create_model, unfreeze_base_model
+    from gradient_accumulation import enable_gradient_accumulation
+
+    model = create_model(model_type=args.model_type, img_width=args.img_size, img_height=args.img_size)
+    if args.fine_tune:
+        model = unfreeze_base_model(model, num_layers_to_unfreeze=args.unfreeze_layers)
+    enable_gradient_accumulation(model, args.run_factor)
+
+    batch = args.effective_batch_size
+    images = np.random.uniform(0, 255, (batch, args.img_size, args.img_size, 3)).astype(np.float32)
+    labels = np.random.randint(0, 2, (batch,)).astype(np.float32)
+    dataset = tf.data.Dataset.from_tensors((images, labels)).repeat()
+
+    step_times = []
+
+    class StepTimer(tf.keras.callbacks.Callback):
+        def on_train_batch_begin(self, batch, logs=None):
+            self._t0 = time.perf_counter()
+
+        def on_train_batch_end(self, batch, logs=None):
+            if batch >= args.warmup_steps:
+                step_times.append(time.perf_counter() - self._t0)
+
+    # Class weights exercise the same sample-weight path as train_model_optimized()
+    model.fit(dataset, steps_per_epoch=args.warmup_steps + args.steps, epochs=1,
+              class_weight={0: 1.0, 1: 1.0}, callbacks=[StepTimer()], verbose=0)
+
+    result = {
+        'factor': args.run_factor,
+        'micro_batch': -(-batch // args.run_factor),
+        'mean_step_ms': sum(step_times) / len(step_times) * 1000,
+        'images_per_sec': batch * len(step_times) / sum(step_times),
+        'peak_rss_mb': peak_rss_mb()
+    }
+    if tf.config.list_physical_devices('GPU'):
+        result['peak_gpu_mb'] = tf.config.experimental.get_memory_info('GPU:0')['peak'] / (1024 * 1024)
+    print("RESULT " + json.dumps(result), flush=True)
+
+
+def main(args):
+    print("\n" + "="*70)
+    print(" "*15 + "⚡ GRADIENT ACCUMULATION BENCHMARK ⚡")
+    print("="*70)
+    print(f"Model: {args.model_type} @ {args.img_size}x{args.img_size}"
+          f"{' (fine-tuning last ' + str(args.unfreeze_layers) + ' layers)' if args.fine_tune else ''}")
+    print(f"Effective batch: {args.effective_batch_size} | Timed steps: {args.steps} (+{args.warmup_steps} warm-up)")
+    print("="*70)
+
+    results = []
+    for factor in args.factors:
+        print(f"\n▶ Accumulation factor {factor}...")
+        result = run_factor(factor, args)
+        if result:
+            results.append(result)
+            print(f"   {result['images_per_sec']:.1f} images/sec, peak RSS {result['peak_rss_mb']:.0f} MB")
+
+    if not results:
+        return
+
+    has_gpu = any('peak_gpu_mb' in r for r in results)
+    print("\n" + "="*70)
+    header = f"{'FACTOR':>6} | {'MICRO-BATCH':>11} | {'MS/STEP':>8} | {'IMAGES/SEC':>10} | {'PEAK RSS MB':>11}"
+    print(header + (f" | {'PEAK GPU MB':>11}" if has_gpu else ""))
+    print("-"*70)
+    for r in results:
+        row = (f"{r['factor']:>6} | {r['micro_batch']:>11} | {r['mean_step_ms']:>8.0f} | "
+               f"{r['images_per_sec']:>10.1f} | {r['peak_rss_mb']:>11.0f}")
+        if has_gpu:
+            row += f" | {r.get('peak_gpu_mb', 0):>11.0f}"
+        print(row)
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure peak memory and throughput of gradient accumulation')
+    parser.add_argument('--model-type', type=str, default='EfficientNetB4', help='Model architecture')
+    parser.add_argument('--img-size', type=int, default=380, help='Input resolution')
+    parser.add_argument('--effective-batch-size', type=int, default=48, help='Images per optimizer update')
+    parser.add_argument('--factors', type=int, nargs='+', default=[1, 2, 4, 8], help='Accumulation factors to test')
+    parser.add_argument('--steps', type=int, default=10, help='Timed training steps')
+    parser.add_argument('--warmup-steps', type=int, default=2, help='Untimed warm-up steps')
+    parser.add_argument('--fine-tune', action='store_true', help='Benchmark with unfreeze_base_model() applied')
+    parser.add_argument('--unfreeze-layers', type=int, default=20, help='Layers to unfreeze with --fine-tune')
+    parser.add_argument('--run-factor', type=int, default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.run_factor is not None:
+        run_single(args)
+    else:
+        main(args)
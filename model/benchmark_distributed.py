@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Multi-Worker Scaling Benchmark for Deepfake Detection Training
+Launches local MultiWorkerMirroredStrategy clusters of 1/2/4 workers (one
+process per worker, configured through TF_CONFIG) and measures training
+throughput and scaling efficiency.
+
+Usage:
+    # Synthetic data, isolates compute + all-reduce cost
+    python benchmark_distributed.py --workers 1 2 4 --model-type EfficientNetB4 --batch-size 8
+
+    # Real input pipeline
+    python benchmark_distributed.py --workers 1 2 4 --dataset-path /data/Dataset --batch-size 16
+
+Note: when all workers share one host they also share its cores. Each worker
+gets cores/N intra-op threads, so the numbers show communication overhead
+rather than the speed-up of adding machines. Run the same command per host
+with a real multi-host TF_CONFIG to measure true scaling.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import contextlib
+import argparse
+import subprocess
+
+
+def _free_ports(count):
+    sockets = []
+    for _ in range(count):
+        s = socket.socket()
+        s.bind(('localhost', 0))
+        sockets.append(s)
+    ports = [s.getsockname()[1] for s in sockets]
+    for s in sockets:
+        s.close()
+    return ports
+
+
+def run_cluster(num_workers, args):
+    """
+    Start `num_workers` local worker processes and return the chief's result
+
+    Returns:
+        dict with images_per_sec and step timing, or None if the run failed
+    """
+    ports = _free_ports(num_workers)
+    cluster = {'worker': [f"localhost:{p}" for p in ports]}
+    threads = max((os.cpu_count() or 1) // num_workers, 1)
+
+    worker_args = [sys.executable, os.path.abspath(__file__), '--run-worker',
+                   '--model-type', args.model_type, '--img-size', str(args.img_size),
+                   '--batch-size', str(args.batch_size), '--steps', str(args.steps),
+                   '--warmup-steps', str(args.warmup_steps), '--intra-op-threads', str(threads)]
+    if args.dataset_path:
+        worker_args += ['--dataset-path', args.dataset_path]
+
+    procs = []
+    for index in range(num_workers):
+        env = os.environ.copy()
+        if num_workers > 1:
+            env['TF_CONFIG'] = json.dumps({'cluster': cluster, 'task': {'type': 'worker', 'index': index}})
+        else:
+            env.pop('TF_CONFIG', None)
+        procs.append(subprocess.Popen(worker_args, env=env, stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT, text=True))
+
+    outputs = [p.communicate()[0] for p in procs]
+    for line in outputs[0].splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+
+    print(f"❌ {num_workers}-worker run failed. Chief output:")
+    print(outputs[0][-3000:])
+    return None
+
+
+def run_worker(args):
+    """Body of one worker process: build the model under the strategy and time training steps"""
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(args.intra_op_threads)
+
+    from distributed import get_distribution_strategy, worker_info, is_multi_worker, fit_multi_worker
+    strategy = get_distribution_strategy()
+
+    # Same mixed-precision policy as main_optimized.py (set on import)
+    from data_preparation_optimized import create_tf_datasets_optimized
+    from model import create_model
+
+    num_workers, worker_index, is_chief = worker_info(strategy)
+    global_batch = args.batch_size * num_workers
+
+    if args.dataset_path:
+        train, _, _ = create_tf_datasets_optimized(args.dataset_path, img_width=args.img_size,
+                                                   img_height=args.img_size, batch_size=global_batch,
+                                                   num_workers=num_workers, worker_index=worker_index)
+        dataset = train.dataset.repeat()
+    else:
+        image = tf.random.uniform((args.img_size, args.img_size, 3), 0, 255)
+        dataset = tf.data.Dataset.from_tensors((image, 1.0)).repeat().batch(global_batch)
+        options = tf.data.Options()
+        options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+        dataset = dataset.with_options(options).prefetch(tf.data.AUTOTUNE)
+
+    scope = strategy.scope() if strategy is not None else contextlib.nullcontext()
+    with scope:
+        model = create_model(model_type=args.model_type, img_width=args.img_size, img_height=args.img_size)
+
+    step_times = []
+
+    class StepTimer(tf.keras.callbacks.Callback):
+        def on_train_batch_begin(self, batch, logs=None):
+            self._t0 = time.perf_counter()
+
+        def on_train_batch_end(self, batch, logs=None):
+            if batch >= args.warmup_steps:
+                step_times.append(time.perf_counter() - self._t0)
+
+    steps = args.warmup_steps + args.steps
+    if is_multi_worker(strategy):
+        fit_multi_worker(model, strategy, dataset, epochs=1, steps_per_epoch=steps,
+                         callbacks=[StepTimer()], verbose=0)
+    else:
+        model.fit(dataset, steps_per_epoch=steps, epochs=1, callbacks=[StepTimer()], verbose=0)
+
+    if is_chief:
+        total = sum(step_times)
+        print("RESULT " + json.dumps({
+            'workers': num_workers,
+            'global_batch': global_batch,
+            'mean_step_ms': total / len(step_times) * 1000,
+            'images_per_sec': global_batch * len(step_times) / total
+        }), flush=True)
+
+
+def main(args):
+    print("\n" + "="*70)
+    print(" "*18 + "⚡ MULTI-WORKER SCALING BENCHMARK ⚡")
+    print("="*70)
+    print(f"Model: {args.model_type} @ {args.img_size}x{args.img_size}")
+    print(f"Per-worker batch: {args.batch_size} | Timed steps: {args.steps} (+{args.warmup_steps} warm-up)")
+    print(f"Data: {args.dataset_path or 'synthetic'}")
+    print("="*70)
+
+    results = []
+    for n in args.workers:
+        print(f"\n▶ Running with {n} worker(s)...")
+        result = run_cluster(n, args)
+        if result:
+            results.append(result)
+            print(f"   {result['images_per_sec']:.1f} images/sec ({result['mean_step_ms']:.0f} ms/step)")
+
+    if not results:
+        return
+
+    baseline = next((r for r in results if r['workers'] == 1), results[0])
+    base_per_worker = baseline['images_per_sec'] / baseline['workers']
+
+    print("\n" + "="*70)
+    print(f"{'WORKERS':>7} | {'GLOBAL BATCH':>12} | {'IMAGES/SEC':>10} | {'SPEED-UP':>8} | {'EFFICIENCY':>10}")
+    print("-"*70)
+    for r in results:
+        speedup = r['images_per_sec'] / baseline['images_per_sec']
+        efficiency = r['images_per_sec'] / (r['workers'] * base_per_worker)
+        print(f"{r['workers']:>7} | {r['global_batch']:>12} | {r['images_per_sec']:>10.1f} | "
+              f"{speedup:>7.2f}x | {efficiency:>10.1%}")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure multi-worker training scaling efficiency')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4], help='Cluster sizes to test')
+    parser.add_argument('--model-type', type=str, default='EfficientNetB4', help='Model architecture')
+    parser.add_argument('--img-size', type=int, default=380, help='Input resolution')
+    parser.add_argument('--batch-size', type=int, default=8, help='Per-worker batch size')
+    parser.add_argument('--steps', type=int, default=20, help='Timed training steps')
+    parser.add_argument('--warmup-steps', type=int, default=3, help='Untimed warm-up steps')
+    parser.add_argument('--dataset-path', type=str, default=None, help='Use real data instead of synthetic')
+    parser.add_argument('--run-worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--intra-op-threads', type=int, default=0, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.run_worker:
+        run_worker(args)
+    else:
+        main(args)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Hard-Example Mining Benchmark for Deepfake Detection Training
+Trains the same model twice on the same data: once on the full training set
+every epoch (uniform) and once with hard-example mining. After every epoch
+the validation AUC is measured; the report shows how much training time and
+how many training images each run needed to first reach --target-auc.
+
+Training time includes the mining runs' scoring passes (they are part of
+its cost) but not the validation AUC measurement. Each run happens in a
+fresh process so neither inherits the other's caches.
+
+Usage:
+    python benchmark_hard_mining.py --dataset-path /data/Dataset --epochs 10 --target-auc 0.95
+    python benchmark_hard_mining.py --dataset-path /data/Dataset --load-model checkpoints/final_model.keras \\
+        --epochs 6 --mining-fraction 0.5 --target-auc 0.98
+"""
+
+import sys
+import json
+import math
+import time
+import argparse
+import subprocess
+
+
+def run_mode(mode, args):
+    """Run one training mode ('uniform' or 'mined') in a child process and return its result"""
+    cmd = [sys.executable, __file__, '--run-mode', mode,
+           '--dataset-path', args.dataset_path, '--model-type', args.model_type,
+           '--epochs', str(args.epochs), '--batch-size', str(args.batch_size),
+           '--img-size', str(args.img_size), '--target-auc', str(args.target_auc),
+           '--mining-fraction', str(args.mining_fraction), '--mining-power', str(args.mining_power),
+           '--mining-refresh', str(args.mining_refresh)]
+    if args.load_model:
+        cmd += ['--load-model', args.load_model]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+
+    print(f"❌ {mode} run failed (exit code {proc.returncode}). Last output:")
+    print(proc.stdout[-2000:])
+    return None
+
+
+def train_single(args):
+    """Body of the child process"""
+    import numpy as np
+    import tensorflow as tf
+    from sklearn.metrics import roc_auc_score
+
+    from data_preparation_optimized import create_tf_datasets_optimized
+    from hard_mining import create_mined_split
+
+    if args.load_model:
+        model = tf.keras.models.load_model(args.load_model)
+    else:
+        from model import create_model
+        model = create_model(model_type=args.model_type,
+                             img_width=args.img_size or None, img_height=args.img_size or None)
+    img_height, img_width = model.input_shape[1], model.input_shape[2]
+
+    train, val, _ = create_tf_datasets_optimized(args.dataset_path, img_width=img_width,
+                                                 img_height=img_height, batch_size=args.batch_size)
+    callbacks = []
+    data, steps_per_epoch = train.dataset, None
+    if args.run_mode == 'mined':
+        train, mining = create_mined_split(train, img_width, img_height, args.batch_size,
+                                           epoch_fraction=args.mining_fraction, power=args.mining_power,
+                                           refresh_fraction=args.mining_refresh)
+        callbacks.append(mining)
+        data, steps_per_epoch = train.dataset, math.ceil(train.samples / args.batch_size)
+
+    val_labels = np.asarray(val.classes)
+    epochs = []
+
+    class EpochRecorder(tf.keras.callbacks.Callback):
+        """Training time (incl. mining) and validation AUC per epoch; runs after the mining callback"""
+
+        def on_epoch_begin(self, epoch, logs=None):
+            self._t0 = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            seconds = time.perf_counter() - self._t0
+            scores = self.model.predict(val.dataset, verbose=0).reshape(-1)
+            auc = roc_auc_score(val_labels, scores) if len(np.unique(val_labels)) == 2 else float('nan')
+            images = (steps_per_epoch * args.batch_size) if steps_per_epoch else train.samples
+            epochs.append({'seconds': seconds, 'auc': auc, 'images': images})
+
+    model.fit(data, steps_per_epoch=steps_per_epoch, epochs=args.epochs,
+              callbacks=callbacks + [EpochRecorder()], verbose=2)
+
+    elapsed, images, reached = 0.0, 0, None
+    for i, epoch in enumerate(epochs):
+        elapsed += epoch['seconds']
+        images += epoch['images']
+        if reached is None and epoch['auc'] >= args.target_auc:
+            reached = {'epoch': i + 1, 'seconds': elapsed, 'images': images}
+
+    print("RESULT " + json.dumps({
+        'mode': args.run_mode,
+        'epochs': epochs,
+        'total_seconds': elapsed,
+        'final_auc': epochs[-1]['auc'] if epochs else float('nan'),
+        'reached': reached
+    }), flush=True)
+
+
+def main(args):
+    print("\n" + "="*70)
+    print(" "*16 + "⛏️  HARD-EXAMPLE MINING BENCHMARK ⛏️")
+    print("="*70)
+    print(f"Model: {args.load_model or args.model_type} | Epochs: {args.epochs} | Batch size: {args.batch_size}")
+    print(f"Dataset: {args.dataset_path} | Target validation AUC: {args.target_auc}")
+    print(f"Mining: {args.mining_fraction:.0%} of the images per epoch, power {args.mining_power}, "
+          f"refresh {args.mining_refresh:.0%}")
+    print("="*70)
+
+    results = {}
+    for mode in ('uniform', 'mined'):
+        print(f"\n▶ Training ({mode})...")
+        result = run_mode(mode, args)
+        if result:
+            results[mode] = result
+            print(f"   {result['total_seconds']:.1f}s total, final validation AUC {result['final_auc']:.4f}")
+
+    if not results:
+        return
+
+    print("\n" + "="*70)
+    print(f"{'EPOCH':>5} | " + " | ".join(f"{mode.upper() + ' s / AUC':>22}" for mode in results))
+    print("-"*70)
+    for epoch in range(args.epochs):
+        cells = []
+        for r in results.values():
+            e = r['epochs'][epoch] if epoch < len(r['epochs']) else None
+            cells.append(f"{e['seconds']:>12.1f} / {e['auc']:.4f}" if e else f"{'-':>22}")
+        print(f"{epoch + 1:>5} | " + " | ".join(cells))
+    print("-"*70)
+    print(f"Time to validation AUC >= {args.target_auc}:")
+    for mode, r in results.items():
+        reached = r['reached']
+        if reached:
+            print(f"   {mode:<8} {reached['seconds']:>8.1f}s | epoch {reached['epoch']} | "
+                  f"{reached['images']} training images")
+        else:
+            print(f"   {mode:<8} not reached in {args.epochs} epochs")
+
+    if len(results) == 2 and all(r['reached'] for r in results.values()):
+        uniform, mined = results['uniform']['reached'], results['mined']['reached']
+        print(f"\nTime saved: {1 - mined['seconds'] / uniform['seconds']:.1%} | "
+              f"Images saved: {1 - mined['images'] / uniform['images']:.1%}")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare time-to-target-AUC with and without hard-example mining')
+    parser.add_argument('--dataset-path', type=str, required=True, help='Dataset root (Train/Validation/Test or flat)')
+    parser.add_argument('--model-type', type=str, default='EfficientNetB0', help='Model architecture')
+    parser.add_argument('--load-model', type=str, default=None, help='Start both runs from this saved model')
+    parser.add_argument('--img-size', type=int, default=0, help='Resolution (0 = model default)')
+    parser.add_argument('--epochs', type=int, default=10, help='Epochs per run')
+    parser.add_argument('--batch-size', type=int, default=32, help='Batch size')
+    parser.add_argument('--target-auc', type=float, default=0.95, help='Validation AUC to reach')
+    parser.add_argument('--mining-fraction', type=float, default=0.6, help='Images per mined epoch (share)')
+    parser.add_argument('--mining-power', type=float, default=1.0, help='Preference for hard images')
+    parser.add_argument('--mining-refresh', type=float, default=0.1, help='Extra share re-scored per epoch')
+    parser.add_argument('--run-mode', choices=['uniform', 'mined'], default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.run_mode:
+        train_single(args)
+    else:
+        main(args)
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Patch Inference Latency Benchmark for Deepfake Detection
+Measures how the cost of patch-level inference (patch_inference.py) grows
+with image size and patch budget, next to the plain squash-to-input-size
+prediction. Reports median milliseconds per image and per megapixel, with
+the time split into patch selection, cropping and inference.
+
+Images are synthetic 4:3 photo-like textures of the requested sizes unless
+real files are given with --images (each measured at its native size).
+
+Usage:
+    python benchmark_patch_inference.py --model checkpoints/final_model.keras
+    python benchmark_patch_inference.py --model checkpoints/final_model.keras --megapixels 2 12 24 --max-patches 8 16 32
+    python benchmark_patch_inference.py --model checkpoints/final_model.keras --images photos/*.jpg
+"""
+
+import os
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+
+
+def synthetic_image(megapixels, seed=0):
+    """4:3 RGB image with smooth areas and a few high-texture regions (texture ranking has work to do)"""
+    rng = np.random.RandomState(seed)
+    width = int(round((megapixels * 1e6 * 4 / 3) ** 0.5))
+    height = int(round(width * 3 / 4))
+    # Smooth background from a small random image scaled up
+    img = Image.fromarray((rng.rand(6, 8, 3) * 255).astype(np.uint8)).resize((width, height), Image.BICUBIC)
+    pixels = np.asarray(img).copy()
+    for _ in range(6):
+        w, h = width // 6, height // 6
+        x, y = rng.randint(0, width - w), rng.randint(0, height - h)
+        pixels[y:y + h, x:x + w] = (rng.rand(h, w, 3) * 255).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+
+def time_call(fn, repeats):
+    """Median milliseconds of fn() over `repeats` runs (after one warm-up), and the last return value"""
+    value = fn()
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings)), value
+
+
+def main(args):
+    from tensorflow.keras.models import load_model
+    from runtime_profile import load_runtime_profile, apply_threading
+    from batch_score import score_batch
+    from patch_inference import predict_patches
+
+    apply_threading(load_runtime_profile(), 'inference')
+    model = load_model(args.model)
+    input_size = (model.input_shape[2], model.input_shape[1])
+
+    if args.images:
+        inputs = []
+        for path in args.images:
+            with Image.open(path) as img:
+                inputs.append((os.path.basename(path), img.convert('RGB')))
+    else:
+        inputs = [(f'synthetic {mp:g} MP', synthetic_image(mp, seed=i)) for i, mp in enumerate(args.megapixels)]
+
+    print("\n" + "="*96)
+    print(" "*26 + "PATCH INFERENCE LATENCY BENCHMARK")
+    print("="*96)
+    print(f"Model input: {input_size[0]}x{input_size[1]}, scales {args.scales}, "
+          f"batch size {args.batch_size}, median of {args.repeats} runs")
+    print(f"\n{'Image':<22}{'MP':>6}{'Mode':>14}{'Patches':>9}{'Select':>9}{'Crop':>8}{'Infer':>9}"
+          f"{'Total ms':>10}{'ms/MP':>9}")
+    print("-"*96)
+
+    for name, img in inputs:
+        megapixels = img.width * img.height / 1e6
+
+        # Baseline: the plain path squashes the whole image into one input
+        squash_ms, _ = time_call(lambda: score_batch(model, np.asarray(img.resize(input_size))[None]),
+                                 args.repeats)
+        print(f"{name[:21]:<22}{megapixels:>6.1f}{'squash':>14}{1:>9}{'':>9}{'':>8}{'':>9}"
+              f"{squash_ms:>10.0f}{squash_ms / megapixels:>9.1f}")
+
+        for max_patches in args.max_patches:
+            total_ms, (result, timings) = time_call(
+                lambda: predict_patches(model, img, scales=args.scales, max_patches=max_patches,
+                                        batch_size=args.batch_size, face_priority=not args.no_faces),
+                args.repeats)
+            print(f"{'':<22}{'':>6}{f'patches<={max_patches}':>14}{len(result.patches):>9}"
+                  f"{timings['select']:>9.0f}{timings['crop']:>8.0f}{timings['infer']:>9.0f}"
+                  f"{total_ms:>10.0f}{total_ms / megapixels:>9.1f}")
+        print("-"*96)
+
+    print("Patch mode cost follows --max-patches rather than the pixel count; the squash baseline "
+          "grows with the image (full-size resize).")
+    print("="*96 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark patch-level inference latency per megapixel')
+    parser.add_argument('--model', type=str, required=True, help='Trained .keras model')
+    parser.add_argument('--images', type=str, nargs='+', default=None, help='Real images (default: synthetic)')
+    parser.add_argument('--megapixels', type=float, nargs='+', default=[1, 4, 12, 24],
+                        help='Sizes of the synthetic images')
+    parser.add_argument('--max-patches', type=int, nargs='+', default=[8, 16, 32], help='Patch budgets to compare')
+    parser.add_argument('--scales', type=float, nargs='+', default=[1.0, 0.5], help='Scales to tile at')
+    parser.add_argument('--batch-size', type=int, default=64, help='Patches per forward pass')
+    parser.add_argument('--repeats', type=int, default=3, help='Timed runs per configuration')
+    parser.add_argument('--no-faces', action='store_true', help='Rank patches by texture only')
+    main(parser.parse_args())
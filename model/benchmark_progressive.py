@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Progressive Resizing Benchmark for Deepfake Detection Training
+Trains the same model twice on the same data: once at fixed (native)
+resolution and once with a progressive-resizing schedule. Reports time per
+epoch, total training time and final test AUC at native resolution.
+
+Each run happens in a fresh process so neither inherits the other's caches.
+
+Usage:
+    python benchmark_progressive.py --dataset-path /data/Dataset --model-type EfficientNetB0 --epochs 10
+    python benchmark_progressive.py --dataset-path /data/Dataset --model-type EfficientNetB4 --epochs 12 --start-size 160
+"""
+
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+
+def run_mode(mode, args):
+    """Run one training mode ('fixed' or 'progressive') in a child process and return its result"""
+    cmd = [sys.executable, __file__, '--run-mode', mode,
+           '--dataset-path', args.dataset_path, '--model-type', args.model_type,
+           '--epochs', str(args.epochs), '--batch-size', str(args.batch_size),
+           '--start-size', str(args.start_size), '--stages', str(args.stages),
+           '--final-fraction', str(args.final_fraction), '--img-size', str(args.img_size)]
+    proc = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    for line in proc.stdout.splitlines():
+        if line.startswith('RESULT '):
+            return json.loads(line[len('RESULT '):])
+
+    print(f"❌ {mode} run failed (exit code {proc.returncode}). Last output:")
+    print(proc.stdout[-2000:])
+    return None
+
+
+def train_single(args):
+    """Body of the child process"""
+    import numpy as np
+    import tensorflow as tf
+    from sklearn.metrics import roc_auc_score
+
+    from data_preparation_optimized import create_tf_datasets_optimized
+    from model import create_model, with_input_resolution
+    from progressive_resizing import progressive_schedule, ProgressiveResizing
+
+    model = create_model(model_type=args.model_type,
+                         img_width=args.img_size or None, img_height=args.img_size or None)
+    img_height, img_width = model.input_shape[1], model.input_shape[2]
+
+    callbacks = []
+    train_resolution = None
+    if args.run_mode == 'progressive':
+        schedule = progressive_schedule(args.epochs, img_height, start_size=args.start_size,
+                                        stages=args.stages, final_fraction=args.final_fraction)
+        resizing = ProgressiveResizing(schedule, aspect_ratio=img_width / img_height)
+        callbacks.append(resizing)
+        train_resolution = resizing.resolution
+        model = with_input_resolution(model)
+        print(f"Schedule: {schedule}")
+
+    train, val, test = create_tf_datasets_optimized(args.dataset_path, img_width=img_width,
+                                                    img_height=img_height, batch_size=args.batch_size,
+                                                    train_resolution=train_resolution)
+
+    epoch_times = []
+
+    class EpochTimer(tf.keras.callbacks.Callback):
+        def on_epoch_begin(self, epoch, logs=None):
+            self._t0 = time.perf_counter()
+
+        def on_epoch_end(self, epoch, logs=None):
+            epoch_times.append(time.perf_counter() - self._t0)
+
+    # Timer first so the resolution change is included in the epoch it belongs to
+    model.fit(train.dataset, validation_data=val.dataset, epochs=args.epochs,
+              callbacks=[EpochTimer()] + callbacks, verbose=2)
+
+    if args.run_mode == 'progressive':
+        model = with_input_resolution(model, img_width, img_height)
+    scores = model.predict(test.dataset, verbose=0).reshape(-1)
+    labels = np.asarray(test.classes)
+    auc = roc_auc_score(labels, scores) if len(np.unique(labels)) == 2 else float('nan')
+
+    print("RESULT " + json.dumps({
+        'mode': args.run_mode,
+        'resolution': f"{img_width}x{img_height}",
+        'epoch_seconds': epoch_times,
+        'total_seconds': sum(epoch_times),
+        'auc': auc,
+        'accuracy': float(((scores > 0.5) == labels).mean())
+    }), flush=True)
+
+
+def main(args):
+    print("\n" + "="*70)
+    print(" "*16 + "⚡ PROGRESSIVE RESIZING BENCHMARK ⚡")
+    print("="*70)
+    print(f"Model: {args.model_type} | Epochs: {args.epochs} | Batch size: {args.batch_size}")
+    print(f"Dataset: {args.dataset_path}")
+    print("="*70)
+
+    results = {}
+    for mode in ('fixed', 'progressive'):
+        print(f"\n▶ Training ({mode} resolution)...")
+        result = run_mode(mode, args)
+        if result:
+            results[mode] = result
+            print(f"   {result['total_seconds']:.1f}s total, test AUC {result['auc']:.4f}")
+
+    if not results:
+        return
+
+    print("\n" + "="*70)
+    print(f"{'EPOCH':>5} | " + " | ".join(f"{mode.upper() + ' (s)':>17}" for mode in results))
+    print("-"*70)
+    for epoch in range(args.epochs):
+        cells = []
+        for r in results.values():
+            times = r['epoch_seconds']
+            cells.append(f"{times[epoch]:>17.1f}" if epoch < len(times) else f"{'-':>17}")
+        print(f"{epoch + 1:>5} | " + " | ".join(cells))
+    print("-"*70)
+    print(f"{'TOTAL':>5} | " + " | ".join(f"{r['total_seconds']:>17.1f}" for r in results.values()))
+    print(f"{'AUC':>5} | " + " | ".join(f"{r['auc']:>17.4f}" for r in results.values()))
+    print(f"{'ACC':>5} | " + " | ".join(f"{r['accuracy']:>17.4f}" for r in results.values()))
+
+    if len(results) == 2:
+        fixed, progressive = results['fixed'], results['progressive']
+        saving = 1 - progressive['total_seconds'] / fixed['total_seconds']
+        print(f"\nTime saved: {saving:.1%} | AUC change: {progressive['auc'] - fixed['auc']:+.4f}")
+    print("="*70 + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare progressive-resizing and fixed-resolution training')
+    parser.add_argument('--dataset-path', type=str, required=True, help='Dataset root (Train/Validation/Test or flat)')
+    parser.add_argument('--model-type', type=str, default='EfficientNetB0', help='Model architecture')
+    parser.add_argument('--img-size', type=int, default=0, help='Native resolution (0 = model default)')
+    parser.add_argument('--epochs', type=int, default=10, help='Epochs per run')
+    parser.add_argument('--batch-size', type=int, default=32, help='Batch size')
+    parser.add_argument('--start-size', type=int, default=128, help='First progressive resolution')
+    parser.add_argument('--stages', type=int, default=3, help='Low-resolution stages')
+    parser.add_argument('--final-fraction', type=float, default=0.3, help='Share of epochs at native resolution')
+    parser.add_argument('--run-mode', choices=['fixed', 'progressive'], default=None, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    if args.run_mode:
+        train_single(args)
+    else:
+        main(args)
@@ -4,9 +4,13 @@ Includes performance optimizations for faster training
 """
 
 import os
+import numpy as np
+import pandas as pd
 import tensorflow as tf
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 
+from dataset_layout import SHARD_INDEX_FILE, SPLIT_MANIFEST_FILE, SPLIT_NAMES, is_tar_dataset, list_class_files
+
 # Enable mixed precision training for faster computation
 from tensorflow.keras import mixed_precision
 policy = mixed_precision.Policy('mixed_float16')
@@ -105,6 +109,16 @@ def inspect_dataset(dataset_path):
     if not os.path.exists(dataset_path):
         raise FileNotFoundError(f"Dataset path does not exist: {dataset_path}")
     
+    # Sharded tar dataset: counts come from its index, no per-file listing
+    if is_tar_dataset(dataset_path):
+        from tar_dataset import load_shard_index
+        index = load_shard_index(dataset_path)
+        print(f"\nSharded tar dataset, classes: {list(index['class_indices'])}")
+        for split, info in index['splits'].items():
+            print(f"\n{split} split: {len(info['shards'])} shards")
+            for cls, count in info['class_counts'].items():
+                print(f"  {cls}: {count} images")
+        return dataset_path
     
     # Check for standard split structure
     is_standard_split = os.path.exists(os.path.join(dataset_path, 'Train'))
@@ -135,15 +149,55 @@ def inspect_dataset(dataset_path):
              
     return dataset_path
 
-def create_data_generators_optimized(dataset_path, img_width=150, img_height=150, batch_size=32):
+# Written by phash_index.py (near-duplicate / leakage removal) at the dataset root
+EXCLUSIONS_FILE = 'dataset_exclusions.txt'
+def load_exclusions(dataset_path):
+    """
+    Read the dataset's exclusion list, if there is one
+    
+    Returns:
+        Set of absolute paths to leave out of training and evaluation (empty if no list)
+    """
+    list_path = os.path.join(dataset_path, EXCLUSIONS_FILE)
+    if not os.path.exists(list_path):
+        return set()
+    with open(list_path) as f:
+        excluded = {os.path.normpath(os.path.join(dataset_path, line.strip()))
+                    for line in f if line.strip() and not line.startswith('#')}
+    print(f"🧹 Excluding {len(excluded)} files listed in {list_path}")
+    return excluded
+
+def _drop_excluded(generator, excluded):
+    """Remove excluded files from a flow_from_directory iterator in place"""
+    keep = [i for i, path in enumerate(generator.filepaths) if os.path.normpath(path) not in excluded]
+    if len(keep) == generator.samples:
+        return generator
+    generator.filenames = [generator.filenames[i] for i in keep]
+    generator._filepaths = [generator._filepaths[i] for i in keep]
+    generator.classes = generator.classes[keep]
+    generator.samples = generator.n = len(keep)
+    generator.index_array = None  # re-drawn over the remaining files
+    return generator
+
+def create_data_generators_optimized(dataset_path, img_width=150, img_height=150, batch_size=32,
+                                     use_exclusions=True):
     """
     Create OPTIMIZED data generators with performance enhancements:
     - Prefetching for better GPU utilization
     - Caching to reduce I/O overhead
     - Parallel processing
     - Optimized augmentation settings
+    
+    Files in the dataset's exclusion list (see phash_index.py) are skipped
+    unless use_exclusions is False. Sharded tar datasets (tar_dataset.py)
+    have no per-file layout and are served by the tf.data pipeline instead.
     """
     from tensorflow.keras.applications.efficientnet import preprocess_input
+    
+    if is_tar_dataset(dataset_path):
+        print("\n📦 Sharded tar dataset: using the tf.data pipeline instead of Keras generators")
+        return create_tf_datasets_optimized(dataset_path, img_width=img_width, img_height=img_height,
+                                            batch_size=batch_size)
 
     # Check if we have standard split or flat structure
     if os.path.exists(os.path.join(dataset_path, 'Train')):
@@ -192,9 +246,8 @@ def create_data_generators_optimized(dataset_path, img_width=150, img_height=150
         )
         
     else:
-        # Flat Structure (Auto-Split)
-        print("\n🚀 Using OPTIMIZED Flat Structure (Auto-Splitting Real/Fake)...")
-        print("Note: Using 80% for training, 20% for validation/testing")
+        # Flat Structure: seeded Train/Validation/Test split from the split manifest
+        print("\n🚀 Using OPTIMIZED Flat Structure (seeded Train/Validation/Test split)...")
         
         # OPTIMIZED: Streamlined augmentation
         train_datagen = ImageDataGenerator(
@@ -205,36 +258,40 @@ def create_data_generators_optimized(dataset_path, img_width=150, img_height=150
             zoom_range=0.15,
             horizontal_flip=True,
             brightness_range=[0.85, 1.15],
-            fill_mode='nearest',
-            validation_split=0.2
+            fill_mode='nearest'
         )
         
-        # Validation datagen without augmentation for consistent evaluation
+        # Validation/test datagen without augmentation for consistent evaluation
         val_datagen = ImageDataGenerator(
-            preprocessing_function=preprocess_input,
-            validation_split=0.2
+            preprocessing_function=preprocess_input
         )
         
-        train_generator = train_datagen.flow_from_directory(
-            dataset_path,
-            target_size=(img_width, img_height),
-            batch_size=batch_size,
-            class_mode='binary',
-            subset='training',
-            shuffle=True
-        )
+        splits, class_indices = dataset_file_splits(dataset_path, use_exclusions=False)
         
-        validation_generator = val_datagen.flow_from_directory(
-            dataset_path,
-            target_size=(img_width, img_height),
-            batch_size=batch_size,
-            class_mode='binary',
-            subset='validation',
-            shuffle=False
-        )
+        def flow(datagen, split, shuffle):
+            files, labels = splits[split]
+            names = list(class_indices)
+            frame = pd.DataFrame({'filename': files, 'class': [names[label] for label in labels]})
+            return datagen.flow_from_dataframe(
+                frame,
+                x_col='filename',
+                y_col='class',
+                classes=names,
+                target_size=(img_width, img_height),
+                batch_size=batch_size,
+                class_mode='binary',
+                shuffle=shuffle,
+                validate_filenames=False
+            )
         
-        # For flat structure, we use validation set as test set too
-        test_generator = validation_generator
+        train_generator = flow(train_datagen, 'Train', shuffle=True)
+        validation_generator = flow(val_datagen, 'Validation', shuffle=False)
+        test_generator = flow(val_datagen, 'Test', shuffle=False)
+
+    excluded = load_exclusions(dataset_path) if use_exclusions else set()
+    if excluded:
+        for generator in {train_generator, validation_generator, test_generator}:
+            _drop_excluded(generator, excluded)
 
     print("\n✅ OPTIMIZED data generators created successfully!")
     print(f"Training samples: {train_generator.samples}")
@@ -247,6 +304,242 @@ def create_data_generators_optimized(dataset_path, img_width=150, img_height=150
     
     return train_generator, validation_generator, test_generator
 
+# ==================== tf.data Pipeline ====================
+
+class DatasetSplit:
+    """
+    A tf.data pipeline together with the metadata the training and evaluation
+    code reads from Keras generators (samples, batch_size, classes, filepaths)
+    """
+    
+    def __init__(self, dataset, filepaths, classes, batch_size, class_indices):
+        self.dataset = dataset
+        self.filepaths = filepaths
+        self.classes = classes
+        self.samples = len(filepaths)
+        self.batch_size = batch_size
+        self.class_indices = class_indices
+
+def dataset_file_splits(dataset_path, use_exclusions=True):
+    """
+    Train/Validation/Test file lists of a directory dataset
+    
+    Flat Real/Fake datasets are split by the dataset's split manifest (see
+    split_manifest.py), which is created on first use: a seeded hash of each
+    file's path picks its split, so the split is reproducible and has a real
+    test set, and later runs need no directory scan (split_manifest.py
+    --verify picks up added or removed files). Standard layouts use their
+    folders, or their manifest if split_manifest.py made one.
+    
+    Returns:
+        ({'Train': (files, labels), 'Validation': ..., 'Test': ...}, class_indices)
+    """
+    from split_manifest import ensure_split_manifest, split_files
+    
+    excluded = load_exclusions(dataset_path) if use_exclusions else None
+    manifest = ensure_split_manifest(dataset_path, create=not os.path.exists(os.path.join(dataset_path, 'Train')))
+    
+    if manifest is not None:
+        print(f"🗂️  Splits from {SPLIT_MANIFEST_FILE} (seed {manifest['seed']}, key: {manifest['key']})")
+        splits = {}
+        for name in SPLIT_NAMES:
+            files, labels, class_indices = split_files(manifest, dataset_path, name, exclude=excluded)
+            splits[name] = (files, labels)
+        return splits, class_indices
+    
+    files, labels, class_indices = list_class_files(os.path.join(dataset_path, 'Train'), exclude=excluded)
+    splits = {'Train': (files, labels)}
+    for name in SPLIT_NAMES[1:]:
+        files, labels, _ = list_class_files(os.path.join(dataset_path, name), list(class_indices), exclude=excluded)
+        splits[name] = (files, labels)
+    return splits, class_indices
+
+def _decode_and_resize(contents, img_height, img_width):
+    image = tf.io.decode_image(contents, channels=3, expand_animations=False)
+    image = tf.image.resize(image, (img_height, img_width))
+    image.set_shape((img_height, img_width, 3))
+    return image
+
+def _decode_at_least(contents, img_height, img_width):
+    """
+    Decode an image no larger than needed for the target size
+    
+    JPEGs are decoded with DCT scaling (ratio 2/4/8) whenever the reduced image
+    still covers the target, which is much cheaper than a full decode followed
+    by a large downscale. Other formats are decoded in full.
+    """
+    def decode_jpeg():
+        shape = tf.image.extract_jpeg_shape(contents)
+        # Largest power-of-two reduction that keeps both sides >= target
+        fit = tf.minimum(shape[0] // img_height, shape[1] // img_width)
+        branch = tf.cast(fit >= 2, tf.int32) + tf.cast(fit >= 4, tf.int32) + tf.cast(fit >= 8, tf.int32)
+        return tf.switch_case(branch, [
+            lambda ratio=ratio: tf.io.decode_jpeg(contents, channels=3, ratio=ratio) for ratio in (1, 2, 4, 8)
+        ])
+    
+    def decode_other():
+        return tf.io.decode_image(contents, channels=3, expand_animations=False)
+    
+    image = tf.cond(tf.io.is_jpeg(contents), decode_jpeg, decode_other)
+    return tf.image.resize(image, (img_height, img_width))
+
+def _augment(image, img_height, img_width):
+    """Same spirit as the ImageDataGenerator settings: flips, ±15% zoom/shift, ±15% brightness"""
+    image = tf.image.random_flip_left_right(image)
+    scale = tf.random.uniform([], 1.0, 1.15)
+    zoomed = tf.cast(tf.cast([img_height, img_width], tf.float32) * scale, tf.int32)
+    image = tf.image.resize(image, zoomed)
+    image = tf.image.random_crop(image, (img_height, img_width, 3))
+    image = image * tf.random.uniform([], 0.85, 1.15)
+    return tf.clip_by_value(image, 0.0, 255.0)
+
+def build_image_dataset(filepaths, labels, img_width, img_height, batch_size, training=False,
+                        shard=None, repeat=False, seed=None, resolution=None):
+    """
+    Build a tf.data pipeline that decodes, resizes and batches image files
+    
+    Args:
+        filepaths: List of image paths
+        labels: Array of integer labels
+        img_width: Target width
+        img_height: Target height
+        batch_size: Batch size of the produced dataset
+        training: Shuffle and augment
+        shard: Optional (num_shards, index) — file-level sharding, so each
+            worker only reads and decodes its own part of the data
+        repeat: Repeat indefinitely (use with steps_per_epoch)
+        seed: Shuffle seed
+        resolution: Optional int32 tf.Variable [height, width] that overrides
+            img_height/img_width and can be changed while training (progressive
+            resizing). It is read once per batch, so every batch has one size.
+        
+    Returns:
+        tf.data.Dataset of (images, labels) batches
+    """
+    ds = tf.data.Dataset.from_tensor_slices((list(filepaths), np.asarray(labels, dtype=np.float32)))
+    if shard is not None and shard[0] > 1:
+        ds = ds.shard(*shard)
+    if training:
+        ds = ds.shuffle(len(filepaths), seed=seed, reshuffle_each_iteration=True)
+    if repeat:
+        ds = ds.repeat()
+    return decode_batches(ds, img_width, img_height, batch_size, training=training,
+                          drop_remainder=repeat, resolution=resolution)
+
+def decode_batches(ds, img_width, img_height, batch_size, training=False, drop_remainder=False,
+                   resolution=None, read=tf.io.read_file):
+    """
+    Decode, augment, preprocess and batch a dataset of (source, label) elements
+    
+    Shared by the directory pipeline (sources are file paths) and the tar
+    shard reader (sources are the encoded image bytes, read=None).
+    
+    Args:
+        ds: tf.data.Dataset of (source, label)
+        img_width, img_height, batch_size, training, resolution: See build_image_dataset()
+        drop_remainder: Drop the last partial batch
+        read: Maps a source to encoded image bytes (None = sources already are bytes)
+        
+    Returns:
+        tf.data.Dataset of (images, labels) batches
+    """
+    from tensorflow.keras.applications.efficientnet import preprocess_input
+    
+    read = read or (lambda contents: contents)
+    
+    def load(source, label):
+        image = _decode_and_resize(read(source), img_height, img_width)
+        if training:
+            image = _augment(image, img_height, img_width)
+        return preprocess_input(image), label
+    
+    if resolution is None:
+        ds = ds.map(load, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+        ds = ds.batch(batch_size, drop_remainder=drop_remainder)
+    else:
+        def load_batch(sources, batch_labels):
+            height, width = resolution[0], resolution[1]
+            
+            def load_one(source):
+                image = _decode_at_least(read(source), height, width)
+                if training:
+                    image = _augment(image, height, width)
+                return image
+            
+            images = tf.map_fn(load_one, sources, fn_output_signature=tf.TensorSpec((None, None, 3), tf.float32))
+            return preprocess_input(images), batch_labels
+        
+        ds = ds.batch(batch_size, drop_remainder=drop_remainder)
+        ds = ds.map(load_batch, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+    
+    # Sharding is done explicitly by the callers; stop tf.distribute from re-sharding by element
+    options = tf.data.Options()
+    options.experimental_distribute.auto_shard_policy = tf.data.experimental.AutoShardPolicy.OFF
+    return ds.with_options(options).prefetch(tf.data.AUTOTUNE)
+
+def create_tf_datasets_optimized(dataset_path, img_width=150, img_height=150, batch_size=32,
+                                 num_workers=1, worker_index=0, seed=1337, train_resolution=None,
+                                 use_exclusions=True):
+    """
+    Create tf.data train/validation/test pipelines (alternative to the Keras generators)
+    
+    Unlike flow_from_directory, these can be sharded per worker for
+    multi-worker training. `batch_size` is the GLOBAL batch size: every worker
+    builds batches of this size from its own shard and tf.distribute splits
+    them across replicas, so one step consumes batch_size images in total.
+    
+    Args:
+        dataset_path: Dataset root (standard Train/Validation/Test or flat Real/Fake)
+        img_width: Target width
+        img_height: Target height
+        batch_size: Global batch size
+        num_workers: Number of training workers
+        worker_index: Index of this worker
+        seed: Shuffle seed
+        train_resolution: Optional [height, width] tf.Variable for the training
+            split only (progressive resizing); validation/test stay at img_height x img_width
+        use_exclusions: Skip the files in the dataset's exclusion list (phash_index.py)
+        
+    Returns:
+        train, validation, test DatasetSplit objects
+    """
+    if is_tar_dataset(dataset_path):
+        from tar_dataset import create_tar_datasets
+        return create_tar_datasets(dataset_path, img_width=img_width, img_height=img_height,
+                                   batch_size=batch_size, num_workers=num_workers, worker_index=worker_index,
+                                   seed=seed, train_resolution=train_resolution)
+    
+    shard = (num_workers, worker_index) if num_workers > 1 else None
+    repeat = num_workers > 1  # keep workers in lock-step, uneven shards would hang collectives
+    if os.path.exists(os.path.join(dataset_path, 'Train')):
+        print("\n🚀 Using tf.data Standard Split Structure (Train/Test/Validation)...")
+    else:
+        print("\n🚀 Using tf.data Flat Structure (seeded Train/Validation/Test split)...")
+    splits, class_indices = dataset_file_splits(dataset_path, use_exclusions=use_exclusions)
+    (train_files, train_labels), (val_files, val_labels), (test_files, test_labels) = (
+        splits[name] for name in SPLIT_NAMES)
+    
+    def split(files, labels, training):
+        ds = build_image_dataset(files, labels, img_width, img_height, batch_size, training=training,
+                                 shard=shard if training or repeat else None, repeat=repeat, seed=seed,
+                                 resolution=train_resolution if training else None)
+        return DatasetSplit(ds, files, labels, batch_size, class_indices)
+    
+    train = split(train_files, train_labels, training=True)
+    validation = split(val_files, val_labels, training=False)
+    test = DatasetSplit(
+        build_image_dataset(test_files, test_labels, img_width, img_height, batch_size),
+        test_files, test_labels, batch_size, class_indices
+    )
+    
+    print(f"Training samples: {train.samples}")
+    print(f"Validation samples: {validation.samples}")
+    print(f"Test samples: {test.samples}")
+    if shard:
+        print(f"🔀 Worker {worker_index + 1}/{num_workers} reads 1/{num_workers} of the training files")
+    
+    return train, validation, test
+
 # Backwards compatibility
 create_data_generators = create_data_generators_optimized
 
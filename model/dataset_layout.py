@@ -0,0 +1,49 @@
+"""
+Dataset Layout Helpers for Deepfake Detection
+File names and directory listing shared by the data pipeline and the
+dataset tools. Kept free of TensorFlow so tools such as split_manifest.py
+can import them without loading TensorFlow or setting the mixed precision
+policy that data_preparation_optimized.py enables on import.
+"""
+
+import os
+import numpy as np
+
+# Written by tar_dataset.py next to the shards of a converted dataset
+SHARD_INDEX_FILE = 'shards.json'
+# Written by split_manifest.py (or on first use of a flat dataset) at the dataset root
+SPLIT_MANIFEST_FILE = 'split_manifest.json'
+SPLIT_NAMES = ('Train', 'Validation', 'Test')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+def is_tar_dataset(dataset_path):
+    """True if dataset_path holds tar shards made by tar_dataset.py rather than image folders"""
+    return os.path.isfile(os.path.join(dataset_path, SHARD_INDEX_FILE))
+
+def list_class_files(directory, class_names=None, exclude=None):
+    """
+    List image files of a class-per-folder directory in a stable order
+    
+    Args:
+        directory: Folder containing one sub-folder per class
+        class_names: Class folder names (default: sorted sub-folders, as flow_from_directory does)
+        exclude: Optional set of absolute paths to skip (load_exclusions())
+        
+    Returns:
+        (filepaths, labels, class_indices)
+    """
+    if class_names is None:
+        class_names = sorted(d for d in os.listdir(directory) if os.path.isdir(os.path.join(directory, d)))
+    class_indices = {name: i for i, name in enumerate(class_names)}
+    
+    filepaths, labels = [], []
+    for name in class_names:
+        class_dir = os.path.join(directory, name)
+        for root, _, files in sorted(os.walk(class_dir)):
+            for f in sorted(files):
+                path = os.path.join(root, f)
+                if f.lower().endswith(IMAGE_EXTENSIONS) and not (exclude and os.path.normpath(path) in exclude):
+                    filepaths.append(path)
+                    labels.append(class_indices[name])
+    return filepaths, np.array(labels, dtype=np.int32), class_indices
@@ -0,0 +1,222 @@
+"""
+Multi-Worker Training Helpers for Deepfake Detection
+Sets up tf.distribute.MultiWorkerMirroredStrategy from TF_CONFIG and provides
+the chief-only checkpointing and learning-rate scaling it needs.
+
+TF_CONFIG example (worker 0 of 2 on one host):
+    {"cluster": {"worker": ["localhost:12345", "localhost:12346"]},
+     "task": {"type": "worker", "index": 0}}
+"""
+
+import os
+import json
+import shutil
+import tempfile
+
+import tensorflow as tf
+
+
+def read_tf_config():
+    """Return the parsed TF_CONFIG environment variable, or None"""
+    raw = os.environ.get('TF_CONFIG')
+    return json.loads(raw) if raw else None
+
+
+def get_distribution_strategy():
+    """
+    Create a MultiWorkerMirroredStrategy if TF_CONFIG describes more than one worker
+
+    Must be called before any other TensorFlow op runs in the process.
+
+    Returns:
+        The strategy, or None for single-machine training
+    """
+    tf_config = read_tf_config()
+    if not tf_config:
+        return None
+    cluster = tf_config.get('cluster', {})
+    num_workers = len(cluster.get('worker', [])) + len(cluster.get('chief', []))
+    if num_workers <= 1:
+        return None
+
+    # RING all-reduce is the CPU-friendly collective implementation
+    options = tf.distribute.experimental.CommunicationOptions(
+        implementation=tf.distribute.experimental.CommunicationImplementation.RING
+    )
+    strategy = tf.distribute.MultiWorkerMirroredStrategy(communication_options=options)
+    task = tf_config.get('task', {})
+    print(f"🌐 Multi-worker training: {task.get('type')} {task.get('index')} of {num_workers} workers "
+          f"({strategy.num_replicas_in_sync} replicas in sync)")
+    return strategy
+
+
+def worker_info(strategy=None):
+    """
+    Describe this process's place in the cluster
+
+    Returns:
+        (num_workers, worker_index, is_chief)
+    """
+    tf_config = read_tf_config()
+    if strategy is None or not tf_config:
+        return 1, 0, True
+
+    cluster = tf_config.get('cluster', {})
+    task = tf_config.get('task', {})
+    task_type, task_index = task.get('type', 'worker'), int(task.get('index', 0))
+    has_chief = 'chief' in cluster
+    num_workers = len(cluster.get('worker', [])) + len(cluster.get('chief', []))
+
+    # Workers are numbered after the chief when an explicit chief exists
+    worker_index = task_index + (1 if has_chief and task_type == 'worker' else 0)
+    is_chief = task_type == 'chief' or (not has_chief and task_type == 'worker' and task_index == 0)
+    return num_workers, worker_index, is_chief
+
+
+def chief_only_dir(directory, strategy=None):
+    """
+    Return where this worker should write checkpoints
+
+    Every worker has to take part in saving (variables may need collective
+    reads), but only the chief's files are kept. Non-chief workers write to a
+    throwaway temporary directory; remove it with cleanup_worker_dir().
+    """
+    _, worker_index, is_chief = worker_info(strategy)
+    if is_chief:
+        return directory
+    return tempfile.mkdtemp(prefix=f"worker{worker_index}_")
+
+
+def cleanup_worker_dir(directory, original_directory):
+    """Delete a non-chief worker's temporary checkpoint directory"""
+    if directory != original_directory:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def scale_learning_rate(base_learning_rate, num_workers):
+    """
+    Linear scaling rule: the global batch grows with the number of workers,
+    so the learning rate grows with it
+    """
+    return base_learning_rate * num_workers
+
+
+class LearningRateWarmup(tf.keras.callbacks.Callback):
+    """
+    Ramp the learning rate linearly from base_lr to target_lr over the first
+    `warmup_steps` steps, which keeps large scaled learning rates stable early on
+    """
+
+    def __init__(self, base_lr, target_lr, warmup_steps):
+        super().__init__()
+        self.base_lr = base_lr
+        self.target_lr = target_lr
+        self.warmup_steps = max(int(warmup_steps), 1)
+        self._done = False
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self._done:
+            return
+        # Use the optimizer's step counter so a resumed run does not warm up again
+        step = int(self.model.optimizer.iterations.numpy())
+        if step > self.warmup_steps:
+            self._done = True
+            return
+        progress = step / self.warmup_steps
+        self.model.optimizer.learning_rate = self.base_lr + (self.target_lr - self.base_lr) * progress
+
+
+def is_multi_worker(strategy):
+    """True for strategies whose Keras fit() loop cannot be used (see fit_multi_worker)"""
+    return isinstance(strategy, tf.distribute.MultiWorkerMirroredStrategy)
+
+
+def _with_class_weights(dataset, class_weight):
+    """Append per-sample weights looked up from the label, like fit(class_weight=...)"""
+    weights = tf.constant([class_weight[i] for i in sorted(class_weight)], dtype=tf.float32)
+
+    def add_weights(images, labels):
+        index = tf.cast(tf.reshape(labels, [-1]), tf.int32)
+        return images, labels, tf.gather(weights, index)
+
+    return dataset.map(add_weights, num_parallel_calls=tf.data.AUTOTUNE)
+
+
+def fit_multi_worker(model, strategy, train_data, epochs, steps_per_epoch, validation_data=None,
+                     validation_steps=None, callbacks=None, class_weight=None, initial_epoch=0,
+                     verbose=1):
+    """
+    Minimal replacement for model.fit() under MultiWorkerMirroredStrategy
+
+    Keras 3's fit() fails to reduce per-replica values across workers, so the
+    step loop is driven here instead: each step runs the model's own
+    train_step (loss scaling, class weights, metrics) inside strategy.run and
+    the usual Keras callbacks are called around it. Metrics are read once
+    per epoch, which keeps the all-reduce traffic to the gradients.
+
+    Args:
+        model: Model compiled inside strategy.scope()
+        strategy: The MultiWorkerMirroredStrategy
+        train_data: Repeating tf.data.Dataset batched at the global batch size
+        epochs: Index of the last epoch to run (as in fit())
+        steps_per_epoch: Training steps per epoch
+        validation_data: Optional repeating validation tf.data.Dataset
+        validation_steps: Validation steps per epoch
+        callbacks: Keras callbacks
+        class_weight: Optional {class_index: weight} dict
+        initial_epoch: Epoch to start from
+        verbose: Print a one-line summary per epoch
+
+    Returns:
+        A History object
+    """
+    if class_weight:
+        train_data = _with_class_weights(train_data, class_weight)
+
+    train_iterator = iter(strategy.experimental_distribute_dataset(train_data))
+    val_dataset = strategy.experimental_distribute_dataset(validation_data) if validation_data is not None else None
+
+    @tf.function
+    def train_step(iterator):
+        strategy.run(model.train_step, args=(next(iterator),))
+
+    @tf.function
+    def test_step(iterator):
+        strategy.run(model.test_step, args=(next(iterator),))
+
+    def metric_logs(prefix=''):
+        return {prefix + name: float(value) for name, value in model.get_metrics_result().items()}
+
+    callback_list = tf.keras.callbacks.CallbackList(
+        callbacks, add_history=True, model=model, epochs=epochs, steps=steps_per_epoch, verbose=verbose
+    )
+    model.stop_training = False
+    callback_list.on_train_begin()
+
+    for epoch in range(initial_epoch, epochs):
+        model.reset_metrics()
+        callback_list.on_epoch_begin(epoch)
+        for step in range(steps_per_epoch):
+            callback_list.on_train_batch_begin(step)
+            train_step(train_iterator)
+            callback_list.on_train_batch_end(step)
+        logs = metric_logs()
+
+        if val_dataset is not None:
+            model.reset_metrics()
+            callback_list.on_test_begin()
+            val_iterator = iter(val_dataset)
+            for step in range(validation_steps):
+                test_step(val_iterator)
+            val_logs = metric_logs('val_')
+            callback_list.on_test_end(val_logs)
+            logs.update(val_logs)
+
+        callback_list.on_epoch_end(epoch, logs)
+        if verbose:
+            print(f"Epoch {epoch + 1}/{epochs} - " + " - ".join(f"{k}: {v:.4f}" for k, v in logs.items()))
+        if model.stop_training:
+            break
+
+    callback_list.on_train_end(logs if epochs > initial_epoch else None)
+    return model.history
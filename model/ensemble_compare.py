@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Multi-Model Comparison Engine for Deepfake Detection
+Scores a dataset with N model checkpoints using a single shared decode pass,
+then reports per-model metrics, latency, disagreement and ensemble scores.
+
+Usage:
+    # Compare three checkpoints on a labelled Test split (Fake/ and Real/ folders)
+    python ensemble_compare.py --models checkpoints/a.keras checkpoints/b.keras checkpoints/c.keras \\
+        --dataset /data/Dataset/Test --ensemble stacked
+
+    # Unlabelled manifest, write per-image scores
+    python ensemble_compare.py --models a.keras b.keras --manifest paths.csv --output scores.csv
+"""
+
+import os
+import csv
+import time
+import argparse
+
+import numpy as np
+
+from batch_score import iter_directory, iter_manifest, iter_multi_resolution_batches
+
+
+def label_from_path(path):
+    """
+    Infer the class label from the parent folder name
+
+    Returns:
+        0 for Fake, 1 for Real (matching flow_from_directory), -1 if unknown
+    """
+    folder = os.path.basename(os.path.dirname(path)).strip().lower()
+    if folder == 'fake':
+        return 0
+    if folder == 'real':
+        return 1
+    return -1
+
+
+def load_models(model_paths):
+    """
+    Load the checkpoints and group them by input resolution
+
+    Returns:
+        (models, sizes, size_index) where `sizes` lists the distinct (width, height)
+        inputs and `size_index[i]` is the position of model i's resolution in it
+    """
+    from tensorflow.keras.models import load_model
+
+    models, sizes, size_index = [], [], []
+    for path in model_paths:
+        print(f"🔄 Loading {os.path.basename(path)}")
+        model = load_model(path)
+        size = (model.input_shape[2], model.input_shape[1])
+        if size not in sizes:
+            sizes.append(size)
+        size_index.append(sizes.index(size))
+        models.append(model)
+        print(f"   ✅ Input: {size[0]}x{size[1]}")
+    return models, sizes, size_index
+
+
+def _logit(p, eps=1e-6):
+    p = np.clip(p, eps, 1 - eps)
+    return np.log(p / (1 - p))
+
+
+def compare_on_dataset(models, sizes, size_index, paths, batch_size=32, workers=None, draft=True,
+                       output_path=None, model_names=None):
+    """
+    Score every image with every model, decoding each file exactly once
+
+    Only the per-image scores (N x M floats) are kept in memory; decoded pixels
+    are released batch by batch.
+
+    Args:
+        models: List of loaded Keras models
+        sizes: Distinct (width, height) inputs required by the models
+        size_index: For each model, index into `sizes`
+        paths: Iterable of image paths
+        batch_size: Images per forward pass
+        workers: Number of decode threads
+        draft: Use JPEG draft-mode decoding
+        output_path: Optional CSV file for per-image scores
+        model_names: Column names for the per-image CSV
+
+    Returns:
+        dict with `scores` (N, M), `labels` (N,), `latency` (M,) total seconds,
+        `disagreement` (M, M) counts, `errors` and `decode_seconds`
+    """
+    from tensorflow.keras.applications.efficientnet import preprocess_input
+
+    num_models = len(models)
+    model_names = model_names or [f"model_{i}" for i in range(num_models)]
+    score_chunks, label_chunks = [], []
+    latency = np.zeros(num_models)
+    disagreement = np.zeros((num_models, num_models), dtype=np.int64)
+    errors = 0
+
+    writer = None
+    out_file = None
+    if output_path:
+        out_file = open(output_path, 'w', newline='')
+        writer = csv.writer(out_file)
+        writer.writerow(['path', 'label'] + model_names)
+
+    start = time.perf_counter()
+    try:
+        for batch in iter_multi_resolution_batches(paths, sizes, batch_size=batch_size,
+                                                   workers=workers, draft=draft):
+            errors += int((~batch.ok).sum())
+            if not batch.ok.any():
+                continue
+
+            inputs = [preprocess_input(images.astype(np.float32)) for images in batch.images]
+            scores = np.empty((int(batch.ok.sum()), num_models), dtype=np.float32)
+            for m, model in enumerate(models):
+                t0 = time.perf_counter()
+                scores[:, m] = np.asarray(model.predict_on_batch(inputs[size_index[m]])).reshape(-1)
+                latency[m] += time.perf_counter() - t0
+
+            preds = scores > 0.5
+            disagreement += (preds[:, :, None] != preds[:, None, :]).sum(axis=0)
+
+            ok_paths = [p for p, ok in zip(batch.paths, batch.ok) if ok]
+            labels = np.fromiter((label_from_path(p) for p in ok_paths), dtype=np.int8, count=len(ok_paths))
+            score_chunks.append(scores)
+            label_chunks.append(labels)
+
+            if writer:
+                writer.writerows([p, int(l)] + [f"{s:.6f}" for s in row]
+                                 for p, l, row in zip(ok_paths, labels, scores))
+    finally:
+        if out_file:
+            out_file.close()
+
+    total_seconds = time.perf_counter() - start
+    scores = np.concatenate(score_chunks) if score_chunks else np.empty((0, num_models), dtype=np.float32)
+    labels = np.concatenate(label_chunks) if label_chunks else np.empty((0,), dtype=np.int8)
+
+    return {
+        'scores': scores,
+        'labels': labels,
+        'latency': latency,
+        'disagreement': disagreement,
+        'errors': errors,
+        'decode_seconds': max(total_seconds - latency.sum(), 0.0)
+    }
+
+
+def ensemble_scores(scores, labels=None, method='mean', folds=5):
+    """
+    Combine per-model scores into one ensemble score
+
+    Args:
+        scores: (N, M) array of "Real" probabilities
+        labels: (N,) labels, required for stacking
+        method: 'mean' (average probability) or 'stacked' (logistic regression
+            on model logits, scored out-of-fold so the reported metrics are honest)
+        folds: Cross-validation folds for stacking
+
+    Returns:
+        (ensemble_scores, stacking_weights) where weights is None for 'mean'
+    """
+    if method == 'mean':
+        return scores.mean(axis=1), None
+
+    if method == 'stacked':
+        from sklearn.linear_model import LogisticRegression
+        from sklearn.model_selection import cross_val_predict
+
+        if labels is None or (labels < 0).any() or len(np.unique(labels)) < 2:
+            raise ValueError("Stacking requires Fake/Real labels for every image")
+        features = _logit(scores)
+        stacker = LogisticRegression()
+        oof = cross_val_predict(stacker, features, labels, cv=folds, method='predict_proba')[:, 1]
+        stacker.fit(features, labels)
+        weights = np.concatenate([stacker.coef_[0], stacker.intercept_])
+        return oof, weights
+
+    raise ValueError(f"Unknown ensemble method: {method}")
+
+
+def print_report(model_names, results, ensemble=None):
+    """Print per-model metrics, latency and the disagreement matrix"""
+    from sklearn.metrics import roc_auc_score
+
+    scores, labels = results['scores'], results['labels']
+    n = len(scores)
+    labelled = (labels >= 0).all() and n > 0
+    has_both = labelled and len(np.unique(labels)) == 2
+
+    print("\n" + "="*80)
+    print(" "*28 + "MODEL COMPARISON REPORT")
+    print("="*80)
+    print(f"Images scored: {n:,} (decode errors: {results['errors']:,})")
+    print(f"Time outside inference (decode wait, bookkeeping): {results['decode_seconds']:.2f}s")
+
+    print(f"\n{'MODEL':<32} | {'ms/img':>8} | {'REAL %':>7} | {'ACC':>7} | {'AUC':>7}")
+    print("-"*80)
+    preds = scores > 0.5
+    for m, name in enumerate(model_names):
+        ms = results['latency'][m] / n * 1000 if n else 0.0
+        real_pct = preds[:, m].mean() if n else 0.0
+        acc = f"{(preds[:, m] == labels).mean():.4f}" if labelled else "-"
+        auc = f"{roc_auc_score(labels, scores[:, m]):.4f}" if has_both else "-"
+        print(f"{name[:32]:<32} | {ms:>8.2f} | {real_pct:>7.2%} | {acc:>7} | {auc:>7}")
+
+    if ensemble is not None:
+        ens_scores, method, weights = ensemble
+        ms = results['latency'].sum() / n * 1000 if n else 0.0
+        ens_preds = ens_scores > 0.5
+        acc = f"{(ens_preds == labels).mean():.4f}" if labelled else "-"
+        auc = f"{roc_auc_score(labels, ens_scores):.4f}" if has_both else "-"
+        print("-"*80)
+        print(f"{'ENSEMBLE (' + method + ')':<32} | {ms:>8.2f} | {ens_preds.mean():>7.2%} | {acc:>7} | {auc:>7}")
+        if weights is not None:
+            terms = ", ".join(f"{name}: {w:+.3f}" for name, w in zip(model_names, weights[:-1]))
+            print(f"Stacking weights (logit space): {terms}, bias: {weights[-1]:+.3f}")
+
+    print("\nDisagreement matrix (fraction of images where the Real/Fake call differs):")
+    width = max(len(str(i)) for i in range(len(model_names))) + 6
+    print(" " * width + "".join(f"{'M' + str(j):>8}" for j in range(len(model_names))))
+    for i in range(len(model_names)):
+        row = results['disagreement'][i] / n if n else results['disagreement'][i]
+        print(f"{'M' + str(i):<{width}}" + "".join(f"{v:>8.2%}" for v in row))
+    for i, name in enumerate(model_names):
+        print(f"  M{i} = {name}")
+    print("="*80 + "\n")
+
+
+def main(args):
+    if bool(args.dataset) == bool(args.manifest):
+        raise SystemExit("Provide exactly one of --dataset or --manifest")
+
+    paths = iter_directory(args.dataset) if args.dataset else iter_manifest(args.manifest, column=args.column)
+    if args.ensemble == 'stacked':
+        # Labels come from the paths alone: check them before the (long) scoring pass, not after it
+        paths = list(paths)
+        labels = {label_from_path(p) for p in paths}
+        if -1 in labels or labels != {0, 1}:
+            raise SystemExit("--ensemble stacked requires every image under a Fake/ or Real/ folder, "
+                             "with both classes present")
+    model_names = [os.path.basename(p) for p in args.models]
+
+    models, sizes, size_index = load_models(args.models)
+    print(f"\nDistinct input resolutions: {', '.join(f'{w}x{h}' for w, h in sizes)}")
+
+    results = compare_on_dataset(models, sizes, size_index, paths, batch_size=args.batch_size,
+                                 workers=args.workers, draft=not args.exact_decode,
+                                 output_path=args.output, model_names=model_names)
+
+    ensemble = None
+    if args.ensemble != 'none' and len(results['scores']):
+        ens_scores, weights = ensemble_scores(results['scores'], results['labels'], method=args.ensemble)
+        ensemble = (ens_scores, args.ensemble, weights)
+
+    print_report(model_names, results, ensemble)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare N deepfake detection checkpoints on a dataset')
+    parser.add_argument('--models', nargs='+', required=True, help='Paths to .keras checkpoints')
+    parser.add_argument('--dataset', type=str, default=None,
+                        help='Directory of images (Fake/ and Real/ sub-folders provide labels)')
+    parser.add_argument('--manifest', type=str, default=None, help='CSV or Parquet manifest of image paths')
+    parser.add_argument('--column', type=str, default='path', help='Manifest column holding image paths')
+    parser.add_argument('--ensemble', choices=['none', 'mean', 'stacked'], default='mean',
+                        help='Ensemble method to report (stacked requires labels)')
+    parser.add_argument('--output', type=str, default=None, help='Optional CSV of per-image scores')
+    parser.add_argument('--batch-size', type=int, default=32, help='Images per forward pass')
+    parser.add_argument('--workers', type=int, default=None, help='Decode threads (default: CPU count)')
+    parser.add_argument('--exact-decode', action='store_true', help='Disable JPEG draft-mode decoding')
+
+    main(parser.parse_args())
@@ -3,6 +3,7 @@ Evaluation Module for Deepfake Detection Model
 Evaluates model performance on test set and generates metrics
 """
 
+import time
 import numpy as np
 from sklearn.metrics import classification_report, confusion_matrix, roc_auc_score, roc_curve
 import matplotlib.pyplot as plt
@@ -23,8 +24,9 @@ def evaluate_model(model, test_generator):
     print("Evaluating Model on Test Set")
     print("="*50)
     
-    # Evaluate model
-    test_loss, test_accuracy = model.evaluate(test_generator, verbose=1)
+    # Evaluate model (tf.data DatasetSplit objects are fed through their dataset)
+    test_data = getattr(test_generator, 'dataset', test_generator)
+    test_loss, test_accuracy = model.evaluate(test_data, verbose=1)
     
     print(f"\nTest Loss: {test_loss:.4f}")
     print(f"Test Accuracy: {test_accuracy:.4f}")
@@ -44,10 +46,11 @@ def generate_predictions(model, test_generator):
         Predictions and true labels
     """
     # Reset generator
-    test_generator.reset()
+    if hasattr(test_generator, 'reset'):
+        test_generator.reset()
     
     # Generate predictions
-    predictions = model.predict(test_generator, verbose=1)
+    predictions = model.predict(getattr(test_generator, 'dataset', test_generator), verbose=1)
     
     # Get true labels
     true_labels = test_generator.classes
@@ -154,6 +157,89 @@ def full_evaluation(model, test_generator, class_names=['Fake', 'Real']):
     print(f"  Test Loss: {test_loss:.4f}")
     print(f"  AUC Score: {auc_score:.4f}")
 
+def compare_tta_policies(model, test_generator, policies=('none', 'flip', 'crop', 'multiscale', 'full')):
+    """
+    Report the AUC each test-time augmentation policy buys against its latency cost
+    
+    Every policy scores the whole test set through tta.predict_tta (all views of
+    a batch in one forward pass). Only the forward passes are timed, after one
+    untimed warm-up batch per policy, so decoding does not blur the comparison.
+    
+    Args:
+        model: Trained Keras model
+        test_generator: Test data generator (or DatasetSplit)
+        policies: Policy names or view lists (see tta.py)
+        
+    Returns:
+        List of dicts with policy, views, auc, accuracy and ms_per_image
+    """
+    from tta import parse_policy, predict_tta
+    
+    test_data = getattr(test_generator, 'dataset', test_generator)
+    # Parse every policy first so a typo fails before any scoring
+    parsed = [(policy, parse_policy(policy)) for policy in policies]
+    rows = []
+    for policy, views in parsed:
+        print(f"Scoring test set with TTA policy '{policy}' ({len(views)} views)...")
+        scores, labels, seconds = [], [], 0.0
+        warmed_up = False
+        for images, batch_labels in test_data:
+            if not warmed_up:
+                predict_tta(model, images, views)
+                warmed_up = True
+            start = time.perf_counter()
+            batch_scores, _ = predict_tta(model, images, views)
+            seconds += time.perf_counter() - start
+            scores.append(batch_scores)
+            labels.append(np.asarray(batch_labels).reshape(-1).astype(int))
+        scores = np.concatenate(scores)
+        labels = np.concatenate(labels)
+        rows.append({
+            'policy': policy,
+            'views': len(views),
+            'auc': roc_auc_score(labels, scores),
+            'accuracy': float(((scores > 0.5).astype(int) == labels).mean()),
+            'ms_per_image': seconds / len(scores) * 1000
+        })
+    
+    # Gains and costs relative to the first policy (the plain forward pass by default)
+    base = rows[0]
+    print("\n" + "="*80)
+    print("Test-Time Augmentation: AUC vs Latency")
+    print("="*80)
+    print(f"{'Policy':<24}{'Views':>6}{'AUC':>9}{'ΔAUC':>9}{'Accuracy':>10}{'ms/image':>11}{'Latency':>10}")
+    for row in rows:
+        print(f"{row['policy']:<24}{row['views']:>6}{row['auc']:>9.4f}{row['auc'] - base['auc']:>+9.4f}"
+              f"{row['accuracy']:>10.4f}{row['ms_per_image']:>11.2f}"
+              f"{row['ms_per_image'] / base['ms_per_image']:>9.1f}x")
+    print("="*80 + "\n")
+    return rows
+
 if __name__ == "__main__":
-    # This module is meant to be imported, not run directly
-    print("This module provides evaluation utilities for the deepfake detection model.")
+    import argparse
+    from tensorflow.keras.models import load_model
+    from data_preparation_optimized import create_tf_datasets_optimized
+    
+    parser = argparse.ArgumentParser(description='Evaluate a trained model on the test split')
+    parser.add_argument('--model', type=str, required=True, help='Trained .keras model')
+    parser.add_argument('--dataset-path', type=str, required=True,
+                        help='Dataset root; flat datasets use the Test split of their split manifest')
+    parser.add_argument('--batch-size', type=int, default=32, help='Evaluation batch size')
+    parser.add_argument('--ignore-exclusions', action='store_true',
+                        help="Include files from the dataset's exclusion list (phash_index.py)")
+    parser.add_argument('--tta', type=str, nargs='+', metavar='POLICY',
+                        help='Instead of the full evaluation, compare test-time augmentation policies '
+                             '(e.g. --tta none flip crop multiscale full; see tta.py)')
+    args = parser.parse_args()
+    
+    model = load_model(args.model)
+    _, img_height, img_width, _ = model.input_shape
+    # Only the test pipeline is iterated; the file lists come from the manifest (no directory scan)
+    _, _, test = create_tf_datasets_optimized(args.dataset_path, img_width=img_width, img_height=img_height,
+                                              batch_size=args.batch_size,
+                                              use_exclusions=not args.ignore_exclusions)
+    if args.tta:
+        compare_tta_policies(model, test, args.tta)
+    else:
+        class_names = sorted(test.class_indices, key=test.class_indices.get)
+        full_evaluation(model, test, class_names)
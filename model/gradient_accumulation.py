@@ -0,0 +1,104 @@
+"""
+Gradient Accumulation for Deepfake Detection Training
+Splits each training batch into K micro-batches and accumulates their
+gradients before a single optimizer update, so large effective batches fit in
+the memory of a small one.
+"""
+
+import math
+
+import tensorflow as tf
+from keras.utils import unpack_x_y_sample_weight
+
+
+def accumulation_steps_for(effective_batch_size, batch_size):
+    """
+    Number of micro-batches needed to reach the effective batch size
+
+    Args:
+        effective_batch_size: Images per optimizer update
+        batch_size: Images per forward/backward pass (what fits in memory)
+
+    Returns:
+        Accumulation factor K (1 = no accumulation)
+    """
+    if not effective_batch_size or effective_batch_size <= batch_size:
+        return 1
+    steps = math.ceil(effective_batch_size / batch_size)
+    if effective_batch_size % batch_size:
+        print(f"⚠️  Effective batch {effective_batch_size} is not a multiple of {batch_size}; "
+              f"micro-batches will be uneven ({steps} per update)")
+    return steps
+
+
+def enable_gradient_accumulation(model, accumulation_steps):
+    """
+    Replace the model's train_step with one that accumulates over micro-batches
+
+    Each batch delivered by the data pipeline is cut into `accumulation_steps`
+    slices. Slices run one after another inside a tf.while_loop, so only one
+    micro-batch of activations is alive at a time. Each slice's mean loss is
+    weighted by its share of the batch, which makes the update identical to
+    one full-batch step for the focal loss, class/sample weights and the
+    mixed-precision loss scale (BatchNorm statistics are the exception: they
+    see micro-batches).
+
+    The override lives on the model instance, so it survives recompiling
+    (e.g. unfreeze_base_model) and is ignored by model.save().
+
+    Args:
+        model: Compiled Keras model
+        accumulation_steps: Micro-batches per optimizer update (1 restores the default step)
+
+    Returns:
+        The same model
+    """
+    if accumulation_steps <= 1:
+        model.__dict__.pop('train_step', None)
+        model.train_function = None
+        return model
+
+    def train_step(data):
+        x, y, sample_weight = unpack_x_y_sample_weight(data)
+        batch_size = tf.shape(x)[0]
+        micro_size = (batch_size + accumulation_steps - 1) // accumulation_steps
+        num_slices = (batch_size + micro_size - 1) // micro_size
+
+        trainable_weights = model.trainable_weights
+
+        def accumulate(i, accumulated):
+            start = i * micro_size
+            end = tf.minimum(start + micro_size, batch_size)
+            x_micro, y_micro = x[start:end], y[start:end]
+            weight_micro = sample_weight[start:end] if sample_weight is not None else None
+            fraction = tf.cast(end - start, tf.float32) / tf.cast(batch_size, tf.float32)
+
+            with tf.GradientTape() as tape:
+                y_pred = model(x_micro, training=True)
+                loss = model.compute_loss(x=x_micro, y=y_micro, y_pred=y_pred,
+                                          sample_weight=weight_micro, training=True)
+                scaled_loss = model.optimizer.scale_loss(loss * fraction)
+            gradients = tape.gradient(scaled_loss, trainable_weights)
+
+            # compute_loss divides by the replica count for distribution; undo it for the logged loss
+            replicas = tf.distribute.get_strategy().num_replicas_in_sync
+            model._loss_tracker.update_state(loss * replicas, sample_weight=end - start)
+            model.compute_metrics(x_micro, y_micro, y_pred, sample_weight=weight_micro)
+            return i + 1, [a + tf.cast(g, a.dtype) for a, g in zip(accumulated, gradients)]
+
+        # A while_loop (not a Python loop) keeps the micro-batches sequential,
+        # so their activations are never alive at the same time
+        _, accumulated = tf.while_loop(
+            lambda i, _: i < num_slices,
+            accumulate,
+            [tf.constant(0, dtype=num_slices.dtype), [tf.zeros_like(w) for w in trainable_weights]],
+            parallel_iterations=1
+        )
+
+        model.optimizer.apply_gradients(zip(accumulated, trainable_weights))
+        return model.get_metrics_result()
+
+    model.train_step = train_step
+    model.train_function = None  # force a retrace with the new step
+    print(f"✓ Gradient accumulation: {accumulation_steps} micro-batches per update")
+    return model
@@ -0,0 +1,275 @@
+"""
+Hard-Example Mining for Deepfake Detection Training
+BinaryFocalCrossentropy down-weights easy examples inside a batch, but every
+image still costs a full forward and backward pass every epoch. Hard-example
+mining keeps a per-sample record of the model's loss and score and uses it to
+decide what to train on:
+
+    - after every epoch the images drawn in that epoch, plus the ones scored
+      longest ago, are scored in inference mode and their loss is written to a
+      LossStore (a few numpy arrays indexed by sample id, saved as .npz)
+    - later epochs draw images with probability proportional to loss ** power,
+      mixed with a uniform share so every image keeps being revisited: hard
+      images are drawn several times per epoch, easy ones rarely
+    - an epoch covers only a fraction of the training set, so the skipped easy
+      images are compute saved
+
+Sample ids are positions in the training split's file list, which the split
+manifest (split_manifest.py) keeps stable between runs.
+"""
+
+import os
+import hashlib
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+from data_preparation_optimized import DatasetSplit, build_image_dataset, decode_batches
+
+STORE_FILE = 'hard_mining_losses.npz'
+
+
+def files_fingerprint(filepaths):
+    """Identify a file list, so a saved store is only reused for the same training split"""
+    root = os.path.commonpath(filepaths) if filepaths else ''
+    return hashlib.sha1('\n'.join(os.path.relpath(p, root) for p in filepaths).encode()).hexdigest()
+
+
+def focal_loss(labels, scores, gamma=2.0, epsilon=1e-7):
+    """Per-sample binary focal loss (gamma=0 is plain binary cross-entropy), as in model.py"""
+    scores = np.clip(np.asarray(scores, dtype=np.float64), epsilon, 1 - epsilon)
+    p_t = np.where(np.asarray(labels) > 0.5, scores, 1 - scores)
+    return (-(1 - p_t) ** gamma * np.log(p_t)).astype(np.float32)
+
+
+class LossStore:
+    """
+    Latest loss and score of every training sample
+
+    Losses are smoothed over updates (exponential moving average) so a single
+    noisy epoch does not flip an image between hard and easy. Samples that
+    were never scored count as the hardest, so new images get drawn early.
+    """
+
+    def __init__(self, num_samples, fingerprint=None, smoothing=0.5):
+        self.loss = np.full(num_samples, np.nan, dtype=np.float32)
+        self.score = np.full(num_samples, np.nan, dtype=np.float32)
+        self.last_epoch = np.full(num_samples, -1, dtype=np.int32)
+        self.times_drawn = np.zeros(num_samples, dtype=np.int32)
+        self.fingerprint = fingerprint
+        self.smoothing = smoothing
+        self.version = 0
+
+    def __len__(self):
+        return len(self.loss)
+
+    def update(self, ids, losses, scores, epoch):
+        """Record new losses/scores for sample ids (unique)"""
+        old = self.loss[ids]
+        self.loss[ids] = np.where(np.isnan(old), losses, self.smoothing * old + (1 - self.smoothing) * losses)
+        self.score[ids] = scores
+        self.last_epoch[ids] = epoch
+        self.version += 1
+
+    def hardness(self):
+        """Loss per sample, unscored samples set to the highest loss seen (1.0 if none)"""
+        scored = ~np.isnan(self.loss)
+        fill = self.loss[scored].max() if scored.any() else 1.0
+        return np.where(scored, self.loss, fill)
+
+    def stalest(self, count, exclude=()):
+        """Up to `count` sample ids scored longest ago (never scored first)"""
+        candidates = np.setdiff1d(np.arange(len(self)), exclude)
+        order = np.argsort(self.last_epoch[candidates], kind='stable')
+        return candidates[order[:count]]
+
+    def summary(self, hard_quantile=0.9):
+        """Scored count, mean loss, and the share of the total loss held by the hardest images"""
+        scored = ~np.isnan(self.loss)
+        if not scored.any():
+            return {'scored': 0}
+        losses = np.sort(self.loss[scored])
+        hard = losses[int(hard_quantile * len(losses)):]
+        return {
+            'scored': int(scored.sum()),
+            'mean_loss': float(losses.mean()),
+            'hard_threshold': float(hard[0]),
+            'hard_loss_share': float(hard.sum() / max(losses.sum(), 1e-12))
+        }
+
+    def save(self, path):
+        """Write the store atomically as .npz"""
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, loss=self.loss, score=self.score, last_epoch=self.last_epoch,
+                     times_drawn=self.times_drawn, fingerprint=np.array(self.fingerprint or ''),
+                     smoothing=np.array(self.smoothing))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path, num_samples, fingerprint=None):
+        """Saved store for this file list, or None if missing or made for other files"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if len(data['loss']) != num_samples or (fingerprint and str(data['fingerprint']) != fingerprint):
+                return None
+            store = cls(num_samples, fingerprint, float(data['smoothing']))
+            store.loss[:] = data['loss']
+            store.score[:] = data['score']
+            store.last_epoch[:] = data['last_epoch']
+            store.times_drawn[:] = data['times_drawn']
+        return store
+
+
+class HardExampleSampler:
+    """
+    Endless stream of sample ids, drawn with replacement by hardness
+
+    p(i) = (1 - uniform_mix) * loss_i ** power / sum(loss ** power) + uniform_mix / n
+
+    Ids are drawn one batch-sized chunk at a time and the probabilities are
+    recomputed whenever the store changes, so the ids drawn since the last
+    epoch end are (up to a few prefetched batches) the ones trained on, and
+    new losses take effect right away. Called by tf.data (Dataset.from_generator).
+    """
+
+    def __init__(self, store, power=1.0, uniform_mix=0.2, chunk=32, seed=1337):
+        self.store = store
+        self.power = power
+        self.uniform_mix = uniform_mix
+        self.chunk = chunk
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+        self._drawn = []
+        self._cached = (None, None)
+
+    def probabilities(self):
+        version, p = self._cached
+        if version != self.store.version:
+            weights = self.store.hardness().astype(np.float64) ** self.power
+            n = len(weights)
+            p = (1 - self.uniform_mix) * weights / max(weights.sum(), 1e-12) + self.uniform_mix / n
+            p /= p.sum()
+            self._cached = (self.store.version, p)
+        return p
+
+    def draw(self, count):
+        with self._lock:
+            ids = self.rng.choice(len(self.store), size=count, p=self.probabilities())
+            self._drawn.append(ids)
+            np.add.at(self.store.times_drawn, ids, 1)
+        return ids
+
+    def take_drawn(self):
+        """Unique ids drawn since the last call"""
+        with self._lock:
+            drawn = np.unique(np.concatenate(self._drawn)) if self._drawn else np.array([], dtype=np.int64)
+            self._drawn = []
+        return drawn
+
+    def __call__(self):
+        while True:
+            yield from self.draw(self.chunk)
+
+
+def mined_dataset(filepaths, labels, sampler, img_width, img_height, batch_size, resolution=None):
+    """Endless training pipeline that reads the images the sampler picks (use with steps_per_epoch)"""
+    files = tf.constant(list(filepaths))
+    label_values = tf.constant(np.asarray(labels, dtype=np.float32))
+    ds = tf.data.Dataset.from_generator(sampler, output_signature=tf.TensorSpec((), tf.int64))
+    ds = ds.map(lambda i: (tf.gather(files, i), tf.gather(label_values, i)))
+    return decode_batches(ds, img_width, img_height, batch_size, training=True, drop_remainder=True,
+                          resolution=resolution)
+
+
+class HardMining(tf.keras.callbacks.Callback):
+    """
+    Score drawn and stale samples after every epoch and update the loss store
+
+    The loss is the model's focal loss (its gamma is read from the compiled
+    loss; plain cross-entropy counts as gamma=0). The store is saved after
+    every update when store_path is set, so resumed runs keep their history.
+    """
+
+    def __init__(self, filepaths, labels, sampler, img_width, img_height, batch_size,
+                 refresh_fraction=0.1, store_path=None, resolution=None):
+        super().__init__()
+        self.filepaths = np.asarray(filepaths)
+        self.labels = np.asarray(labels)
+        self.sampler = sampler
+        self.store = sampler.store
+        self.img_width = img_width
+        self.img_height = img_height
+        self.batch_size = batch_size
+        self.refresh_fraction = refresh_fraction
+        self.store_path = store_path
+        self.resolution = resolution
+
+    def score(self, ids):
+        """Model scores for sample ids, at the current training resolution"""
+        ds = build_image_dataset(self.filepaths[ids], self.labels[ids], self.img_width, self.img_height,
+                                 self.batch_size, resolution=self.resolution)
+        return self.model.predict(ds, verbose=0).reshape(-1).astype(np.float32)
+
+    def on_epoch_end(self, epoch, logs=None):
+        drawn = self.sampler.take_drawn()
+        stale = self.store.stalest(int(self.refresh_fraction * len(self.store)), exclude=drawn)
+        ids = np.union1d(drawn, stale).astype(np.int64)
+        if len(ids) == 0:
+            return
+        scores = self.score(ids)
+        gamma = float(getattr(self.model.loss, 'gamma', 0.0))
+        self.store.update(ids, focal_loss(self.labels[ids], scores, gamma), scores, epoch)
+        if self.store_path:
+            self.store.save(self.store_path)
+
+        summary = self.store.summary()
+        print(f"\n⛏️  Mining: scored {len(ids)} images | {summary['scored']}/{len(self.store)} known | "
+              f"mean loss {summary['mean_loss']:.4f} | top 10% hold {summary['hard_loss_share']:.0%} of the loss")
+        if logs is not None:
+            logs['mining_scored'] = float(len(ids))
+            logs['mining_mean_loss'] = summary['mean_loss']
+
+
+def create_mined_split(train, img_width, img_height, batch_size, epoch_fraction=0.6, power=1.0,
+                       uniform_mix=0.2, refresh_fraction=0.1, store_dir=None, resolution=None, seed=1337):
+    """
+    Replace a training DatasetSplit with a hard-example-mining one
+
+    Args:
+        train: Training DatasetSplit from create_tf_datasets_optimized()
+        img_width, img_height, batch_size: As for the training pipeline
+        epoch_fraction: Images drawn per epoch, as a share of the training set
+        power: Sharpness of the preference for hard images (0 = uniform)
+        uniform_mix: Share of draws made uniformly, so easy images are still revisited
+        refresh_fraction: Share of the training set re-scored each epoch on top
+            of the drawn images (longest-unscored first)
+        store_dir: Directory for the persistent loss store (None = memory only)
+        resolution: Optional progressive-resizing tf.Variable
+        seed: Sampling seed
+
+    Returns:
+        (DatasetSplit whose `samples` is the per-epoch draw count, HardMining callback)
+    """
+    fingerprint = files_fingerprint(train.filepaths)
+    store_path = os.path.join(store_dir, STORE_FILE) if store_dir else None
+    store = LossStore.load(store_path, train.samples, fingerprint) if store_path else None
+    if store is not None:
+        print(f"⛏️  Loaded loss store with {store.summary()['scored']} scored images from {store_path}")
+    else:
+        store = LossStore(train.samples, fingerprint)
+    if store_dir:
+        os.makedirs(store_dir, exist_ok=True)
+
+    sampler = HardExampleSampler(store, power=power, uniform_mix=uniform_mix, chunk=batch_size, seed=seed)
+    dataset = mined_dataset(train.filepaths, train.classes, sampler, img_width, img_height, batch_size,
+                            resolution=resolution)
+    mined = DatasetSplit(dataset, train.filepaths, train.classes, batch_size, train.class_indices)
+    mined.samples = max(batch_size, int(round(epoch_fraction * train.samples)))
+    print(f"⛏️  Hard-example mining: {mined.samples} of {train.samples} images drawn per epoch")
+
+    callback = HardMining(train.filepaths, train.classes, sampler, img_width, img_height, batch_size,
+                          refresh_fraction=refresh_fraction, store_path=store_path, resolution=resolution)
+    return mined, callback
@@ -12,17 +12,39 @@ Usage:
     
     # Full training with larger batch size
     python main_optimized.py --dataset-path dataset --epochs 20 --batch-size 64
+    
+    # Continue an interrupted run exactly where it stopped
+    python main_optimized.py --dataset-path dataset --epochs 20 --resume
+    
+    # Multi-worker data-parallel training (run once per worker with its own TF_CONFIG)
+    TF_CONFIG='{"cluster": {"worker": ["host1:12345", "host2:12345"]}, "task": {"type": "worker", "index": 0}}' \
+        python main_optimized.py --dataset-path /shared/dataset --batch-size 24 --epochs 20
 """
 
 import os
+import math
 import argparse
+import contextlib
+from distributed import get_distribution_strategy, worker_info, scale_learning_rate, LearningRateWarmup
+from distributed import chief_only_dir, cleanup_worker_dir
 from data_preparation_optimized import get_dataset_path, inspect_dataset, create_data_generators_optimized
-from model import create_model, unfreeze_base_model
+from data_preparation_optimized import create_tf_datasets_optimized, is_tar_dataset
+from model import create_model, unfreeze_base_model, with_input_resolution
+from progressive_resizing import progressive_schedule, ProgressiveResizing
+from hard_mining import create_mined_split
+from training_profiler import TrainingInstrumentation
+from runtime_profile import load_runtime_profile, apply_threading
+from gradient_accumulation import accumulation_steps_for, enable_gradient_accumulation
 from train_optimized import train_model_optimized, plot_training_history
 from evaluate import full_evaluation
 from tensorflow.keras.models import load_model
 import tensorflow as tf
 
+# Tuned thread counts (autotune.py) and the multi-worker strategy (from
+# TF_CONFIG) must both be set up before any other TF op runs
+training_profile = apply_threading(load_runtime_profile(), 'training')
+strategy = get_distribution_strategy()
+
 # Print optimization status
 print("\n" + "="*70)
 print(" "*20 + "⚡ OPTIMIZATION STATUS ⚡")
@@ -31,6 +53,7 @@ print(f"✓ TensorFlow version: {tf.__version__}")
 print(f"✓ GPU Available: {len(tf.config.list_physical_devices('GPU')) > 0}")
 print(f"✓ Mixed Precision: {'Enabled' if tf.keras.mixed_precision.global_policy().name == 'mixed_float16' else 'Disabled'}")
 print(f"✓ XLA Compilation: Enabled")
+print(f"✓ Workers: {worker_info(strategy)[0]}")
 print("="*70 + "\n")
 
 def main(args):
@@ -44,74 +67,149 @@ def main(args):
     print(" "*10 + "🚀 OPTIMIZED DEEPFAKE DETECTION MODEL PIPELINE")
     print("="*70 + "\n")
     
+    num_workers, worker_index, is_chief = worker_info(strategy)
+    # Multi-worker sharding, progressive resizing and hard-example mining are only available with tf.data
+    use_tf_data = (args.data_pipeline == 'tfdata' or strategy is not None or args.progressive_resizing
+                   or args.hard_mining)
+    # With --effective-batch-size the pipeline delivers full effective batches
+    # and the model splits each into --batch-size micro-batches
+    accumulation_steps = accumulation_steps_for(args.effective_batch_size, args.batch_size)
+    data_batch_size = args.effective_batch_size if accumulation_steps > 1 else args.batch_size
+    # Batch sizes are per worker; the global batch grows with the cluster
+    global_batch_size = data_batch_size * num_workers
+    learning_rate = scale_learning_rate(args.learning_rate, num_workers)
+    scope = strategy.scope() if strategy is not None else contextlib.nullcontext()
+    
+    if num_workers > 1:
+        print(f"Global batch size: {global_batch_size} ({data_batch_size} x {num_workers} workers)")
+        print(f"Scaled learning rate: {learning_rate:g} (base {args.learning_rate:g})")
+    
+    def create_data(img_width, img_height, train_resolution=None):
+        if use_tf_data:
+            return create_tf_datasets_optimized(
+                full_dataset_path,
+                img_width=img_width,
+                img_height=img_height,
+                batch_size=global_batch_size,
+                num_workers=num_workers,
+                worker_index=worker_index,
+                train_resolution=train_resolution,
+                use_exclusions=not args.ignore_exclusions
+            )
+        return create_data_generators_optimized(
+            full_dataset_path,
+            img_width=img_width,
+            img_height=img_height,
+            batch_size=data_batch_size,
+            use_exclusions=not args.ignore_exclusions
+        )
+    
     # Step 1: Get Offline Dataset Path
     print("Step 1: Loading Offline Dataset...")
     dataset_path = get_dataset_path(args.dataset_path)
     full_dataset_path = inspect_dataset(dataset_path)
+    if args.hard_mining and not args.skip_training and is_tar_dataset(full_dataset_path):
+        # Mining re-reads training images by file path; shard datasets only keep the source paths as names
+        raise SystemExit("❌ --hard-mining is not supported for tar shard datasets (tar_dataset.py): "
+                         "train on the original image folders or drop --hard-mining")
     
-    # Step 2: Create Optimized Data Generators
-    print("\nStep 2: Creating OPTIMIZED Data Generators...")
-    train_gen, val_gen, test_gen = create_data_generators_optimized(
-        full_dataset_path,
-        img_width=args.img_width,
-        img_height=args.img_height,
-        batch_size=args.batch_size
-    )
-    
-    # Step 3: Create or Load Model
+    # Step 2: Create or Load Model (first, so the data is built once at the model's resolution)
     if args.load_model:
-        print(f"\nStep 3: Loading Model from {args.load_model}...")
-        model = load_model(args.load_model)
-        
-        # Recompile with optimizations
-        print("Recompiling loaded model with optimizations...")
-        from tensorflow.keras.optimizers import Adam
-        from tensorflow.keras.losses import BinaryFocalCrossentropy
-        from tensorflow.keras import mixed_precision
-        
-        # Create optimizer with mixed precision
-        optimizer = Adam(learning_rate=args.learning_rate)
-        optimizer = mixed_precision.LossScaleOptimizer(optimizer)
-        
-        model.compile(
-            optimizer=optimizer,
-            loss=BinaryFocalCrossentropy(gamma=2.0, from_logits=False),
-            metrics=['accuracy']
-        )
+        print(f"\nStep 2: Loading Model from {args.load_model}...")
+        with scope:
+            model = load_model(args.load_model)
+            
+            # Recompile with optimizations
+            print("Recompiling loaded model with optimizations...")
+            from tensorflow.keras.optimizers import Adam
+            from tensorflow.keras.losses import BinaryFocalCrossentropy
+            from tensorflow.keras import mixed_precision
+            
+            # Create optimizer with mixed precision
+            optimizer = Adam(learning_rate=learning_rate)
+            optimizer = mixed_precision.LossScaleOptimizer(optimizer)
+            
+            model.compile(
+                optimizer=optimizer,
+                loss=BinaryFocalCrossentropy(gamma=2.0, from_logits=False),
+                metrics=['accuracy']
+            )
         
         # Update args with the actual model input shape
         args.img_height = model.input_shape[1]
         args.img_width = model.input_shape[2]
         print(f"✓ Model Input Resolution: {args.img_width}x{args.img_height}")
     else:
-        print(f"\nStep 3: Creating {args.model_type} Model...")
+        print(f"\nStep 2: Creating {args.model_type} Model...")
         img_width = args.img_width if args.img_width > 0 else None
         img_height = args.img_height if args.img_height > 0 else None
         
-        model = create_model(
-            model_type=args.model_type,
-            img_width=img_width,
-            img_height=img_height,
-            learning_rate=args.learning_rate
-        )
+        with scope:
+            model = create_model(
+                model_type=args.model_type,
+                img_width=img_width,
+                img_height=img_height,
+                learning_rate=learning_rate
+            )
         
         args.img_width = model.input_shape[2]
         args.img_height = model.input_shape[1]
         print(f"✓ Model Input Resolution: {args.img_width}x{args.img_height}")
     
+    # Step 3: Create Optimized Data Pipeline at the model resolution
+    print("\nStep 3: Creating OPTIMIZED Data Generators...")
+    progressive = None
+    if args.progressive_resizing and not args.skip_training:
+        schedule = progressive_schedule(args.epochs, args.img_height, start_size=args.progressive_start_size,
+                                        stages=args.progressive_stages,
+                                        final_fraction=args.progressive_final_fraction)
+        progressive = ProgressiveResizing(schedule, aspect_ratio=args.img_width / args.img_height)
+        print("📐 Progressive resizing schedule: " +
+              ", ".join(f"epoch {e + 1}+: {size}px" for e, size in schedule))
+        # The model must accept every size in the schedule
+        with scope:
+            model = with_input_resolution(model)
+    train_gen, val_gen, test_gen = create_data(args.img_width, args.img_height,
+                                               progressive.resolution if progressive else None)
+    
+    # Kept across the recompile in unfreeze_base_model(), where memory is tightest
+    if accumulation_steps > 1:
+        print(f"Effective batch size: {data_batch_size} ({accumulation_steps} x {args.batch_size} micro-batches)")
+        enable_gradient_accumulation(model, accumulation_steps)
+    
+    # Oversample hard images and skip most easy ones, by a per-image loss store kept with the checkpoints
+    mining = None
+    if args.hard_mining and not args.skip_training:
+        if num_workers > 1:
+            print("⚠️  Hard-example mining is not supported with multiple workers; training on all images")
+        else:
+            train_gen, mining = create_mined_split(
+                train_gen, args.img_width, args.img_height, global_batch_size,
+                epoch_fraction=args.mining_fraction,
+                power=args.mining_power,
+                refresh_fraction=args.mining_refresh,
+                store_dir=args.checkpoint_dir,
+                resolution=progressive.resolution if progressive else None
+            )
+    
     # Step 4: Train Model (if not skipped)
     if not args.skip_training:
         print("\nStep 4: Training Model with OPTIMIZATIONS...")
         
-        # Re-create generators if resolution changed
-        if args.img_width != 150 or args.img_height != 150:
-             print("Re-creating data generators with correct model resolution...")
-             train_gen, val_gen, test_gen = create_data_generators_optimized(
-                full_dataset_path,
-                img_width=args.img_width,
-                img_height=args.img_height,
-                batch_size=args.batch_size
+        instrumentation = None
+        if args.instrument or args.profile_steps:
+            instrumentation = TrainingInstrumentation(
+                log_path=args.instrument_log,
+                batch_size=train_gen.batch_size,
+                profile_steps=args.profile_steps,
+                profile_dir=args.profile_dir
             )
+        
+        # Ramp up to the scaled learning rate over the first epoch
+        extra_callbacks = [callback for callback in (progressive, mining) if callback]
+        if num_workers > 1:
+            steps_per_epoch = max(math.ceil(train_gen.samples / train_gen.batch_size), 1)
+            extra_callbacks.append(LearningRateWarmup(args.learning_rate, learning_rate, steps_per_epoch))
             
         history = train_model_optimized(
             model,
@@ -119,29 +217,55 @@ def main(args):
             val_gen,
             epochs=args.epochs,
             checkpoint_dir=args.checkpoint_dir,
-            model_name=args.model_name
+            model_name=args.model_name,
+            resume=args.resume,
+            phase='train',
+            save_every_steps=args.checkpoint_every_steps,
+            strategy=strategy,
+            extra_callbacks=extra_callbacks,
+            instrumentation=instrumentation
         )
         
         # Plot training history
-        plot_training_history(history, save_path='training_history_optimized.png')
+        if is_chief:
+            plot_training_history(history, save_path='training_history_optimized.png')
         
         # Fine-tuning (optional)
         if args.fine_tune:
             print("\nStep 4b: Fine-tuning Model...")
-            model = unfreeze_base_model(model, num_layers_to_unfreeze=args.unfreeze_layers)
+            if progressive:
+                # Fine-tune at native resolution even if training stopped early at a lower one
+                progressive.set_epoch(args.epochs)
+            with scope:
+                model = unfreeze_base_model(model, num_layers_to_unfreeze=args.unfreeze_layers)
             history_fine = train_model_optimized(
                 model,
                 train_gen,
                 val_gen,
                 epochs=args.fine_tune_epochs,
-                checkpoint_dir=args.checkpoint_dir
+                checkpoint_dir=args.checkpoint_dir,
+                resume=args.resume,
+                phase='fine_tune',
+                save_every_steps=args.checkpoint_every_steps,
+                strategy=strategy,
+                extra_callbacks=[mining] if mining else None,
+                instrumentation=instrumentation
             )
-            plot_training_history(history_fine, save_path='fine_tuning_history_optimized.png')
+            if is_chief:
+                plot_training_history(history_fine, save_path='fine_tuning_history_optimized.png')
     else:
         print("\nStep 4: Skipping training...")
     
+    if progressive:
+        # Back to a fixed-resolution model for evaluation, saving and serving
+        with scope:
+            model = with_input_resolution(model, args.img_width, args.img_height)
+    
     # Step 5: Evaluate Model
-    if not args.skip_evaluation:
+    if strategy is not None and not args.skip_evaluation:
+        print("\nStep 5: Skipping evaluation in multi-worker mode.")
+        print("   Evaluate the saved model in a single process instead.")
+    elif not args.skip_evaluation:
         print("\nStep 5: Evaluating Model...")
         full_evaluation(model, test_gen, class_names=['Fake', 'Real'])
     else:
@@ -149,9 +273,13 @@ def main(args):
     
     # Save final model
     if args.save_model:
-        final_model_path = os.path.join(args.checkpoint_dir, args.model_name)
+        # Every worker saves (collective reads), only the chief's copy is kept
+        save_dir = chief_only_dir(args.checkpoint_dir, strategy)
+        final_model_path = os.path.join(save_dir, args.model_name)
         model.save(final_model_path)
-        print(f"\n✓ Final model saved to: {final_model_path}")
+        cleanup_worker_dir(save_dir, args.checkpoint_dir)
+        if is_chief:
+            print(f"\n✓ Final model saved to: {final_model_path}")
     
     print("\n" + "="*70)
     print(" "*22 + "🎉 PIPELINE COMPLETED!")
@@ -171,15 +299,38 @@ Examples:
   
   # Train with larger batch size for better GPU utilization
   python main_optimized.py --batch-size 64 --epochs 20
+  
+  # Progressive resizing: 128px -> 380px over the first 70% of the epochs
+  python main_optimized.py --model-type EfficientNetB4 --epochs 20 --progressive-resizing
+  
+  # Hard-example mining: 60% of the images per epoch, hard ones drawn more often
+  python main_optimized.py --epochs 20 --hard-mining --mining-fraction 0.6
+  
+  # Find input-pipeline stalls: per-step timing plus a profiler trace of steps 20-30
+  python main_optimized.py --epochs 2 --instrument --profile-steps 20 30
+  
+  # Large-resolution fine-tuning: 48 images per update, 12 per forward pass
+  python main_optimized.py --model-type EfficientNetB4 --fine-tune --batch-size 12 --effective-batch-size 48
+  
+  # Resume after a crash or preemption (same arguments + --resume)
+  python main_optimized.py --epochs 20 --resume --checkpoint-every-steps 200
         """
     )
     
     # Data parameters
     parser.add_argument('--img-width', type=int, default=0, help='Image width (0 = auto-select)')
     parser.add_argument('--img-height', type=int, default=0, help='Image height (0 = auto-select)')
-    parser.add_argument('--batch-size', type=int, default=48, help='Batch size (default: 48, optimized for M4)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                       help='Batch size per worker (default: tuned value from autotune.py, else 48)')
+    parser.add_argument('--effective-batch-size', type=int, default=None,
+                       help='Images per optimizer update; larger than --batch-size enables gradient '
+                            'accumulation over --batch-size micro-batches')
+    parser.add_argument('--data-pipeline', choices=['generators', 'tfdata'], default='generators',
+                       help='Keras generators or tf.data (tf.data is always used for multi-worker runs)')
     
     parser.add_argument('--dataset-path', type=str, default=None, help='Path to dataset directory')
+    parser.add_argument('--ignore-exclusions', action='store_true',
+                       help="Use every file, ignoring the dataset's exclusion list (phash_index.py)")
     
     # Model parameters
     parser.add_argument('--model-type', type=str, default='EfficientNetB0', 
@@ -207,6 +358,44 @@ Examples:
     parser.add_argument('--model-name', type=str, default='final_model.keras', 
                        help='Name of the model file to save')
     
+    # Progressive resizing
+    parser.add_argument('--progressive-resizing', action='store_true',
+                       help='Train early epochs at low resolution, growing to the model resolution (uses tf.data)')
+    parser.add_argument('--progressive-start-size', type=int, default=128,
+                       help='Resolution of the first progressive stage (default: 128)')
+    parser.add_argument('--progressive-stages', type=int, default=3,
+                       help='Number of low-resolution stages (default: 3)')
+    parser.add_argument('--progressive-final-fraction', type=float, default=0.3,
+                       help='Share of epochs trained at full model resolution (default: 0.3)')
+    
+    # Hard-example mining
+    parser.add_argument('--hard-mining', action='store_true',
+                       help='Draw training images by their last loss and train on part of the set per epoch (uses tf.data; image-folder datasets only)')
+    parser.add_argument('--mining-fraction', type=float, default=0.6,
+                       help='Images drawn per epoch as a share of the training set (default: 0.6)')
+    parser.add_argument('--mining-power', type=float, default=1.0,
+                       help='Preference for hard images, 0 = uniform (default: 1.0)')
+    parser.add_argument('--mining-refresh', type=float, default=0.1,
+                       help='Extra share of the training set re-scored each epoch (default: 0.1)')
+    
+    # Instrumentation
+    parser.add_argument('--instrument', action='store_true',
+                       help='Measure step time, data wait, images/sec and host memory per step')
+    parser.add_argument('--instrument-log', type=str, default='logs/training_steps.jsonl',
+                       help='JSON-lines log for --instrument (default: logs/training_steps.jsonl)')
+    parser.add_argument('--profile-steps', type=int, nargs=2, default=None, metavar=('FIRST', 'LAST'),
+                       help='Capture a TensorFlow profiler trace for this global step window (implies --instrument)')
+    parser.add_argument('--profile-dir', type=str, default='logs/profile',
+                       help='Directory for profiler traces (default: logs/profile)')
+    
+    # Fault tolerance
+    parser.add_argument('--resume', action='store_true',
+                       help='Resume from the latest full-state checkpoint in --checkpoint-dir/train_state')
+    parser.add_argument('--checkpoint-every-steps', type=int, default=None,
+                       help='Also save full training state every N steps (default: every epoch only)')
+    
     args = parser.parse_args()
+    if args.batch_size is None:
+        args.batch_size = training_profile.get('batch_size', 48)
     
     main(args)
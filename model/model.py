@@ -143,6 +143,38 @@ def unfreeze_base_model(model, num_layers_to_unfreeze=20):
     
     return model
 
+def with_input_resolution(model, img_width=None, img_height=None):
+    """
+    Copy of the model with a different input resolution and the same weights
+
+    The classification head sits behind global average pooling, so the same
+    weights work at any resolution. Use img_width=img_height=None for a model
+    that accepts every size (progressive resizing) and fixed values to turn it
+    back into a normal model for saving and serving.
+
+    Args:
+        model: Compiled Keras model
+        img_width: New input width (None = any)
+        img_height: New input height (None = any)
+
+    Returns:
+        New model compiled with the same loss, metrics and optimizer settings
+    """
+    import tensorflow as tf
+
+    new_input = Input(shape=(img_height, img_width, 3))
+    resized = tf.keras.models.clone_model(model, input_tensors=new_input)
+    resized.set_weights(model.get_weights())
+
+    # Fresh optimizer with the same configuration (the old one is bound to the old variables)
+    optimizer = model.optimizer.__class__.from_config(model.optimizer.get_config())
+    resized.compile(
+        optimizer=optimizer,
+        loss=model.loss,
+        metrics=['accuracy']
+    )
+    return resized
+
 if __name__ == "__main__":
     # Test model creation
     model = create_model()
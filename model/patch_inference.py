@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Multi-Scale Patch Inference for High-Resolution Images
+Squashing a 4000x3000 photo to the model input (380x380) throws away the
+high-frequency detail where generation artifacts live. This module scores
+the image as model-resolution patches cut at native scale instead:
+
+    1. Tile the image at each scale (1.0 = native pixels, 0.5 = half size, ...)
+       into a grid of patches the size of the model input
+    2. Rank the patches, faces first (OpenCV Haar cascade, when cv2 is
+       installed), then by texture (mean gradient energy), and keep at most
+       max_patches of them so the cost is bounded for any image size
+    3. Score the kept patches plus the usual squashed global view in large
+       batches
+    4. Aggregate into one image score (by default the mean of the top_k most
+       "fake" views, because artifacts are local) and a coarse heatmap of
+       per-patch fake probabilities on the finest scored grid
+
+Usage:
+    python patch_inference.py --model checkpoints/final_model.keras photo.jpg --heatmap-dir heatmaps/
+    python patch_inference.py --model checkpoints/final_model.keras *.jpg --max-patches 32 --scales 1.0 0.5 0.25
+
+benchmark_patch_inference.py measures latency per megapixel.
+"""
+
+import os
+import math
+import time
+import argparse
+import threading
+from collections import namedtuple
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None
+
+DEFAULT_SCALES = (1.0, 0.5)
+# Long side of the grayscale copy used for texture and face ranking
+ANALYSIS_SIDE = 1024
+# Fraction of a patch a face must cover for the patch to rank as a face patch
+FACE_MIN_OVERLAP = 0.2
+AGGREGATES = ('topk', 'mean', 'max')
+
+PatchResult = namedtuple('PatchResult', ['score', 'global_score', 'patches', 'heatmap', 'heatmap_scale'])
+
+_face_detector = None
+_face_lock = threading.Lock()
+
+
+# ==================== Patch Selection ====================
+
+def patch_positions(length, patch, stride=None):
+    """
+    Offsets of patches covering [0, length); the last patch ends at the edge
+
+    Returns an empty list if the side is shorter than one patch.
+    """
+    stride = stride or patch
+    if length < patch:
+        return []
+    count = math.ceil((length - patch) / stride) + 1
+    if count == 1:
+        return [0]
+    return [round(i * (length - patch) / (count - 1)) for i in range(count)]
+
+
+def _analysis_image(img):
+    """Grayscale copy with at most ANALYSIS_SIDE pixels on the long side, and its scale factor"""
+    # Integer box reduction is 5x faster than resize() on a 12 MP image and plenty for ranking
+    reduction = math.ceil(max(img.size) / ANALYSIS_SIDE)
+    small = img.reduce(reduction) if reduction > 1 else img
+    return np.asarray(small.convert('L'), dtype=np.float32), small.width / img.width
+
+
+def _gradient_table(gray):
+    """Summed-area table of the gradient energy, for O(1) per-patch texture scores"""
+    energy = np.zeros_like(gray)
+    energy[:, 1:] += np.abs(np.diff(gray, axis=1))
+    energy[1:, :] += np.abs(np.diff(gray, axis=0))
+    return np.pad(energy.cumsum(axis=0).cumsum(axis=1), ((1, 0), (1, 0)))
+
+
+def _box_mean(table, x0, y0, x1, y1):
+    height, width = table.shape[0] - 1, table.shape[1] - 1
+    x0, x1 = min(int(x0), width - 1), max(min(int(math.ceil(x1)), width), int(x0) + 1)
+    y0, y1 = min(int(y0), height - 1), max(min(int(math.ceil(y1)), height), int(y0) + 1)
+    total = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+    return float(total) / ((x1 - x0) * (y1 - y0))
+
+
+def detect_faces(gray):
+    """
+    Face boxes (x0, y0, x1, y1) in a grayscale array, or [] without OpenCV
+
+    Uses the frontal-face Haar cascade that ships with opencv-python (minimal
+    OpenCV builds without the objdetect module rank by texture only).
+    """
+    global _face_detector
+    if cv2 is None or not hasattr(cv2, 'CascadeClassifier'):
+        return []
+    with _face_lock:
+        if _face_detector is None:
+            _face_detector = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades,
+                                                                'haarcascade_frontalface_default.xml'))
+        if _face_detector.empty():
+            return []
+        faces = _face_detector.detectMultiScale(gray.astype(np.uint8), scaleFactor=1.1, minNeighbors=5,
+                                                minSize=(24, 24))
+    return [(x, y, x + w, y + h) for x, y, w, h in faces]
+
+
+def _overlap(box, face):
+    """Fraction of `box` covered by `face`"""
+    width = min(box[2], face[2]) - max(box[0], face[0])
+    height = min(box[3], face[3]) - max(box[1], face[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    return width * height / ((box[2] - box[0]) * (box[3] - box[1]))
+
+
+def select_patches(img, patch_size, scales=DEFAULT_SCALES, max_patches=16, face_priority=True):
+    """
+    Tile the image at every scale and keep the max_patches most informative patches
+
+    Args:
+        img: RGB PIL image at full resolution
+        patch_size: (width, height) of the model input
+        scales: Image scales to tile at (1.0 = native pixels); scales at which the
+            image is smaller than one patch are skipped
+        max_patches: Most patches to keep (the cost bound)
+        face_priority: Rank patches that show a face before all others
+
+    Returns:
+        List of patch dicts, best first: 'scale', 'pos' (x, y in the scaled image),
+        'box' (x0, y0, x1, y1 in original pixels), 'row', 'col', 'grid' (rows, cols
+        at that scale), 'texture' and 'face' (covered fraction)
+    """
+    patch_w, patch_h = patch_size
+    gray, factor = _analysis_image(img)
+    table = _gradient_table(gray)
+    faces = [tuple(v / factor for v in face) for face in detect_faces(gray)] if face_priority else []
+
+    candidates = []
+    for scale in scales:
+        scaled_w, scaled_h = round(img.width * scale), round(img.height * scale)
+        xs, ys = patch_positions(scaled_w, patch_w), patch_positions(scaled_h, patch_h)
+        for row, y in enumerate(ys):
+            for col, x in enumerate(xs):
+                box = (x / scale, y / scale, (x + patch_w) / scale, (y + patch_h) / scale)
+                candidates.append({
+                    'scale': scale,
+                    'pos': (x, y),
+                    'box': tuple(round(v) for v in box),
+                    'row': row,
+                    'col': col,
+                    'grid': (len(ys), len(xs)),
+                    'texture': _box_mean(table, *(v * factor for v in box)),
+                    'face': max((_overlap(box, face) for face in faces), default=0.0)
+                })
+
+    candidates.sort(key=lambda p: (p['face'] >= FACE_MIN_OVERLAP, p['texture']), reverse=True)
+    return candidates[:max_patches]
+
+
+# ==================== Scoring ====================
+
+def crop_patches(img, patches, patch_size, include_global=True):
+    """
+    Cut the selected patches (and optionally the squashed global view) into one uint8 batch
+
+    Patches at scale 1.0 are native pixels. Scales of the form 1/n come from one
+    integer reduction of the image; any other scale resizes only each patch's box.
+
+    Returns:
+        uint8 array of shape (len(patches) [+ 1], height, width, 3); the global view comes first
+    """
+    patch_w, patch_h = patch_size
+    arrays = []
+    if include_global:
+        # The squash of the plain prediction path (reducing_gap: integer reduction first, 2x faster)
+        arrays.append(np.asarray(img.resize((patch_w, patch_h), reducing_gap=3.0), dtype=np.uint8))
+    reduced = {1.0: img}
+    for patch in patches:
+        scale = patch['scale']
+        reduction = round(1 / scale)
+        if scale in reduced or abs(reduction * scale - 1.0) < 1e-6:
+            if scale not in reduced:
+                reduced[scale] = img.reduce(reduction)
+            x, y = patch['pos']
+            crop = reduced[scale].crop((x, y, x + patch_w, y + patch_h))
+        else:
+            crop = img.resize((patch_w, patch_h), Image.BILINEAR, box=patch['box'], reducing_gap=2.0)
+        arrays.append(np.asarray(crop, dtype=np.uint8))
+    return np.stack(arrays)
+
+
+def score_patches(model, batch, batch_size=64):
+    """
+    "Real" probabilities of a uint8 patch batch, batch_size patches per forward pass
+
+    Returns:
+        float32 array with one score per patch (Fake=0, Real=1)
+    """
+    from tensorflow.keras.applications.efficientnet import preprocess_input
+
+    scores = []
+    for start in range(0, len(batch), batch_size):
+        chunk = preprocess_input(batch[start:start + batch_size].astype(np.float32))
+        scores.append(np.asarray(model.predict_on_batch(chunk), dtype=np.float32).reshape(-1))
+    return np.concatenate(scores) if scores else np.empty((0,), dtype=np.float32)
+
+
+def aggregate_scores(scores, patches, include_global=True, method='topk', top_k=3):
+    """
+    Combine the view scores into an image score and a heatmap
+
+    Args:
+        scores: Output of score_patches() for crop_patches(..., include_global)
+        patches: The patch dicts, in batch order; each gets a 'score'
+        include_global: Whether scores[0] is the global view
+        method: 'topk' (mean of the top_k most fake views), 'mean' or 'max' (most fake view)
+        top_k: Views averaged by 'topk'
+
+    Returns:
+        PatchResult(score, global_score, patches, heatmap, heatmap_scale): score is
+        the image's "Real" probability; heatmap holds per-patch fake probabilities
+        (NaN where no patch was scored) on the grid of the finest scored scale
+    """
+    if method not in AGGREGATES:
+        raise ValueError(f"Unknown aggregate '{method}' (choose from {', '.join(AGGREGATES)})")
+    global_score = float(scores[0]) if include_global else None
+    for patch, score in zip(patches, scores[1:] if include_global else scores):
+        patch['score'] = float(score)
+
+    fake = np.sort(1.0 - np.asarray(scores, dtype=np.float64))[::-1]
+    if method == 'topk':
+        image_fake = fake[:max(1, top_k)].mean()
+    elif method == 'max':
+        image_fake = fake[0]
+    else:
+        image_fake = fake.mean()
+
+    heatmap, heatmap_scale = None, None
+    if patches:
+        heatmap_scale = max(patch['scale'] for patch in patches)
+        finest = [patch for patch in patches if patch['scale'] == heatmap_scale]
+        heatmap = np.full(finest[0]['grid'], np.nan, dtype=np.float32)
+        for patch in finest:
+            heatmap[patch['row'], patch['col']] = 1.0 - patch['score']
+    return PatchResult(float(1.0 - image_fake), global_score, patches, heatmap, heatmap_scale)
+
+
+def predict_patches(model, img, scales=DEFAULT_SCALES, max_patches=16, batch_size=64, include_global=True,
+                    aggregate='topk', top_k=3, face_priority=True):
+    """
+    Patch-level prediction for one RGB PIL image (see the module docstring)
+
+    Returns:
+        (PatchResult, timings): timings holds 'select', 'crop', 'infer' and 'total' in milliseconds
+    """
+    patch_size = (model.input_shape[2], model.input_shape[1])
+    timings = {}
+    start = time.perf_counter()
+    patches = select_patches(img, patch_size, scales, max_patches, face_priority)
+    timings['select'] = (time.perf_counter() - start) * 1000
+    # An image smaller than one patch at every scale still gets its global view
+    include_global = include_global or not patches
+
+    mark = time.perf_counter()
+    batch = crop_patches(img, patches, patch_size, include_global)
+    timings['crop'] = (time.perf_counter() - mark) * 1000
+
+    mark = time.perf_counter()
+    scores = score_patches(model, batch, batch_size)
+    timings['infer'] = (time.perf_counter() - mark) * 1000
+
+    result = aggregate_scores(scores, patches, include_global, aggregate, top_k)
+    timings['total'] = (time.perf_counter() - start) * 1000
+    return result, timings
+
+
+def render_heatmap(img, result, save_path, max_side=1600):
+    """
+    Save the image with every scored patch tinted by its fake probability (red = fake)
+
+    Coarser scales are drawn first so the finest patches stay on top.
+    """
+    factor = min(1.0, max_side / max(img.size))
+    base = img.resize((round(img.width * factor), round(img.height * factor))).convert('RGBA')
+    overlay = Image.new('RGBA', base.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for patch in sorted(result.patches, key=lambda p: p['scale']):
+        fake = 1.0 - patch['score']
+        box = tuple(round(v * factor) for v in patch['box'])
+        draw.rectangle(box, fill=(255, 0, 0, int(40 + 140 * fake)) if fake > 0.5 else (0, 200, 120, 40),
+                       outline=(255, 255, 255, 160))
+    Image.alpha_composite(base, overlay).convert('RGB').save(save_path)
+    print(f"Heatmap saved to: {save_path}")
+
+
+def main(args):
+    from tensorflow.keras.models import load_model
+    from runtime_profile import load_runtime_profile, apply_threading
+
+    # Tuned thread counts must be set before TensorFlow runs its first op
+    apply_threading(load_runtime_profile(), 'inference')
+    model = load_model(args.model)
+    if args.heatmap_dir:
+        os.makedirs(args.heatmap_dir, exist_ok=True)
+
+    for path in args.images:
+        with Image.open(path) as img:
+            img = img.convert('RGB')
+        result, timings = predict_patches(model, img, scales=args.scales, max_patches=args.max_patches,
+                                          batch_size=args.batch_size, aggregate=args.aggregate,
+                                          top_k=args.top_k, face_priority=not args.no_faces)
+        megapixels = img.width * img.height / 1e6
+        label = 'Real' if result.score > 0.5 else 'Fake'
+        confidence = result.score if label == 'Real' else 1.0 - result.score
+        faces = sum(patch['face'] >= FACE_MIN_OVERLAP for patch in result.patches)
+
+        print(f"\n📸 {path} ({img.width}x{img.height}, {megapixels:.1f} MP)")
+        print(f"   Prediction: {label} ({confidence:.2%}), score {result.score:.4f}")
+        if result.global_score is not None:
+            print(f"   Global view score: {result.global_score:.4f}")
+        print(f"   Patches scored: {len(result.patches)} ({faces} with faces)")
+        print(f"   Time: {timings['total']:.0f} ms (select {timings['select']:.0f}, crop {timings['crop']:.0f}, "
+              f"infer {timings['infer']:.0f}) = {timings['total'] / megapixels:.0f} ms/MP")
+        if args.heatmap_dir and result.patches:
+            name = os.path.splitext(os.path.basename(path))[0] + '_heatmap.jpg'
+            render_heatmap(img, result, os.path.join(args.heatmap_dir, name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Patch-level deepfake detection for high-resolution images')
+    parser.add_argument('images', nargs='+', help='Images to score')
+    parser.add_argument('--model', type=str, required=True, help='Trained .keras model')
+    parser.add_argument('--scales', type=float, nargs='+', default=list(DEFAULT_SCALES),
+                        help='Scales to tile at (1.0 = native pixels)')
+    parser.add_argument('--max-patches', type=int, default=16, help='Most patches scored per image')
+    parser.add_argument('--batch-size', type=int, default=64, help='Patches per forward pass')
+    parser.add_argument('--aggregate', choices=AGGREGATES, default='topk', help='How view scores are combined')
+    parser.add_argument('--top-k', type=int, default=3, help='Views averaged by --aggregate topk')
+    parser.add_argument('--no-faces', action='store_true', help='Rank patches by texture only')
+    parser.add_argument('--heatmap-dir', type=str, default=None, help='Save a heatmap overlay per image here')
+    main(parser.parse_args())
@@ -6,8 +6,11 @@ import os
 import tensorflow as tf
 from tensorflow.keras.models import load_model
 from tensorflow.keras.applications.efficientnet import preprocess_input
+from runtime_profile import load_runtime_profile, apply_threading
+from tta import parse_policy, predict_tta
 
-def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_height=150):
+def predict_video(video_path, model_path, frame_interval=5, img_width=None, img_height=None, batch_size=None,
+                  tta=None):
     """
     Predict if a video is Real or Fake by analyzing frames.
     
@@ -15,8 +18,13 @@ def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_h
         video_path: Path to the input video
         model_path: Path to the trained model (.keras file)
         frame_interval: Analyze every Nth frame to speed up processing
-        img_width: Target image width for the model
-        img_height: Target image height for the model
+        img_width: Target image width for the model (default: the model's input width)
+        img_height: Target image height for the model (default: the model's input height)
+        batch_size: Frames per forward pass (default: tuned inference batch
+            from the runtime profile, else 16)
+        tta: Test-time augmentation policy (see tta.py), e.g. 'flip'. The
+            views of a frame share its forward pass, which then holds
+            batch_size // views frames so the batch size stays as tuned
         
     Returns:
         dict: containing 'prediction' (Real/Fake), 'confidence', and 'frame_stats'
@@ -28,8 +36,15 @@ def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_h
     if not os.path.exists(model_path):
         raise FileNotFoundError(f"Model not found: {model_path}")
 
+    if batch_size is None:
+        batch_size = load_runtime_profile().get('inference', {}).get('batch_size', 16)
+    views = parse_policy(tta)
+    frames_per_pass = max(1, batch_size // len(views))
+    
     print(f"Loading model from: {model_path}")
     model = load_model(model_path)
+    img_height = img_height or model.input_shape[1]
+    img_width = img_width or model.input_shape[2]
     
     print(f"Processing video: {video_path}")
     cap = cv2.VideoCapture(video_path)
@@ -45,6 +60,26 @@ def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_h
     
     frames_processed = 0
     fake_scores = []
+    pending = []
+    
+    def flush():
+        """Score the pending frames in one batch"""
+        # Apply EfficientNet preprocessing
+        frame_batch = preprocess_input(np.stack(pending).astype(np.float32))
+        pending.clear()
+        
+        # Predict (every TTA view of every frame in one forward pass; mean over the views)
+        scores, _ = predict_tta(model, frame_batch, views)
+        # Probability of being "Real" (1.0) or "Fake" (0.0)
+        # Note: The model output interpretation depends on your training labels.
+        # Typically: 0 = Fake, 1 = Real (based on alphabetical order of folders usually)
+        # But let's verify logic:
+        # If using flow_from_directory, classes are alphanumeric sorted.
+        # Fake comes before Real. So Fake=0, Real=1.
+        # High score (>0.5) -> Real
+        # Low score (<0.5) -> Fake
+        # We want to track "Fake Probability". So if 0=Fake, then FakeProb = 1 - score.
+        fake_scores.extend(1.0 - scores)
     
     frame_count = 0
     while cap.isOpened():
@@ -64,26 +99,10 @@ def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_h
             processed_frame = cv2.resize(frame, (img_width, img_height))
             processed_frame = cv2.cvtColor(processed_frame, cv2.COLOR_BGR2RGB)
             
-            # Expand dims to create batch of size 1
-            frame_batch = np.expand_dims(processed_frame, axis=0)
-            
-            # Apply EfficientNet preprocessing
-            frame_batch = preprocess_input(frame_batch)
-            
-            # Predict
-            prediction = model.predict(frame_batch, verbose=0)
-            score = prediction[0][0] # Probability of being "Real" (1.0) or "Fake" (0.0)
-            # Note: The model output interpretation depends on your training labels.
-            # Typically: 0 = Fake, 1 = Real (based on alphabetical order of folders usually)
-            # But let's verify logic:
-            # If using flow_from_directory, classes are alphanumeric sorted.
-            # Fake comes before Real. So Fake=0, Real=1.
-            # High score (>0.5) -> Real
-            # Low score (<0.5) -> Fake
-            # We want to track "Fake Probability". So if 0=Fake, then FakeProb = 1 - score.
-            
-            fake_prob = 1.0 - score
-            fake_scores.append(fake_prob)
+            # Frames are scored in batches (one forward pass per frames_per_pass frames)
+            pending.append(processed_frame)
+            if len(pending) >= frames_per_pass:
+                flush()
             
             frames_processed += 1
             if frames_processed % 10 == 0:
@@ -94,6 +113,8 @@ def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_h
             continue
 
     cap.release()
+    if pending:
+        flush()
     print(f"\nFinished processing {frames_processed} frames.")
     
     if not fake_scores:
@@ -116,7 +137,8 @@ def predict_video(video_path, model_path, frame_interval=5, img_width=150, img_h
         "prediction": prediction_label,
         "confidence": float(confidence),
         "avg_fake_prob": float(avg_fake_prob),
-        "frames_processed": frames_processed
+        "frames_processed": frames_processed,
+        "tta_views": list(views)
     }
     
     return result
@@ -126,14 +148,24 @@ if __name__ == "__main__":
     parser.add_argument('--video_path', type=str, required=True, help='Path to input video file')
     parser.add_argument('--model_path', type=str, default='model/checkpoints/final_model_pro.keras', help='Path to trained model')
     parser.add_argument('--frame_interval', type=int, default=10, help='Process every Nth frame')
+    parser.add_argument('--batch_size', type=int, default=None,
+                        help='Frames per forward pass (default: tuned value from autotune.py, else 16)')
+    parser.add_argument('--tta', type=str, default='none',
+                        help="Test-time augmentation policy: none, flip, crop, multiscale, full "
+                             "or a comma-separated view list (see tta.py)")
     
     args = parser.parse_args()
     
+    # Tuned thread counts must be set before TensorFlow runs its first op
+    apply_threading(load_runtime_profile(), 'inference')
+    
     try:
         result = predict_video(
             args.video_path, 
             args.model_path, 
-            frame_interval=args.frame_interval
+            frame_interval=args.frame_interval,
+            batch_size=args.batch_size,
+            tta=args.tta
         )
         
         print("\n" + "="*50)
@@ -143,6 +175,8 @@ if __name__ == "__main__":
         print(f"Confidence: {result['confidence']:.2%}")
         print(f"Average Fake Probability: {result['avg_fake_prob']:.4f}")
         print(f"Frames Analyzed: {result['frames_processed']}")
+        if len(result['tta_views']) > 1:
+            print(f"TTA Views: {', '.join(result['tta_views'])}")
         print("="*50 + "\n")
         
     except Exception as e:
@@ -0,0 +1,91 @@
+"""
+Progressive Resizing for Deepfake Detection Training
+Early epochs train at low resolution (cheap to decode and to compute) and the
+resolution grows step by step to the model's native size for the final epochs.
+The tf.data training pipeline reads the current size from a tf.Variable, so
+neither the model nor the pipeline is rebuilt when the size changes.
+"""
+
+import tensorflow as tf
+
+
+def progressive_schedule(epochs, native_size, start_size=128, stages=3, final_fraction=0.3, multiple=32):
+    """
+    Build an epoch -> resolution schedule
+
+    The first (1 - final_fraction) of the epochs are split into `stages` equal
+    stages whose sizes grow linearly from `start_size`; the remaining epochs
+    run at `native_size`.
+
+    Args:
+        epochs: Total number of epochs
+        native_size: Model resolution used for the final epochs
+        start_size: Resolution of the first stage
+        stages: Number of low-resolution stages
+        final_fraction: Share of epochs trained at native resolution
+        multiple: Round stage sizes to a multiple of this (EfficientNet downsamples by 32)
+
+    Returns:
+        List of (first_epoch, size) tuples, sorted by epoch
+    """
+    final_epochs = max(1, round(epochs * final_fraction))
+    low_res_epochs = epochs - final_epochs
+    stages = max(1, min(stages, low_res_epochs))
+    if low_res_epochs <= 0 or start_size >= native_size:
+        return [(0, native_size)]
+
+    schedule = []
+    for stage in range(stages):
+        first_epoch = stage * low_res_epochs // stages
+        size = start_size + (native_size - start_size) * stage / stages
+        size = min(native_size, max(multiple, int(round(size / multiple)) * multiple))
+        if not schedule or schedule[-1][1] != size:
+            schedule.append((first_epoch, size))
+    schedule.append((low_res_epochs, native_size))
+    return schedule
+
+
+def size_for_epoch(schedule, epoch):
+    """Resolution the schedule assigns to a (0-based) epoch"""
+    size = schedule[0][1]
+    for first_epoch, stage_size in schedule:
+        if epoch >= first_epoch:
+            size = stage_size
+    return size
+
+
+class ProgressiveResizing(tf.keras.callbacks.Callback):
+    """
+    Set the training resolution at the start of every epoch
+
+    Works with build_image_dataset(..., resolution=callback.resolution). The
+    model must accept any input size (model.with_input_resolution(model)).
+    """
+
+    def __init__(self, schedule, aspect_ratio=1.0):
+        """
+        Args:
+            schedule: List of (first_epoch, size) from progressive_schedule()
+            aspect_ratio: Width / height of the native resolution
+        """
+        super().__init__()
+        self.schedule = schedule
+        self.aspect_ratio = aspect_ratio
+        height = schedule[0][1]
+        self.resolution = tf.Variable([height, int(round(height * aspect_ratio))],
+                                      dtype=tf.int32, trainable=False)
+
+    def set_epoch(self, epoch):
+        """Apply the schedule for an epoch (also used before resuming mid-run)"""
+        height = size_for_epoch(self.schedule, epoch)
+        width = int(round(height * self.aspect_ratio))
+        if list(self.resolution.numpy()) != [height, width]:
+            print(f"\n📐 Training resolution: {width}x{height}")
+        self.resolution.assign([height, width])
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.set_epoch(epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if logs is not None:
+            logs['train_resolution'] = float(self.resolution[0].numpy())
@@ -0,0 +1,97 @@
+"""
+Runtime Profile for Deepfake Detection
+Reads the per-machine batch-size and thread-count settings written by
+autotune.py and applies them at startup (trainer, backend, video inference).
+
+The profile is a JSON file keyed by hostname, so one file can hold tuned
+settings for several machines. A missing file or host simply means "use the
+built-in defaults".
+"""
+
+import os
+import json
+import socket
+
+# Override with the DEEPFAKE_RUNTIME_PROFILE environment variable
+DEFAULT_PROFILE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checkpoints', 'runtime_profile.json')
+
+
+def profile_path():
+    """Location of the runtime profile file"""
+    return os.environ.get('DEEPFAKE_RUNTIME_PROFILE', DEFAULT_PROFILE_PATH)
+
+
+def load_runtime_profile(path=None, host=None):
+    """
+    Load the tuned settings for this machine
+
+    Args:
+        path: Profile file (default: profile_path())
+        host: Hostname to look up (default: this machine)
+
+    Returns:
+        dict with optional 'training' and 'inference' sections, or {} if
+        nothing was tuned for this machine
+    """
+    path = path or profile_path()
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as f:
+            profiles = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Ignoring unreadable runtime profile {path}: {e}")
+        return {}
+    return profiles.get('hosts', {}).get(host or socket.gethostname(), {})
+
+
+def save_runtime_profile(profile, path=None, host=None):
+    """Store `profile` for this machine, keeping other machines' entries"""
+    path = path or profile_path()
+    profiles = {'hosts': {}}
+    if os.path.exists(path):
+        with open(path) as f:
+            profiles = json.load(f)
+    profiles.setdefault('hosts', {})[host or socket.gethostname()] = profile
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def apply_threading(profile, role):
+    """
+    Apply the tuned TensorFlow thread counts for a role
+
+    Must run before TensorFlow executes its first op; afterwards the thread
+    pools are fixed and TF raises a RuntimeError (reported and ignored here).
+    The DEEPFAKE_INTRA_OP_THREADS / DEEPFAKE_INTER_OP_THREADS environment
+    variables override the profile; serving workers use them to split the
+    cores between processes (backend/gunicorn.conf.py).
+
+    Args:
+        profile: Result of load_runtime_profile()
+        role: 'training' or 'inference'
+
+    Returns:
+        The role's settings dict ({} if none)
+    """
+    settings = profile.get(role, {}) if profile else {}
+    intra = int(os.environ.get('DEEPFAKE_INTRA_OP_THREADS') or 0) or settings.get('intra_op_threads')
+    inter = int(os.environ.get('DEEPFAKE_INTER_OP_THREADS') or 0) or settings.get('inter_op_threads')
+    if not intra and not inter:
+        return settings
+
+    import tensorflow as tf
+    try:
+        if intra:
+            tf.config.threading.set_intra_op_parallelism_threads(intra)
+        if inter:
+            tf.config.threading.set_inter_op_parallelism_threads(inter)
+        print(f"⚙️  Runtime profile ({role}): intra-op {intra or 'default'}, inter-op {inter or 'default'}, "
+              f"batch size {settings.get('batch_size', 'default')}")
+    except RuntimeError as e:
+        print(f"⚠️  Could not apply runtime profile threads (TensorFlow already initialized): {e}")
+    return settings
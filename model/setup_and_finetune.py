@@ -6,6 +6,7 @@ from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.optimizers import Adam
 from tensorflow.keras.losses import BinaryFocalCrossentropy
 import shutil
+from runtime_profile import load_runtime_profile, apply_threading
 
 # Configuration
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -15,7 +16,9 @@ MODEL_PATH = os.path.join(CHECKPOINT_DIR, 'final_model_pro.keras')
 FINETUNE_DIR = os.path.join(PROJECT_ROOT, 'FineTuneData')
 IMG_WIDTH = 150
 IMG_HEIGHT = 150
-BATCH_SIZE = 4  # Small batch size for small datasets
+# Tuned per machine by autotune.py; falls back to a small batch for small datasets
+RUNTIME_TRAINING = apply_threading(load_runtime_profile(), 'training')
+BATCH_SIZE = RUNTIME_TRAINING.get('batch_size', 4)
 EPOCHS = 10
 LR = 1e-5 # Very slow learning rate to prevent "forgetting"
 
@@ -0,0 +1,327 @@
+"""
+Persisted Train/Validation/Test Split Manifest for Deepfake Detection
+Assigns every image of a dataset to a split by hashing a stable key (its
+relative path, or its content) with a seed, and stores the assignment in
+split_manifest.json at the dataset root. Training, evaluation and
+test_custom.py then read their split from the manifest instead of listing
+directories, so:
+
+    - the split never depends on directory listing order or file-system quirks
+    - flat (Real/Fake only) datasets get a real, separate test split instead
+      of reusing the validation split
+    - reruns do not scan the dataset: they only compare the modification
+      times of the class folders with those recorded in the manifest, and
+      warn when files may have been added or removed
+    - --verify lists the dataset and updates the manifest in place: new
+      files are assigned (only they are hashed with --by content), missing
+      ones dropped
+    - adding files later never moves existing files between splits: a file's
+      split depends only on its own key and the seed
+
+Datasets with Train/Validation/Test folders keep their folder splits; the
+manifest then only saves the directory scans.
+
+Usage:
+    python split_manifest.py --dataset-path Dataset
+    python split_manifest.py --dataset-path Dataset --val 0.1 --test 0.2 --seed 7 --by content --rebuild
+    python split_manifest.py --dataset-path Dataset --verify
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from dataset_layout import SPLIT_MANIFEST_FILE, SPLIT_NAMES, list_class_files, is_tar_dataset
+
+DEFAULT_FRACTIONS = {'Train': 0.8, 'Validation': 0.1, 'Test': 0.1}
+
+
+def bucket(key, seed):
+    """Map a key to a stable pseudo-random number in [0, 1)"""
+    digest = hashlib.sha1(f"{seed}:{key}".encode()).digest()
+    return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+
+def assign_split(key, seed, fractions=DEFAULT_FRACTIONS):
+    """Split name for a key: Train, Validation or Test, in proportion to `fractions`"""
+    u = bucket(key, seed)
+    cumulative = 0.0
+    for name in SPLIT_NAMES:
+        cumulative += fractions[name]
+        if u < cumulative:
+            return name
+    return SPLIT_NAMES[-1]
+
+
+def _content_key(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def build_split_manifest(dataset_path, fractions=DEFAULT_FRACTIONS, seed=1337, key='path'):
+    """
+    Assign every image to a split and return the manifest
+
+    Every file is recorded, including those in the dataset's exclusion list:
+    exclusions are applied when a split is read (split_files), so editing
+    the list never reshuffles the split.
+
+    Args:
+        dataset_path: Dataset root (flat Real/Fake, or Train/Validation/Test folders)
+        fractions: Share of each split (flat datasets only)
+        seed: Changes the assignment; the same seed always gives the same split
+        key: 'path' (relative path) or 'content' (SHA-256 of the file, so
+            identical copies always share a split)
+
+    Returns:
+        Manifest dict (see save_split_manifest)
+    """
+    splits = {name: [] for name in SPLIT_NAMES}
+
+    if os.path.exists(os.path.join(dataset_path, 'Train')):
+        layout = 'folders'
+        class_indices = None
+        for name in SPLIT_NAMES:
+            files, labels, indices = list_class_files(os.path.join(dataset_path, name),
+                                                      list(class_indices) if class_indices else None)
+            class_indices = class_indices or indices
+            splits[name] = [[os.path.relpath(f, dataset_path), int(label)] for f, label in zip(files, labels)]
+    else:
+        layout = 'hashed'
+        files, labels, class_indices = list_class_files(dataset_path)
+        for f, label in zip(files, labels):
+            rel_path = os.path.relpath(f, dataset_path)
+            split = assign_split(_content_key(f) if key == 'content' else rel_path, seed, fractions)
+            splits[split].append([rel_path, int(label)])
+
+    return {
+        'layout': layout,
+        'seed': seed,
+        'key': key,
+        'fractions': fractions if layout == 'hashed' else None,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'class_indices': class_indices,
+        'folder_mtimes': folder_mtimes(dataset_path),
+        'splits': splits
+    }
+
+
+def save_split_manifest(manifest, dataset_path):
+    """Write split_manifest.json atomically; returns its path"""
+    path = os.path.join(dataset_path, SPLIT_MANIFEST_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def load_split_manifest(dataset_path):
+    """The dataset's manifest, or None if it has none"""
+    path = os.path.join(dataset_path, SPLIT_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dataset_layout(dataset_path):
+    return 'folders' if os.path.exists(os.path.join(dataset_path, 'Train')) else 'hashed'
+
+
+def folder_mtimes(dataset_path):
+    """
+    Modification times (ns) of the class folders, keyed by relative path
+
+    A folder's mtime changes when a file directly inside it is added, removed
+    or renamed, so comparing these few stats tells whether a manifest may be
+    stale without listing any files. The dataset root is left out: saving the
+    manifest itself changes its mtime.
+    """
+    layout = _dataset_layout(dataset_path)
+    parents = [os.path.join(dataset_path, name) for name in SPLIT_NAMES] if layout == 'folders' else [dataset_path]
+    mtimes = {}
+    for parent in parents:
+        if not os.path.isdir(parent):
+            continue
+        for entry in os.scandir(parent):
+            if entry.is_dir():
+                mtimes[os.path.relpath(entry.path, dataset_path)] = entry.stat().st_mtime_ns
+    return mtimes
+
+
+def manifest_is_stale(manifest, dataset_path):
+    """True if the class folders changed since the manifest was built (manifests without mtimes: False)"""
+    if manifest['layout'] != _dataset_layout(dataset_path):
+        return True
+    recorded = manifest.get('folder_mtimes')
+    return recorded is not None and recorded != folder_mtimes(dataset_path)
+
+
+def manifest_changes(manifest, dataset_path):
+    """
+    Compare a manifest with the files currently in the dataset (lists every file)
+
+    Returns:
+        (added, removed): sorted relative paths on disk but not in the
+        manifest, and in the manifest but no longer on disk
+    """
+    if _dataset_layout(dataset_path) == 'folders':
+        files = [f for name in SPLIT_NAMES
+                 for f in list_class_files(os.path.join(dataset_path, name))[0]]
+    else:
+        files = list_class_files(dataset_path)[0]
+    on_disk = {os.path.relpath(f, dataset_path) for f in files}
+    recorded = {p for entries in manifest['splits'].values() for p, _ in entries}
+    return sorted(on_disk - recorded), sorted(recorded - on_disk)
+
+
+def update_split_manifest(manifest, dataset_path):
+    """
+    Bring a manifest up to date with the files on disk, without moving existing files
+
+    New files are assigned with the manifest's own seed, key and shares (with
+    key='content' only they are hashed); files no longer on disk are dropped.
+    A changed layout or a new class folder needs a full rebuild, which uses
+    the same settings.
+
+    Returns:
+        (manifest, added, removed): the updated manifest and the relative paths added and removed
+    """
+    settings = dict(fractions=manifest['fractions'] or DEFAULT_FRACTIONS, seed=manifest['seed'],
+                    key=manifest['key'])
+    if manifest['layout'] != _dataset_layout(dataset_path):
+        rebuilt = build_split_manifest(dataset_path, **settings)
+        return rebuilt, [p for entries in rebuilt['splits'].values() for p, _ in entries], []
+
+    added, removed = manifest_changes(manifest, dataset_path)
+    class_indices = manifest['class_indices']
+    new_entries = []
+    for rel_path in added:
+        parts = rel_path.split(os.sep)
+        if manifest['layout'] == 'folders':
+            split, class_name = parts[0], parts[1]
+        else:
+            class_name = parts[0]
+            path = os.path.join(dataset_path, rel_path)
+            split = assign_split(_content_key(path) if manifest['key'] == 'content' else rel_path,
+                                 manifest['seed'], settings['fractions'])
+        if class_name not in class_indices:
+            # Labels are numbered over all classes: a new class renumbers them
+            return build_split_manifest(dataset_path, **settings), added, removed
+        new_entries.append((split, [rel_path, class_indices[class_name]]))
+
+    gone = set(removed)
+    for split in SPLIT_NAMES:
+        manifest['splits'][split] = [entry for entry in manifest['splits'][split] if entry[0] not in gone]
+    for split, entry in new_entries:
+        manifest['splits'][split].append(entry)
+    for split in SPLIT_NAMES:
+        manifest['splits'][split].sort(key=lambda entry: (entry[1], entry[0]))
+    manifest['folder_mtimes'] = folder_mtimes(dataset_path)
+    manifest['updated'] = datetime.now().isoformat(timespec='seconds')
+    return manifest, added, removed
+
+
+def ensure_split_manifest(dataset_path, create=True, **kwargs):
+    """
+    Load the dataset's manifest, creating and saving it first if missing
+
+    An existing manifest is used without listing the dataset; if its class
+    folders changed since it was built, a warning points to --verify. If the
+    dataset directory is read-only a new manifest is used for this run only
+    (it is still deterministic, just not cached).
+
+    Args:
+        dataset_path: Dataset root
+        create: Build a manifest if the dataset has none (False: return None)
+        **kwargs: Passed to build_split_manifest when creating one
+    """
+    manifest = load_split_manifest(dataset_path)
+    if manifest is not None:
+        if manifest_is_stale(manifest, dataset_path):
+            print(f"⚠️  Files were added to or removed from {dataset_path} since {SPLIT_MANIFEST_FILE} was "
+                  f"built; they are not used until you run: "
+                  f"python split_manifest.py --dataset-path {dataset_path} --verify")
+        return manifest
+    if not create:
+        return None
+    manifest = build_split_manifest(dataset_path, **kwargs)
+    try:
+        path = save_split_manifest(manifest, dataset_path)
+        print(f"🗂️  Split manifest created: {path}")
+    except OSError as e:
+        print(f"⚠️  Could not save the split manifest ({e}); using it for this run only")
+    return manifest
+
+
+def split_files(manifest, dataset_path, split, exclude=None):
+    """
+    Files of one split, straight from the manifest (no directory scan)
+
+    Args:
+        manifest: Loaded manifest
+        dataset_path: Dataset root the manifest belongs to
+        split: 'Train', 'Validation' or 'Test'
+        exclude: Optional set of normalised absolute paths to leave out
+
+    Returns:
+        (absolute filepaths, labels array, class_indices)
+    """
+    entries = [(os.path.join(dataset_path, p), label) for p, label in manifest['splits'][split]]
+    if exclude:
+        entries = [(p, label) for p, label in entries if os.path.normpath(p) not in exclude]
+    files = [p for p, _ in entries]
+    labels = np.array([label for _, label in entries], dtype=np.int32)
+    return files, labels, manifest['class_indices']
+
+
+def print_summary(manifest):
+    names = {i: name for name, i in manifest['class_indices'].items()}
+    total = sum(len(v) for v in manifest['splits'].values())
+    print(f"\nLayout: {manifest['layout']} | key: {manifest['key']} | seed: {manifest['seed']}")
+    for split, entries in manifest['splits'].items():
+        counts = np.bincount([label for _, label in entries], minlength=len(names)) if entries else [0] * len(names)
+        share = len(entries) / total if total else 0
+        print(f"  {split:<11} {len(entries):>7} ({share:.1%}) | "
+              + ", ".join(f"{names[i]}: {c}" for i, c in enumerate(counts)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Create or show the persisted dataset split manifest')
+    parser.add_argument('--dataset-path', type=str, required=True, help='Dataset root')
+    parser.add_argument('--val', type=float, default=DEFAULT_FRACTIONS['Validation'], help='Validation share')
+    parser.add_argument('--test', type=float, default=DEFAULT_FRACTIONS['Test'], help='Test share')
+    parser.add_argument('--seed', type=int, default=1337, help='Split seed')
+    parser.add_argument('--by', choices=['path', 'content'], default='path',
+                        help='Hash relative paths (fast) or file contents (duplicates share a split)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='Recreate the manifest (new files are added, existing ones keep their split '
+                             'as long as seed, --by and shares are unchanged)')
+    parser.add_argument('--verify', action='store_true',
+                        help='List the dataset and update the manifest: assign new files, drop missing ones')
+    args = parser.parse_args()
+
+    if is_tar_dataset(args.dataset_path):
+        parser.error("tar shard datasets store their splits in shards.json")
+    manifest = None
+    if not args.rebuild and args.verify:
+        manifest = load_split_manifest(args.dataset_path)
+        if manifest is not None:
+            manifest, added, removed = update_split_manifest(manifest, args.dataset_path)
+            save_split_manifest(manifest, args.dataset_path)
+            print(f"✓ Verified: {len(added)} files added, {len(removed)} removed")
+    elif not args.rebuild:
+        manifest = ensure_split_manifest(args.dataset_path, create=False)
+    if manifest is None:
+        fractions = {'Train': 1.0 - args.val - args.test, 'Validation': args.val, 'Test': args.test}
+        manifest = build_split_manifest(args.dataset_path, fractions=fractions, seed=args.seed, key=args.by)
+        print(f"✓ Split manifest saved to: {save_split_manifest(manifest, args.dataset_path)}")
+    print_summary(manifest)
@@ -0,0 +1,324 @@
+"""
+Sharded Tar Dataset for Deepfake Detection
+Packs a directory dataset (Train/Validation/Test or flat Real/Fake) into
+WebDataset-style tar shards and streams them back as tf.data pipelines.
+
+Hundreds of thousands of small image files cost one open/stat per file on
+every epoch, which dominates on network filesystems. A shard is one large
+file read front to back: several shards are read in parallel (interleave)
+and their samples mixed through a shuffle buffer.
+
+Layout of a converted dataset:
+    shards.json              index: classes, and per split the shard files,
+                             sample counts, labels and original paths
+    Train-000000.tar         members 000000000.jpg, 000000000.cls, ...
+    Validation-000000.tar
+    Test-000000.tar
+
+The index is written last, so a directory only counts as a tar dataset once
+its conversion finished. data_preparation_optimized detects such a directory
+(is_tar_dataset) and builds its pipelines from the shards, so a converted
+dataset can be passed anywhere a dataset path is accepted.
+
+Usage:
+    python tar_dataset.py --dataset-path Dataset --output Dataset_shards
+    python tar_dataset.py --dataset-path Dataset --output Dataset_shards --benchmark
+"""
+
+import io
+import os
+import json
+import time
+import random
+import tarfile
+import itertools
+import argparse
+from datetime import datetime
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import tensorflow as tf
+
+from data_preparation_optimized import SHARD_INDEX_FILE, DatasetSplit, dataset_file_splits, decode_batches
+
+
+def load_shard_index(dataset_path):
+    """Read shards.json of a converted dataset"""
+    with open(os.path.join(dataset_path, SHARD_INDEX_FILE)) as f:
+        return json.load(f)
+
+
+def _read_bytes(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _add_member(tar, name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = 0
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_shards(files, labels, output_dir, prefix, shard_size_mb=256, max_per_shard=10000, read_threads=16):
+    """
+    Write (file, label) pairs into tar shards, in the given order
+
+    Files are read by a thread pool (many small reads overlap) but written
+    sequentially. At most read_threads * 4 reads are pending at a time, so
+    the readers never get far ahead of the writer and memory stays bounded.
+    A shard is closed at shard_size_mb or max_per_shard samples.
+
+    Returns:
+        List of shard descriptions for the index
+    """
+    shards = []
+    tar, current = None, None
+    shard_bytes = shard_size_mb * 1024 * 1024
+
+    def close():
+        if tar is not None:
+            tar.close()
+            os.replace(current['path'] + '.tmp', current['path'])
+            del current['path']
+            shards.append(current)
+
+    def read_ahead(pool):
+        """File bytes in order, with a bounded window of reads in flight"""
+        paths = iter(files)
+        pending = deque(pool.submit(_read_bytes, path) for path in itertools.islice(paths, read_threads * 4))
+        while pending:
+            data = pending.popleft().result()
+            path = next(paths, None)
+            if path is not None:
+                pending.append(pool.submit(_read_bytes, path))
+            yield data
+
+    with ThreadPoolExecutor(max_workers=read_threads) as pool:
+        for i, (path, label, data) in enumerate(zip(files, labels, read_ahead(pool))):
+            if tar is None or current['bytes'] >= shard_bytes or current['samples'] >= max_per_shard:
+                close()
+                name = f"{prefix}-{len(shards):06d}.tar"
+                current = {'file': name, 'path': os.path.join(output_dir, name), 'samples': 0, 'bytes': 0,
+                           'labels': [], 'sources': []}
+                tar = tarfile.open(current['path'] + '.tmp', 'w')
+            ext = os.path.splitext(path)[1].lower().lstrip('.')
+            key = f"{i:09d}"
+            # Image first, label second: the reader emits a sample when it sees the label
+            _add_member(tar, f"{key}.{'jpg' if ext == 'jpeg' else ext}", data)
+            _add_member(tar, f"{key}.cls", str(int(label)).encode())
+            current['samples'] += 1
+            current['bytes'] += len(data)
+            current['labels'].append(int(label))
+            current['sources'].append(path)
+        close()
+    return shards
+
+
+def convert_directory(dataset_path, output_dir, shard_size_mb=256, max_per_shard=10000, seed=1337,
+                      use_exclusions=True, read_threads=16):
+    """
+    Convert a directory dataset into tar shards
+
+    Uses the same file lists as create_tf_datasets_optimized(): class folders
+    in sorted order, the dataset's exclusion list, and the split manifest for
+    flat layouts. Training files are shuffled once so every shard mixes both
+    classes.
+
+    Returns:
+        The shard index (also written to output_dir/shards.json)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    splits, class_indices = dataset_file_splits(dataset_path, use_exclusions=use_exclusions)
+
+    order = list(range(len(splits['Train'][0])))
+    random.Random(seed).shuffle(order)
+    splits['Train'] = ([splits['Train'][0][i] for i in order], np.asarray(splits['Train'][1])[order])
+
+    names = {i: name for name, i in class_indices.items()}
+    index = {
+        'format': 'tar-shards-v1',
+        'source': os.path.abspath(dataset_path),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'class_indices': class_indices,
+        'splits': {}
+    }
+    for name, (files, labels) in splits.items():
+        start = time.perf_counter()
+        shards = write_shards(files, labels, output_dir, name, shard_size_mb=shard_size_mb,
+                              max_per_shard=max_per_shard, read_threads=read_threads)
+        for shard in shards:
+            shard['sources'] = [os.path.relpath(p, dataset_path) for p in shard['sources']]
+        counts = np.bincount(np.asarray(labels, dtype=int), minlength=len(class_indices))
+        index['splits'][name] = {
+            'samples': len(files),
+            'class_counts': {names[i]: int(c) for i, c in enumerate(counts)},
+            'shards': shards
+        }
+        size_mb = sum(s['bytes'] for s in shards) / (1024 * 1024)
+        print(f"📦 {name}: {len(files)} images -> {len(shards)} shards ({size_mb:.1f} MB) "
+              f"in {time.perf_counter() - start:.1f}s")
+
+    tmp_path = os.path.join(output_dir, SHARD_INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(tmp_path, os.path.join(output_dir, SHARD_INDEX_FILE))
+    return index
+
+
+def iterate_shard(path):
+    """Stream (image bytes, label) pairs from one shard, reading it front to back"""
+    path = path.decode() if isinstance(path, bytes) else path
+    key, image = None, None
+    with tarfile.open(path, 'r|') as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            stem, ext = member.name.split('.', 1)
+            data = tar.extractfile(member).read()
+            if ext == 'cls':
+                if stem == key:
+                    yield image, float(data)
+            else:
+                key, image = stem, data
+
+
+def shard_stream(shard_files, training=False, seed=None, shard=None, repeat=False, shuffle_buffer=2048,
+                 cycle_length=4):
+    """
+    tf.data.Dataset of (image bytes, label) samples from tar shards
+
+    Args:
+        shard_files: Shard paths, in index order
+        training: Read shards in random order, `cycle_length` at a time, and
+            shuffle samples through a buffer of `shuffle_buffer`
+        seed: Shuffle seed
+        shard: Optional (num_workers, worker_index). Workers split the shard
+            files; with fewer files than workers they split the samples.
+        repeat: Repeat indefinitely
+        shuffle_buffer: Samples held for shuffling
+        cycle_length: Shards read in parallel while training
+
+    Without `training` the samples come in index order, matching the labels
+    of the split (needed for evaluation).
+    """
+    files = tf.data.Dataset.from_tensor_slices(list(shard_files))
+    sample_shard = None
+    if shard is not None and shard[0] > 1:
+        if len(shard_files) >= shard[0]:
+            files = files.shard(*shard)
+        else:
+            sample_shard = shard
+    if training:
+        files = files.shuffle(len(shard_files), seed=seed, reshuffle_each_iteration=True)
+    if repeat:
+        files = files.repeat()
+
+    signature = (tf.TensorSpec((), tf.string), tf.TensorSpec((), tf.float32))
+
+    def read(path):
+        return tf.data.Dataset.from_generator(iterate_shard, args=(path,), output_signature=signature)
+
+    if training:
+        ds = files.interleave(read, cycle_length=max(1, min(cycle_length, len(shard_files))),
+                              num_parallel_calls=tf.data.AUTOTUNE, deterministic=False)
+    else:
+        ds = files.flat_map(read)
+    if sample_shard is not None:
+        ds = ds.shard(*sample_shard)
+    if training:
+        ds = ds.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+    return ds
+
+
+def create_tar_datasets(dataset_path, img_width=150, img_height=150, batch_size=32, num_workers=1,
+                        worker_index=0, seed=1337, train_resolution=None, shuffle_buffer=2048):
+    """
+    Train/validation/test DatasetSplits streamed from a converted dataset
+
+    Same arguments and behaviour as create_tf_datasets_optimized(), which
+    calls this for tar datasets. DatasetSplit.filepaths holds the original
+    (relative) paths of the images.
+    """
+    index = load_shard_index(dataset_path)
+    class_indices = index['class_indices']
+    shard = (num_workers, worker_index) if num_workers > 1 else None
+    repeat = num_workers > 1  # keep workers in lock-step, uneven shards would hang collectives
+    print(f"\n📦 Using sharded tar dataset ({index['format']}, {sum(len(s['shards']) for s in index['splits'].values())} shards)...")
+
+    def split(name, training=False, distributed=False):
+        info = index['splits'][name]
+        shard_files = [os.path.join(dataset_path, s['file']) for s in info['shards']]
+        labels = np.array([label for s in info['shards'] for label in s['labels']], dtype=np.int32)
+        sources = [p for s in info['shards'] for p in s['sources']]
+        ds = shard_stream(shard_files, training=training, seed=seed, shard=shard if distributed else None,
+                          repeat=repeat and distributed, shuffle_buffer=shuffle_buffer)
+        ds = decode_batches(ds, img_width, img_height, batch_size, training=training,
+                            drop_remainder=repeat and distributed,
+                            resolution=train_resolution if training else None, read=None)
+        return DatasetSplit(ds, sources, labels, batch_size, class_indices)
+
+    train = split('Train', training=True, distributed=True)
+    validation = split('Validation', distributed=repeat)
+    # Shards converted before flat datasets had a split manifest have no Test split
+    test = split('Test' if 'Test' in index['splits'] else 'Validation')
+
+    print(f"Training samples: {train.samples}")
+    print(f"Validation samples: {validation.samples}")
+    print(f"Test samples: {test.samples}")
+    if shard:
+        print(f"🔀 Worker {worker_index + 1}/{num_workers} reads 1/{num_workers} of the training shards")
+    return train, validation, test
+
+
+def benchmark_reads(dataset_path, shard_dir, limit=None):
+    """Raw read throughput: one file per image vs. streaming the training shards"""
+    train_dir = os.path.join(dataset_path, 'Train')
+    start = time.perf_counter()
+    paths = [os.path.join(root, name) for root, _, names in os.walk(
+        train_dir if os.path.isdir(train_dir) else dataset_path) for name in names]
+    paths = paths[:limit] if limit else paths
+    size = sum(len(_read_bytes(p)) for p in paths)
+    directory = (len(paths), size, time.perf_counter() - start)
+
+    index = load_shard_index(shard_dir)
+    start = time.perf_counter()
+    count = size = 0
+    for s in index['splits']['Train']['shards']:
+        for image, _ in iterate_shard(os.path.join(shard_dir, s['file'])):
+            size += len(image)
+            count += 1
+        if limit and count >= limit:
+            break
+    shards = (count, size, time.perf_counter() - start)
+
+    print(f"\n{'SOURCE':<12} | {'IMAGES':>8} | {'IMAGES/SEC':>11} | {'MB/SEC':>8}")
+    print("-"*50)
+    for name, (n, b, seconds) in (('directory', directory), ('tar shards', shards)):
+        print(f"{name:<12} | {n:>8} | {n / seconds:>11.1f} | {b / seconds / 1e6:>8.1f}")
+    print("(run on a cold cache, e.g. after dropping the page cache, for network-filesystem numbers)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert an image-folder dataset into streaming tar shards')
+    parser.add_argument('--dataset-path', type=str, required=True, help='Dataset root (Train/Validation/Test or flat)')
+    parser.add_argument('--output', type=str, required=True, help='Directory for the shards and shards.json')
+    parser.add_argument('--shard-size-mb', type=int, default=256, help='Target shard size')
+    parser.add_argument('--max-per-shard', type=int, default=10000, help='Maximum images per shard')
+    parser.add_argument('--read-threads', type=int, default=16, help='Threads reading source files')
+    parser.add_argument('--seed', type=int, default=1337, help='Seed for the training-file order')
+    parser.add_argument('--ignore-exclusions', action='store_true',
+                        help="Include files from the dataset's exclusion list (phash_index.py)")
+    parser.add_argument('--benchmark', action='store_true',
+                        help='Compare raw read throughput of the folders and the shards (after converting)')
+    parser.add_argument('--benchmark-limit', type=int, default=None, help='Images to read per source')
+    args = parser.parse_args()
+
+    if not os.path.isfile(os.path.join(args.output, SHARD_INDEX_FILE)) or not args.benchmark:
+        convert_directory(args.dataset_path, args.output, shard_size_mb=args.shard_size_mb,
+                          max_per_shard=args.max_per_shard, seed=args.seed,
+                          use_exclusions=not args.ignore_exclusions, read_threads=args.read_threads)
+        print(f"\n✓ Shards and index saved to: {args.output}")
+    if args.benchmark:
+        benchmark_reads(args.dataset_path, args.output, limit=args.benchmark_limit)
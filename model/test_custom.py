@@ -1,5 +1,6 @@
 
 import os
+import argparse
 import cv2
 import numpy as np
 import tensorflow as tf
@@ -31,15 +32,29 @@ def predict_image(model, img_path, img_width=380, img_height=380):
 
 import random
 
-def main():
-    # Config
-    model_path = 'model/checkpoints/final_model_pro.keras'
-    # Use the large dataset we were training on
-    dataset_path = '/Users/harshvardhan/Developer/deepfake/Dataset/Image Dataset' 
-    if not os.path.exists(dataset_path):
-        # Fallback to the one in the parent if subfolder doesn't exist
-        dataset_path = '/Users/harshvardhan/Developer/deepfake/Dataset'
-        
+def test_split_candidates(dataset_path):
+    """
+    Test images per class name, preferably from the dataset's split manifest
+    
+    Flat datasets get a manifest (see split_manifest.py) on first use, so the
+    images tested here are never ones the model was trained on. Without a
+    manifest the Test (or Validation) folder is listed as before.
+    """
+    from split_manifest import ensure_split_manifest, split_files
+    from data_preparation_optimized import load_exclusions
+    
+    is_standard_split = os.path.exists(os.path.join(dataset_path, "Train"))
+    manifest = ensure_split_manifest(dataset_path, create=not is_standard_split)
+    if manifest is not None:
+        files, labels, class_indices = split_files(manifest, dataset_path, 'Test',
+                                                   exclude=load_exclusions(dataset_path))
+        print(f"Using Test split from the split manifest ({len(files)} images)")
+        names = {i: name for name, i in class_indices.items()}
+        candidates = {name: [] for name in class_indices}
+        for path, label in zip(files, labels):
+            candidates[names[label]].append(path)
+        return candidates
+    
     # Check if "Test" folder exists inside
     if os.path.exists(os.path.join(dataset_path, "Test")):
         dataset_path = os.path.join(dataset_path, "Test")
@@ -48,7 +63,23 @@ def main():
         dataset_path = os.path.join(dataset_path, "Validation")
         print(f"Using Validation split at: {dataset_path}")
     
-    samples_per_class = 5  # Number of images to test per class
+    candidates = {}
+    for label in ['Fake', 'Real']:
+        folder_path = os.path.join(dataset_path, label)
+        if not os.path.exists(folder_path):
+            print(f"Folder not found: {folder_path}")
+            continue
+        candidates[label] = [os.path.join(folder_path, f) for f in os.listdir(folder_path)
+                             if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
+    return candidates
+
+def main(args):
+    model_path = args.model
+    dataset_path = args.dataset_path
+    if not os.path.exists(dataset_path):
+        # Fallback to the one in the parent if subfolder doesn't exist
+        dataset_path = os.path.dirname(os.path.normpath(dataset_path))
+    samples_per_class = args.samples_per_class  # Number of images to test per class
     
     print(f"Loading model: {model_path}")
     if not os.path.exists(model_path):
@@ -72,6 +103,8 @@ def main():
         img_height = 150
         print(f"Using default shape: {img_width}x{img_height}")
 
+    candidates = test_split_candidates(dataset_path)
+    
     print("\n" + "="*80)
     print(f"{'FILENAME':<30} | {'TRUE':<6} | {'PRED':<6} | {'CONF':<8} | {'STATUS'}")
     print("="*80)
@@ -79,23 +112,16 @@ def main():
     correct_count = 0
     total_count = 0
     
-    # Iterate through folders
-    for label in ['Fake', 'Real']:
-        folder_path = os.path.join(dataset_path, label)
-        if not os.path.exists(folder_path):
-            print(f"Folder not found: {folder_path}")
-            continue
-            
-        all_files = [f for f in os.listdir(folder_path) if f.lower().endswith(('.png', '.jpg', '.jpeg', '.webp'))]
-        
+    # Iterate through classes
+    for label, all_files in candidates.items():
         # Randomly sample
         if len(all_files) > samples_per_class:
             selected_files = random.sample(all_files, samples_per_class)
         else:
             selected_files = all_files
             
-        for filename in selected_files:
-            file_path = os.path.join(folder_path, filename)
+        for file_path in selected_files:
+            filename = os.path.basename(file_path)
             
             score, error = predict_image(model, file_path, img_width, img_height)
             
@@ -126,4 +152,10 @@ def main():
         print("No images found.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Spot-check the model on random test images')
+    parser.add_argument('--model', type=str, default='model/checkpoints/final_model_pro.keras',
+                        help='Model to test')
+    parser.add_argument('--dataset-path', type=str, default='/Users/harshvardhan/Developer/deepfake/Dataset/Image Dataset',
+                        help='Dataset root (flat Real/Fake or Train/Validation/Test)')
+    parser.add_argument('--samples-per-class', type=int, default=5, help='Images to test per class')
+    main(parser.parse_args())
@@ -8,6 +8,8 @@ from tensorflow.keras.callbacks import ModelCheckpoint, ReduceLROnPlateau, Early
 from datetime import datetime
 import matplotlib.pyplot as plt
 import tensorflow as tf
+from training_state import FullStateCheckpoint, ResumedEpoch
+from distributed import chief_only_dir, cleanup_worker_dir, is_multi_worker, fit_multi_worker
 
 # Enable XLA (Accelerated Linear Algebra) for faster computation
 # Disabled for Metal backend compatibility
@@ -60,7 +62,9 @@ def create_callbacks_optimized(checkpoint_dir='checkpoints', model_name='final_m
     return [checkpoint, early_stopping, reduce_lr]
 
 def train_model_optimized(model, train_generator, validation_generator, epochs=50, 
-                         checkpoint_dir='checkpoints', model_name='final_model.keras'):
+                         checkpoint_dir='checkpoints', model_name='final_model.keras',
+                         resume=False, phase='train', save_every_steps=None, max_state_checkpoints=3,
+                         strategy=None, extra_callbacks=None, instrumentation=None):
     """
     Train the model with OPTIMIZATIONS for faster training
     
@@ -71,10 +75,24 @@ def train_model_optimized(model, train_generator, validation_generator, epochs=5
         epochs: Number of epochs
         checkpoint_dir: Directory to save checkpoints
         model_name: Name of the model file to save
+        resume: Continue from the latest full-state checkpoint of this phase
+        phase: Name of the training phase ('train', 'fine_tune'); each phase
+            keeps its own full-state checkpoints under checkpoint_dir/train_state/
+        save_every_steps: Also write a full-state checkpoint every N steps
+        max_state_checkpoints: Number of full-state checkpoints to keep
+        strategy: Optional tf.distribute strategy the model was built under;
+            only the chief worker keeps checkpoint files
+        extra_callbacks: Additional Keras callbacks (e.g. learning-rate warmup)
+        instrumentation: Optional TrainingInstrumentation measuring step time,
+            data wait, throughput and memory
         
     Returns:
         Training history
     """
+    # Non-chief workers write their checkpoints to a throwaway directory
+    requested_checkpoint_dir = checkpoint_dir
+    checkpoint_dir = chief_only_dir(checkpoint_dir, strategy)
+    
     # Create checkpoint directory if it doesn't exist
     if not os.path.exists(checkpoint_dir):
         os.makedirs(checkpoint_dir)
@@ -110,7 +128,35 @@ def train_model_optimized(model, train_generator, validation_generator, epochs=5
         min_delta=0.0001
     )
     
-    callbacks_list = [checkpoint, reduce_lr, early_stopping]
+    # Full-state checkpoints (weights, optimizer, counters, callback state,
+    # data order) so preempted runs can continue exactly where they stopped.
+    # Must stay last in the callback list (see FullStateCheckpoint).
+    state_checkpoint = FullStateCheckpoint(
+        os.path.join(checkpoint_dir, 'train_state', phase),
+        model,
+        train_generator=train_generator,
+        tracked_callbacks=[checkpoint, reduce_lr, early_stopping],
+        save_every_steps=save_every_steps,
+        max_to_keep=max_state_checkpoints,
+        restore_dir=os.path.join(requested_checkpoint_dir, 'train_state', phase)
+    )
+    
+    extra_callbacks = list(extra_callbacks or []) + ([instrumentation] if instrumentation else [])
+    callbacks_list = [checkpoint, reduce_lr, early_stopping] + extra_callbacks + [state_checkpoint]
+    
+    initial_epoch = 0
+    initial_step = 0
+    previous_history = {}
+    if resume:
+        restored = state_checkpoint.restore()
+        if restored is None:
+            print(f"No saved training state for phase '{phase}'. Starting from scratch.")
+        else:
+            initial_epoch, initial_step, completed, previous_history = restored
+            if completed or initial_epoch >= epochs:
+                print(f"✓ Phase '{phase}' already completed. Skipping training.")
+                cleanup_worker_dir(checkpoint_dir, requested_checkpoint_dir)
+                return _merged_history(model, previous_history)
     
     print("\n" + "="*50)
     print("🚀 Starting OPTIMIZED Model Training")
@@ -120,13 +166,20 @@ def train_model_optimized(model, train_generator, validation_generator, epochs=5
     print(f"Validation samples: {validation_generator.samples}")
     print(f"Batch size: {train_generator.batch_size}")
     print(f"Checkpoints will be saved to: {checkpoint_path}")
-    print("\n⚡ Performance Optimizations Enabled:")
-    print("   • Mixed Precision Training (FP16)")
-    print("   • XLA Compilation")
-    print("   • Optimized Callbacks")
-    print("   • Streamlined Data Pipeline")
+    print("\n⚡ Performance Settings (actual):")
+    print(f"   • Precision policy: {tf.keras.mixed_precision.global_policy().name}")
+    print(f"   • XLA JIT: {'on' if tf.config.optimizer.get_jit() else 'off'}")
+    print(f"   • Data pipeline: {'tf.data' if hasattr(train_generator, 'dataset') else 'Keras generator'}")
+    if instrumentation:
+        print(f"   • Instrumentation: {instrumentation.log_path or 'console only'}")
     print("="*50 + "\n")
     
+    # tf.data pipelines (DatasetSplit) are fed through their dataset
+    train_data = getattr(train_generator, 'dataset', train_generator)
+    is_generator = train_data is train_generator
+    if instrumentation:
+        train_data = instrumentation.instrument(train_data)
+    
     # Calculate steps per epoch (robust to small datasets)
     import math
     if train_generator.samples > 0:
@@ -136,7 +189,7 @@ def train_model_optimized(model, train_generator, validation_generator, epochs=5
         
     # Validation config
     if validation_generator and validation_generator.samples > 0:
-        validation_data = validation_generator
+        validation_data = getattr(validation_generator, 'dataset', validation_generator)
         validation_steps = math.ceil(validation_generator.samples / validation_generator.batch_size)
     else:
         print("WARNING: No validation data available. Skipping validation.")
@@ -162,24 +215,82 @@ def train_model_optimized(model, train_generator, validation_generator, epochs=5
     except Exception as e:
         print(f"Warning: Could not calculate class weights: {e}")
 
-    # OPTIMIZED: Training with optimized settings
-    history = model.fit(
-        train_generator,
-        steps_per_epoch=steps_per_epoch,
-        epochs=epochs,
+    # Batches are already shuffled by the generator; keeping Keras from
+    # reordering them makes the data position reproducible on resume
+    fit_kwargs = dict(
         validation_data=validation_data,
         validation_steps=validation_steps,
         callbacks=callbacks_list,
         class_weight=class_weights,
+        shuffle=False,
         verbose=1
     )
     
+    def fit(data, **kwargs):
+        if is_multi_worker(strategy):
+            # Keras fit() cannot reduce across workers; use the custom loop
+            return fit_multi_worker(
+                model, strategy, data,
+                validation_data=validation_data,
+                validation_steps=validation_steps,
+                callbacks=callbacks_list,
+                class_weight=class_weights,
+                **kwargs
+            )
+        return model.fit(data, **kwargs, **fit_kwargs)
+    
+    histories = [previous_history]
+    
+    if initial_step > 0:
+        # Finish the interrupted epoch with the batches it had not seen yet.
+        # Keras generators replay their saved order; tf.data pipelines only
+        # resume the step count (with a fresh shuffle).
+        remaining_steps = steps_per_epoch - initial_step
+        print(f"Finishing epoch {initial_epoch + 1}: {remaining_steps} remaining steps")
+        state_checkpoint.step_offset = initial_step
+        partial_data = ResumedEpoch(train_generator, initial_step) if is_generator else train_data
+        if instrumentation and is_generator:
+            partial_data = instrumentation.instrument(partial_data)
+        partial = fit(
+            partial_data,
+            steps_per_epoch=remaining_steps,
+            initial_epoch=initial_epoch,
+            epochs=initial_epoch + 1
+        )
+        histories.append(partial.history)
+        initial_epoch += 1
+    
+    if initial_epoch < epochs and not model.stop_training:
+        # OPTIMIZED: Training with optimized settings
+        history = fit(
+            train_data,
+            steps_per_epoch=steps_per_epoch,
+            initial_epoch=initial_epoch,
+            epochs=epochs
+        )
+        histories.append(history.history)
+    
+    state_checkpoint.mark_completed()
+    cleanup_worker_dir(checkpoint_dir, requested_checkpoint_dir)
+    history = _merged_history(model, *histories)
+    
     print("\n" + "="*50)
     print("✅ Training Completed!")
     print("="*50 + "\n")
     
     return history
 
+def _merged_history(model, *history_dicts):
+    """Combine per-epoch logs from several fit() calls into one History object"""
+    merged = {}
+    for history_dict in history_dicts:
+        for key, values in history_dict.items():
+            merged.setdefault(key, []).extend(values)
+    history = tf.keras.callbacks.History()
+    history.set_model(model)
+    history.history = merged
+    return history
+
 def plot_training_history(history, save_path='training_history.png'):
     """
     Plot training and validation accuracy/loss
@@ -0,0 +1,229 @@
+"""
+Training Throughput Instrumentation for Deepfake Detection
+Measures what every training step actually spends its time on: waiting for
+the input pipeline vs. computing, plus images/sec and host memory. Per-step
+records go to a JSON-lines log and every epoch ends with a summary table, so
+input-pipeline stalls (e.g. from flow_from_directory) are easy to spot.
+Optionally captures a TensorFlow profiler trace for a window of steps.
+"""
+
+import os
+import sys
+import json
+import time
+import resource
+
+import numpy as np
+import tensorflow as tf
+
+try:
+    import psutil
+except ImportError:  # optional: fall back to peak RSS from the resource module
+    psutil = None
+
+
+def host_memory_mb():
+    """
+    Current and peak resident memory of this process in MB
+
+    Returns:
+        (current_mb or None, peak_mb)
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    peak_mb = peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    current_mb = psutil.Process().memory_info().rss / (1024 * 1024) if psutil else None
+    return current_mb, peak_mb
+
+
+class InstrumentedSequence(tf.keras.utils.Sequence):
+    """
+    Wrap a Keras data generator and record when each batch finished loading
+
+    Keras loads generator batches on a background thread ahead of the training
+    step. A step only waits for data when its batch became ready after the
+    step started, which is what the load timestamps recorded here reveal.
+    """
+
+    def __init__(self, generator, instrumentation):
+        super().__init__()
+        self.generator = generator
+        self.instrumentation = instrumentation
+
+    def __len__(self):
+        return len(self.generator)
+
+    def __getitem__(self, index):
+        start = time.perf_counter()
+        batch = self.generator[index]
+        self.instrumentation.record_batch(index, start, time.perf_counter(), len(batch[0]))
+        return batch
+
+    def on_epoch_end(self):
+        self.generator.on_epoch_end()
+
+
+class TrainingInstrumentation(tf.keras.callbacks.Callback):
+    """
+    Per-step timing, throughput and memory for model.fit()
+
+    For Keras generators wrapped with `instrument()`, each step's time is
+    split into data wait and compute. tf.data pipelines load inside the
+    training graph, so for them only step time and throughput are reported.
+    """
+
+    def __init__(self, log_path=None, batch_size=None, profile_steps=None, profile_dir='logs/profile',
+                 stall_threshold=0.2):
+        """
+        Args:
+            log_path: JSON-lines file for per-step and per-epoch records (None = no file)
+            batch_size: Images per batch, used when the batch size cannot be observed
+            profile_steps: Optional (first, last) global step window to trace with the TF profiler
+            profile_dir: Directory for profiler traces (open in TensorBoard's Profile tab)
+            stall_threshold: Data-wait share of step time above which an epoch is flagged input-bound
+        """
+        super().__init__()
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.profile_steps = profile_steps
+        self.profile_dir = profile_dir
+        self.stall_threshold = stall_threshold
+        self.global_step = 0
+        self._profiling = False
+        self._log_file = None
+        self._batches = {}
+        self._instrumented = False
+
+    def instrument(self, data):
+        """Wrap a Keras generator so data wait can be measured; other inputs are returned unchanged"""
+        if isinstance(data, tf.keras.utils.Sequence):
+            self._instrumented = True
+            return InstrumentedSequence(data, self)
+        return data
+
+    def record_batch(self, index, start, end, size):
+        self._batches[index] = (start, end, size)
+
+    # ---------- fit hooks ----------
+
+    def on_train_begin(self, logs=None):
+        if self.log_path and self._log_file is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.log_path)), exist_ok=True)
+            self._log_file = open(self.log_path, 'a')
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._epoch_start = time.perf_counter()
+        self._steps = []
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.profile_steps and self.global_step == self.profile_steps[0] and not self._profiling:
+            tf.profiler.experimental.start(self.profile_dir)
+            self._profiling = True
+            print(f"\n🔬 Profiler trace started at step {self.global_step}")
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        end = time.perf_counter()
+        step_time = end - self._step_start
+
+        data_wait = None
+        size = self.batch_size
+        loaded = self._batches.pop(batch, None)
+        if loaded is not None:
+            _, ready, size = loaded
+            # Only the part of the load that finished after the step began was waited for
+            data_wait = min(max(ready - self._step_start, 0.0), step_time)
+
+        current_mb, peak_mb = host_memory_mb()
+        record = {
+            'type': 'step',
+            'epoch': self._epoch,
+            'step': batch,
+            'global_step': self.global_step,
+            'step_ms': step_time * 1000,
+            'data_wait_ms': data_wait * 1000 if data_wait is not None else None,
+            'compute_ms': (step_time - data_wait) * 1000 if data_wait is not None else None,
+            'images': size,
+            'images_per_sec': size / step_time if size and step_time > 0 else None,
+            'rss_mb': current_mb,
+            'peak_rss_mb': peak_mb
+        }
+        self._steps.append(record)
+        self._write(record)
+
+        if self._profiling and self.global_step >= self.profile_steps[1]:
+            self._stop_profiler()
+        self.global_step += 1
+
+    def on_epoch_end(self, epoch, logs=None):
+        if not self._steps:
+            return
+        summary = self._summarize(epoch, time.perf_counter() - self._epoch_start)
+        self._write(summary)
+        self._print_summary(summary)
+
+    def on_train_end(self, logs=None):
+        self._stop_profiler()
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
+
+    # ---------- reporting ----------
+
+    def _stop_profiler(self):
+        if self._profiling:
+            tf.profiler.experimental.stop()
+            self._profiling = False
+            print(f"\n🔬 Profiler trace saved to: {self.profile_dir}")
+
+    def _write(self, record):
+        if self._log_file:
+            self._log_file.write(json.dumps(record) + "\n")
+            self._log_file.flush()
+
+    def _summarize(self, epoch, epoch_seconds):
+        # The first step of an epoch includes tracing/warm-up; keep it out of the percentiles
+        steps = self._steps[1:] if len(self._steps) > 1 else self._steps
+        step_ms = np.array([s['step_ms'] for s in steps])
+        waits = [s['data_wait_ms'] for s in steps if s['data_wait_ms'] is not None]
+        images = sum(s['images'] or 0 for s in self._steps)
+        train_seconds = sum(s['step_ms'] for s in self._steps) / 1000
+
+        summary = {
+            'type': 'epoch',
+            'epoch': epoch,
+            'steps': len(self._steps),
+            'epoch_seconds': epoch_seconds,
+            'step_ms_mean': float(step_ms.mean()),
+            'step_ms_p50': float(np.percentile(step_ms, 50)),
+            'step_ms_p95': float(np.percentile(step_ms, 95)),
+            'images_per_sec': images / train_seconds if train_seconds > 0 else None,
+            'data_wait_ms_mean': float(np.mean(waits)) if waits else None,
+            'data_wait_fraction': float(np.sum(waits) / step_ms[:len(waits)].sum()) if waits else None,
+            'rss_mb': self._steps[-1]['rss_mb'],
+            'peak_rss_mb': self._steps[-1]['peak_rss_mb']
+        }
+        if summary['data_wait_ms_mean'] is not None:
+            summary['compute_ms_mean'] = summary['step_ms_mean'] - summary['data_wait_ms_mean']
+        return summary
+
+    def _print_summary(self, s):
+        def fmt(value, spec):
+            return format(value, spec) if value is not None else '-'
+
+        print("\n" + "-"*70)
+        print(f"⏱️  Epoch {s['epoch'] + 1} throughput ({s['steps']} steps, {s['epoch_seconds']:.1f}s incl. validation)")
+        print("-"*70)
+        print(f"{'Step time (mean / p50 / p95)':<34}{s['step_ms_mean']:.1f} / {s['step_ms_p50']:.1f} / {s['step_ms_p95']:.1f} ms")
+        print(f"{'Waiting on data (mean)':<34}{fmt(s['data_wait_ms_mean'], '.1f')} ms"
+              f" ({fmt(s['data_wait_fraction'], '.1%')} of step time)")
+        print(f"{'Compute (mean)':<34}{fmt(s.get('compute_ms_mean'), '.1f')} ms")
+        print(f"{'Throughput':<34}{fmt(s['images_per_sec'], '.1f')} images/sec")
+        print(f"{'Host memory (current / peak)':<34}{fmt(s['rss_mb'], '.0f')} / {s['peak_rss_mb']:.0f} MB")
+        if s['data_wait_fraction'] is not None and s['data_wait_fraction'] > self.stall_threshold:
+            print(f"⚠️  Input-bound: the model waited for data {s['data_wait_fraction']:.0%} of the time "
+                  f"(consider the tf.data pipeline: --data-pipeline tfdata)")
+        elif not self._instrumented:
+            print("   (data wait is not measured for tf.data pipelines)")
+        print("-"*70)
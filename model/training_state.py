@@ -0,0 +1,185 @@
+"""
+Full Training-State Checkpointing for Deepfake Detection
+Periodically saves everything needed to continue an interrupted run exactly
+where it stopped: weights, optimizer slots and loss scale, learning rate,
+epoch/step counters, callback state and the training data order.
+"""
+
+import os
+import json
+
+import numpy as np
+import tensorflow as tf
+
+# Attributes of Keras callbacks (ModelCheckpoint, ReduceLROnPlateau,
+# EarlyStopping) that must survive a restart for them to behave identically
+TRACKED_CALLBACK_ATTRS = ('wait', 'cooldown_counter', 'best', 'stopped_epoch', 'best_epoch')
+
+
+def _to_json_value(value):
+    if isinstance(value, (np.floating, np.integer)):
+        return value.item()
+    if hasattr(value, 'numpy'):
+        return value.numpy().item()
+    return value
+
+
+class ResumedEpoch(tf.keras.utils.Sequence):
+    """
+    View of a Keras data generator that skips the batches already consumed in
+    the interrupted epoch, so the remaining batches keep their original order
+    """
+
+    def __init__(self, generator, offset):
+        super().__init__()
+        self.generator = generator
+        self.offset = offset
+
+    def __len__(self):
+        return len(self.generator) - self.offset
+
+    def __getitem__(self, index):
+        return self.generator[self.offset + index]
+
+    def on_epoch_end(self):
+        self.generator.on_epoch_end()
+
+
+class FullStateCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Save and restore the complete training state with tf.train.Checkpoint
+
+    Checkpoints are written at the end of every epoch and, optionally, every
+    `save_every_steps` training steps. A CheckpointManager keeps the newest
+    `max_to_keep` checkpoints and deletes older ones.
+
+    This callback must come LAST in the callback list: Keras resets
+    ReduceLROnPlateau/EarlyStopping in `on_train_begin`, and the restored
+    state is pushed back into them afterwards.
+    """
+
+    def __init__(self, state_dir, model, train_generator=None, tracked_callbacks=(),
+                 save_every_steps=None, max_to_keep=3, restore_dir=None):
+        """
+        Args:
+            state_dir: Directory for the checkpoint files of this training phase
+            model: Compiled Keras model (its optimizer is checkpointed too)
+            train_generator: Training generator whose shuffle order is saved
+                (anything with an `index_array`, e.g. flow_from_directory)
+            tracked_callbacks: Callbacks whose internal counters are saved
+            save_every_steps: Also checkpoint every N training steps (None = per epoch only)
+            max_to_keep: Number of checkpoints kept by the manager
+            restore_dir: Where to restore from if different from state_dir
+                (multi-worker runs restore every worker from the chief's files)
+        """
+        super().__init__()
+        self.state_dir = state_dir
+        self.train_generator = train_generator
+        self.tracked_callbacks = list(tracked_callbacks)
+        self.save_every_steps = save_every_steps
+        self.restore_dir = restore_dir or state_dir
+        self.step_offset = 0
+        self._pending_callback_state = None
+
+        optimizer = model.optimizer
+        if hasattr(optimizer, 'build') and not getattr(optimizer, 'built', True):
+            # Create slot variables now so they are restored eagerly
+            with model.distribute_strategy.scope():
+                optimizer.build(model.trainable_variables)
+
+        self.epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.step_in_epoch = tf.Variable(0, dtype=tf.int64, trainable=False)
+        self.completed = tf.Variable(False, trainable=False)
+        self.callback_state = tf.Variable('{}', dtype=tf.string, trainable=False)
+        self.history = tf.Variable('{}', dtype=tf.string, trainable=False)
+
+        tracked = dict(model=model, optimizer=optimizer, epoch=self.epoch,
+                       step_in_epoch=self.step_in_epoch, completed=self.completed,
+                       callback_state=self.callback_state, history=self.history)
+        num_samples = getattr(train_generator, 'n', None)
+        if num_samples:
+            self.index_array = tf.Variable(np.arange(num_samples, dtype=np.int64), trainable=False)
+            tracked['index_array'] = self.index_array
+        else:
+            self.index_array = None
+
+        os.makedirs(state_dir, exist_ok=True)
+        self.checkpoint = tf.train.Checkpoint(**tracked)
+        self.manager = tf.train.CheckpointManager(self.checkpoint, state_dir, max_to_keep=max_to_keep)
+
+    # ---------- restore ----------
+
+    def restore(self):
+        """
+        Restore the latest checkpoint, if any
+
+        Returns:
+            (epoch, step_in_epoch, completed, history_dict) or None if there is nothing to resume
+        """
+        latest = tf.train.latest_checkpoint(self.restore_dir)
+        if latest is None:
+            return None
+
+        self.checkpoint.restore(latest).expect_partial()
+        epoch = int(self.epoch.numpy())
+        step = int(self.step_in_epoch.numpy())
+        self._pending_callback_state = json.loads(self.callback_state.numpy().decode())
+
+        if step > 0 and self.index_array is not None:
+            # Mid-epoch: replay the remaining batches in the original shuffled order
+            self.train_generator.index_array = self.index_array.numpy()
+
+        print(f"🔁 Restored training state from {latest}")
+        print(f"   Epoch: {epoch + 1}, step in epoch: {step}")
+        return epoch, step, bool(self.completed.numpy()), json.loads(self.history.numpy().decode())
+
+    def on_train_begin(self, logs=None):
+        if self._pending_callback_state:
+            for cb, state in zip(self.tracked_callbacks, self._pending_callback_state):
+                for attr, value in state.items():
+                    setattr(cb, attr, value)
+        self.completed.assign(False)
+
+    # ---------- save ----------
+
+    def _callback_states(self):
+        return [
+            {attr: _to_json_value(getattr(cb, attr)) for attr in TRACKED_CALLBACK_ATTRS if hasattr(cb, attr)}
+            for cb in self.tracked_callbacks
+        ]
+
+    def _save(self, epoch, step_in_epoch):
+        self.epoch.assign(epoch)
+        self.step_in_epoch.assign(step_in_epoch)
+        self.callback_state.assign(json.dumps(self._callback_states()))
+        if self.index_array is not None and getattr(self.train_generator, 'index_array', None) is not None:
+            self.index_array.assign(self.train_generator.index_array.astype(np.int64))
+        self.manager.save()
+
+    def on_train_batch_end(self, batch, logs=None):
+        step = self.step_offset + batch + 1
+        if self.save_every_steps and step % self.save_every_steps == 0:
+            self._save(self._current_epoch, step)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._current_epoch = epoch
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.step_offset = 0
+        history = json.loads(self.history.numpy().decode())
+        for key, value in (logs or {}).items():
+            history.setdefault(key, []).append(float(value))
+        self.history.assign(json.dumps(history))
+        self._save(epoch + 1, 0)
+
+    def on_train_end(self, logs=None):
+        # Carry callback state into the next fit() call of the same phase
+        self._pending_callback_state = self._callback_states()
+        if self.model.stop_training:
+            self.completed.assign(True)
+            self.manager.save()
+
+    def mark_completed(self):
+        """Flag this phase as finished so a later --resume skips straight past it"""
+        self.completed.assign(True)
+        self.manager.save()
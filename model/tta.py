@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test-Time Augmentation for Deepfake Detection
+Scores every input under several views (flips, crops, rescaled copies) and
+averages the "Real" probabilities. All views of all inputs are built as one
+batch on the TensorFlow side and scored with a single forward pass, so a
+6-view policy costs one larger batch instead of six model calls.
+
+A policy is a named preset or a comma-separated list of views:
+
+    none        identity only (the plain forward pass)
+    flip        identity, horizontal flip
+    crop        identity + center and four corner crops (CROP_FRACTION of each side)
+    multiscale  identity + copies scaled down to 3/4 and 1/2 and back up
+    full        flip + crop + multiscale
+
+    e.g. --tta flip   or   --tta identity,hflip,crop_center,scale_0.6
+
+Views are purely geometric, so they can be applied to model-ready batches
+(after preprocess_input) as well as to raw 0-255 images.
+"""
+
+import re
+
+import numpy as np
+import tensorflow as tf
+
+CROP_FRACTION = 0.875
+
+# Crop boxes as (y1, x1, y2, x2) in relative coordinates
+_MARGIN = 1.0 - CROP_FRACTION
+CROP_BOXES = {
+    'crop_center': (_MARGIN / 2, _MARGIN / 2, 1.0 - _MARGIN / 2, 1.0 - _MARGIN / 2),
+    'crop_tl': (0.0, 0.0, CROP_FRACTION, CROP_FRACTION),
+    'crop_tr': (0.0, _MARGIN, CROP_FRACTION, 1.0),
+    'crop_bl': (_MARGIN, 0.0, 1.0, CROP_FRACTION),
+    'crop_br': (_MARGIN, _MARGIN, 1.0, 1.0),
+}
+
+POLICIES = {
+    'none': ('identity',),
+    'flip': ('identity', 'hflip'),
+    'crop': ('identity',) + tuple(CROP_BOXES),
+    'multiscale': ('identity', 'scale_0.75', 'scale_0.5'),
+}
+POLICIES['full'] = ('identity', 'hflip') + POLICIES['crop'][1:] + POLICIES['multiscale'][1:]
+
+_SCALE_VIEW = re.compile(r'^scale_(0?\.\d+|1(\.0*)?)$')
+
+
+def parse_policy(spec):
+    """
+    Turn a policy name or a comma-separated view list into a tuple of view names
+
+    Args:
+        spec: e.g. 'flip', 'full' or 'identity,hflip,scale_0.6' (None or '' means 'none')
+
+    Returns:
+        Tuple of view names, without duplicates
+
+    Raises:
+        ValueError: for unknown policies or views
+    """
+    spec = (spec or 'none').strip().lower()
+    if spec in POLICIES:
+        return POLICIES[spec]
+    views = []
+    for view in (v.strip() for v in spec.split(',')):
+        if view in POLICIES:
+            candidates = POLICIES[view]
+        elif view in ('identity', 'hflip') or view in CROP_BOXES or _SCALE_VIEW.match(view):
+            candidates = (view,)
+        else:
+            raise ValueError(f"Unknown TTA view or policy '{view}' (policies: {', '.join(POLICIES)}; "
+                             f"views: identity, hflip, {', '.join(CROP_BOXES)}, scale_<0-1>)")
+        views.extend(v for v in candidates if v not in views)
+    return tuple(views)
+
+
+def _view(images, view):
+    """One view of a float (N, H, W, 3) batch, at the same size"""
+    height, width = images.shape[1], images.shape[2]
+    if view == 'identity':
+        return images
+    if view == 'hflip':
+        return tf.image.flip_left_right(images)
+    if view in CROP_BOXES:
+        boxes = tf.tile(tf.constant([CROP_BOXES[view]], dtype=tf.float32), [tf.shape(images)[0], 1])
+        box_indices = tf.range(tf.shape(images)[0])
+        return tf.image.crop_and_resize(images, boxes, box_indices, (height, width))
+    # scale_<s>: a lower-resolution copy brought back to the input size
+    scale = float(view.split('_', 1)[1])
+    small = tf.image.resize(images, (max(1, round(height * scale)), max(1, round(width * scale))),
+                            antialias=True)
+    return tf.image.resize(small, (height, width))
+
+
+def augment_batch(images, views):
+    """
+    Build every view of every input as one batch
+
+    Args:
+        images: (N, H, W, 3) array or tensor
+        views: View names (parse_policy())
+
+    Returns:
+        float32 tensor of shape (N * len(views), H, W, 3), input-major: the
+        views of input 0 first, then those of input 1, ...
+    """
+    images = tf.convert_to_tensor(images, dtype=tf.float32)
+    if views == ('identity',):
+        return images
+    stacked = tf.stack([_view(images, view) for view in views], axis=1)
+    return tf.reshape(stacked, (-1,) + tuple(images.shape[1:]))
+
+
+def predict_tta(model, images, views):
+    """
+    Score a batch under a TTA policy with a single forward pass
+
+    Args:
+        model: Loaded Keras model (one sigmoid output, Fake=0, Real=1)
+        images: (N, H, W, 3) model-ready batch
+        views: View names (parse_policy())
+
+    Returns:
+        (scores, view_scores): N mean "Real" probabilities and the (N, len(views)) per-view ones
+    """
+    if len(images) == 0:
+        return np.empty((0,), dtype=np.float32), np.empty((0, len(views)), dtype=np.float32)
+    batch = augment_batch(images, views)
+    view_scores = np.asarray(model.predict_on_batch(batch), dtype=np.float32).reshape(len(images), len(views))
+    return view_scores.mean(axis=1), view_scores
+
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Index for Deepfake Detection Datasets
+Loads the perceptual hashes recorded by scan_dataset.py into a Hamming-space
+index and finds every pair of images within a radius of each other, without
+comparing every hash against every other hash. Two index structures:
+
+    mih     Multi-index hashing (default). The 64-bit hash is cut into 4
+            16-bit chunks, each with its own lookup table. Two hashes within
+            r bits agree to within r // 4 bits on at least one chunk, so a
+            query only probes the few table entries near its own chunks.
+    bktree  Burkhard-Keller tree. Only subtrees whose edge distance lies in
+            [d - r, d + r] are visited. Prunes well for small radii (<= 4),
+            but visits a large part of the tree at r = 8.
+
+Matching images are grouped into near-duplicate clusters (connected
+components), and an exclusion list is written to the dataset root. The
+training and evaluation pipelines in model/data_preparation_optimized.py skip
+the listed files for every dataset returned by get_dataset_path().
+
+Policies:
+    leakage  Only break cross-split leakage: a cluster keeps its members in
+             the highest-priority split (Test > Validation > Train) and drops
+             the copies in the others. Evaluation sets are never reduced.
+             Flat Real/Fake datasets take their splits from the split
+             manifest (model/split_manifest.py).
+    dedup    Keep a single image per cluster (largest resolution in the
+             highest-priority split) and drop the rest.
+
+Usage:
+    python phash_index.py --dataset-path Dataset
+    python phash_index.py --dataset-path Dataset --radius 6 --dhash-radius 10 --policy leakage
+    python phash_index.py --dataset-path Dataset --query suspicious.jpg
+"""
+
+import os
+import json
+import time
+import argparse
+import itertools
+from collections import defaultdict
+
+from PIL import Image
+
+from scan_dataset import open_index, update_index, apply_split_manifest, phash, dhash, DEFAULT_INDEX_NAME
+
+EXCLUSIONS_FILE = 'dataset_exclusions.txt'  # read by model/data_preparation_optimized.py
+SPLIT_PRIORITY = {'test': 3, 'validation': 2, 'train': 1, None: 0}
+
+
+def hamming(a, b):
+    """Number of differing bits between two integer hashes"""
+    return bin(a ^ b).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over integer hashes with Hamming distance
+
+    Each node holds one hash, the items sharing it, and children keyed by
+    their distance to the node. Identical hashes share a node, so exact
+    duplicates cost nothing extra to index or query.
+    """
+
+    def __init__(self):
+        self.root = None
+        self.nodes = 0
+        self.comparisons = 0  # distance computations made by queries (for reporting)
+
+    def add(self, value, item):
+        if self.root is None:
+            self.root = (value, [item], {})
+            self.nodes = 1
+            return
+        node = self.root
+        while True:
+            d = hamming(value, node[0])
+            if d == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(d)
+            if child is None:
+                node[2][d] = (value, [item], {})
+                self.nodes += 1
+                return
+            node = child
+
+    def query(self, value, radius):
+        """
+        All items whose hash is within `radius` bits of `value`
+
+        Returns:
+            List of (distance, hash, items) for each matching node
+        """
+        matches = []
+        stack = [self.root] if self.root is not None else []
+        while stack:
+            node_value, items, children = stack.pop()
+            d = hamming(value, node_value)
+            self.comparisons += 1
+            if d <= radius:
+                matches.append((d, node_value, items))
+            # Triangle inequality: only children at edge distance d-r..d+r can match
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return matches
+
+
+class MultiIndexHash:
+    """
+    Multi-index hashing over 64-bit hashes (Norouzi et al.)
+
+    Same interface as BKTree. Each distinct hash is stored once with its
+    items and referenced from one table per chunk.
+    """
+
+    def __init__(self, bits=64, chunks=4):
+        self.chunks = chunks
+        self.chunk_bits = bits // chunks
+        self.mask = (1 << self.chunk_bits) - 1
+        self.tables = [defaultdict(list) for _ in range(chunks)]
+        self.items = {}
+        self.comparisons = 0
+        self._flips = {}
+
+    @property
+    def nodes(self):
+        return len(self.items)
+
+    def _chunk(self, value, k):
+        return (value >> (k * self.chunk_bits)) & self.mask
+
+    def _flip_masks(self, radius):
+        """Every chunk-sized bit mask with at most `radius` bits set"""
+        if radius not in self._flips:
+            masks = [0]
+            for r in range(1, radius + 1):
+                for bits in itertools.combinations(range(self.chunk_bits), r):
+                    masks.append(sum(1 << b for b in bits))
+            self._flips[radius] = masks
+        return self._flips[radius]
+
+    def add(self, value, item):
+        if value in self.items:
+            self.items[value].append(item)
+            return
+        self.items[value] = [item]
+        for k in range(self.chunks):
+            self.tables[k][self._chunk(value, k)].append(value)
+
+    def query(self, value, radius):
+        """All items within `radius` bits, as (distance, hash, items) per matching hash"""
+        flips = self._flip_masks(radius // self.chunks)
+        seen = set()
+        matches = []
+        for k, table in enumerate(self.tables):
+            chunk = self._chunk(value, k)
+            for flip in flips:
+                for candidate in table.get(chunk ^ flip, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    self.comparisons += 1
+                    d = hamming(value, candidate)
+                    if d <= radius:
+                        matches.append((d, candidate, self.items[candidate]))
+        return matches
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = list(range(n))
+
+    def find(self, i):
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def load_hashes(conn):
+    """Decodable files from the scan index, with hashes as integers"""
+    rows = conn.execute("""SELECT path, split, label, width, height, phash, dhash, sha256 FROM files
+                           WHERE error IS NULL AND phash IS NOT NULL ORDER BY path""").fetchall()
+    return [{'path': path, 'split': split, 'label': label, 'pixels': (width or 0) * (height or 0),
+             'phash': int(ph, 16), 'dhash': int(dh, 16), 'sha256': sha}
+            for path, split, label, width, height, ph, dh, sha in rows]
+
+
+def build_tree(files, engine='mih'):
+    tree = MultiIndexHash() if engine == 'mih' else BKTree()
+    for i, f in enumerate(files):
+        tree.add(f['phash'], i)
+    return tree
+
+
+def find_clusters(files, tree, radius, dhash_radius=None):
+    """
+    Group files into near-duplicate clusters
+
+    Args:
+        files: Output of load_hashes()
+        tree: MultiIndexHash or BKTree over the files' pHashes
+        radius: Maximum pHash Hamming distance for a match
+        dhash_radius: Optional maximum dHash distance a pHash match must also meet
+
+    Returns:
+        List of clusters (lists of file indices), largest first
+    """
+    by_hash = defaultdict(list)
+    for i, f in enumerate(files):
+        by_hash[f['phash']].append(i)
+
+    uf = UnionFind(len(files))
+    for value, members in by_hash.items():
+        for _, _, items in tree.query(value, radius):
+            for i in members:
+                for j in items:
+                    if i < j and (dhash_radius is None or
+                                  hamming(files[i]['dhash'], files[j]['dhash']) <= dhash_radius):
+                        uf.union(i, j)
+
+    groups = defaultdict(list)
+    for i in range(len(files)):
+        groups[uf.find(i)].append(i)
+    clusters = [g for g in groups.values() if len(g) > 1]
+    return sorted(clusters, key=len, reverse=True)
+
+
+def plan_exclusions(files, clusters, policy='dedup', drop_conflicts=False):
+    """
+    Decide which cluster members to drop
+
+    Returns:
+        (set of excluded file indices, list of cluster summaries)
+    """
+    excluded = set()
+    summaries = []
+    for cluster in clusters:
+        members = [files[i] for i in cluster]
+        splits = {f['split'] for f in members}
+        labels = {f['label'] for f in members if f['label']}
+        keep_split = max(splits, key=lambda s: SPLIT_PRIORITY.get(s, 0))
+
+        if drop_conflicts and len(labels) > 1:
+            drop = set(cluster)  # the same face filed as Real and Fake: no trustworthy label
+        elif policy == 'leakage':
+            drop = {i for i in cluster if files[i]['split'] != keep_split}
+        else:
+            candidates = [i for i in cluster if files[i]['split'] == keep_split]
+            keep = min(candidates, key=lambda i: (-files[i]['pixels'], files[i]['path']))
+            drop = set(cluster) - {keep}
+        excluded |= drop
+
+        summaries.append({
+            'size': len(cluster),
+            'splits': sorted(s or '-' for s in splits),
+            'labels': sorted(labels),
+            'cross_split': len(splits) > 1,
+            'label_conflict': len(labels) > 1,
+            'members': [{'path': files[i]['path'], 'split': files[i]['split'], 'label': files[i]['label'],
+                         'excluded': i in drop} for i in cluster]
+        })
+    return excluded, summaries
+
+
+def write_exclusions(path, excluded_paths, header):
+    """Write one dataset-relative path per line ('#' lines are comments)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        for line in header:
+            f.write(f"# {line}\n")
+        for p in sorted(excluded_paths):
+            f.write(p.replace(os.sep, '/') + "\n")
+    os.replace(tmp_path, path)
+
+
+def query_image(image_path, files, tree, radius):
+    """Print the indexed images within `radius` of a single image"""
+    with Image.open(image_path) as img:
+        img.load()
+        query_phash, query_dhash = int(phash(img), 16), int(dhash(img), 16)
+    matches = []
+    for d, _, items in tree.query(query_phash, radius):
+        for i in items:
+            matches.append((d, hamming(query_dhash, files[i]['dhash']), files[i]))
+    print(f"\n🔎 {len(matches)} indexed images within {radius} bits of {image_path}:")
+    for d, dd, f in sorted(matches, key=lambda m: (m[0], m[1])):
+        print(f"   pHash {d:>2} | dHash {dd:>2} | {f['split'] or '-':<10} {f['label'] or '-':<5} {f['path']}")
+
+
+def main(args):
+    dataset_path = os.path.abspath(args.dataset_path)
+    if not os.path.isdir(dataset_path):
+        raise FileNotFoundError(f"Dataset path does not exist: {dataset_path}")
+    index_path = args.index or os.path.join(dataset_path, DEFAULT_INDEX_NAME)
+    output = args.output or os.path.join(dataset_path, EXCLUSIONS_FILE)
+
+    print("\n" + "="*70)
+    print(" "*18 + "🧬 NEAR-DUPLICATE INDEX 🧬")
+    print("="*70)
+    print(f"Dataset: {dataset_path}")
+    print(f"pHash radius: {args.radius}" + (f" | dHash radius: {args.dhash_radius}" if args.dhash_radius is not None else ""))
+    print("="*70)
+
+    conn = open_index(index_path)
+    if not args.no_scan:
+        update_index(dataset_path, conn, workers=args.workers)
+    else:
+        apply_split_manifest(dataset_path, conn)
+    files = load_hashes(conn)
+    corrupt = [p for (p,) in conn.execute("SELECT path FROM files WHERE error IS NOT NULL")]
+    conn.close()
+    if not files:
+        print("❌ No decodable images in the index")
+        return
+
+    start = time.perf_counter()
+    tree = build_tree(files, args.engine)
+    print(f"🌳 {'Multi-index hash' if args.engine == 'mih' else 'BK-tree'}: {len(files)} images, {tree.nodes} distinct hashes ({time.perf_counter() - start:.2f}s)")
+
+    if args.query:
+        query_image(args.query, files, tree, args.radius)
+        return
+
+    start = time.perf_counter()
+    clusters = find_clusters(files, tree, args.radius, args.dhash_radius)
+    elapsed = time.perf_counter() - start
+    brute_force = tree.nodes * tree.nodes
+    print(f"⏱️  Radius queries: {elapsed:.2f}s, {tree.comparisons} distance computations "
+          f"({tree.comparisons / brute_force:.1%} of brute force)")
+
+    excluded, summaries = plan_exclusions(files, clusters, policy=args.policy, drop_conflicts=args.drop_conflicts)
+    excluded_paths = {files[i]['path'] for i in excluded}
+    if not args.keep_corrupt:
+        excluded_paths |= set(corrupt)
+
+    cross_split = [s for s in summaries if s['cross_split']]
+    conflicts = [s for s in summaries if s['label_conflict']]
+    by_split = defaultdict(int)
+    for i in excluded:
+        by_split[files[i]['split'] or '-'] += 1
+
+    print("\n" + "-"*70)
+    print(f"Near-duplicate clusters: {len(clusters)} ({sum(len(c) for c in clusters)} images)")
+    print(f"Clusters spanning splits: {len(cross_split)}")
+    print(f"Clusters with Real and Fake labels: {len(conflicts)}")
+    print(f"Excluded ({args.policy}): {len(excluded)} duplicates"
+          + (f" + {len(corrupt)} corrupt" if corrupt and not args.keep_corrupt else "")
+          + (" | " + ", ".join(f"{s}: {n}" for s, n in sorted(by_split.items())) if by_split else ""))
+    for s in summaries[:args.max_items]:
+        print(f"   [{s['size']}] " + ", ".join(f"{m['path']}{' ✗' if m['excluded'] else ''}" for m in s['members'][:6])
+              + (" ..." if s['size'] > 6 else ""))
+    print("-"*70)
+
+    if args.dry_run:
+        print("\n(dry run: exclusion list not written)\n")
+    else:
+        write_exclusions(output, excluded_paths, [
+            f"Generated by phash_index.py on {time.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"policy={args.policy} radius={args.radius} dhash_radius={args.dhash_radius}",
+            "Paths are relative to the dataset root; delete this file to train on everything"
+        ])
+        print(f"\n✓ Exclusion list ({len(excluded_paths)} files) saved to: {output}")
+
+    if args.clusters:
+        with open(args.clusters, 'w') as f:
+            json.dump(summaries, f, indent=2)
+        print(f"✓ Clusters saved to: {args.clusters}")
+    print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Find near-duplicate images and build a dataset exclusion list')
+    parser.add_argument('--dataset-path', type=str, default='dataset', help='Dataset root')
+    parser.add_argument('--index', type=str, default=None,
+                        help=f'SQLite index from scan_dataset.py (default: <dataset>/{DEFAULT_INDEX_NAME})')
+    parser.add_argument('--radius', type=int, default=8, help='Max pHash Hamming distance (of 64 bits)')
+    parser.add_argument('--engine', choices=['mih', 'bktree'], default='mih',
+                        help='Index structure for radius queries (default: multi-index hashing)')
+    parser.add_argument('--dhash-radius', type=int, default=None,
+                        help='Also require dHash distance <= this (fewer false positives)')
+    parser.add_argument('--policy', choices=['dedup', 'leakage'], default='dedup',
+                        help='dedup: one image per cluster; leakage: only remove cross-split copies')
+    parser.add_argument('--drop-conflicts', action='store_true',
+                        help='Exclude whole clusters that contain both Real and Fake images')
+    parser.add_argument('--keep-corrupt', action='store_true', help='Do not exclude undecodable files')
+    parser.add_argument('--output', type=str, default=None,
+                        help=f'Exclusion list (default: <dataset>/{EXCLUSIONS_FILE})')
+    parser.add_argument('--clusters', type=str, default=None, help='Write all clusters as JSON')
+    parser.add_argument('--query', type=str, default=None, help='Only list indexed near-duplicates of this image')
+    parser.add_argument('--dry-run', action='store_true', help='Report without writing the exclusion list')
+    parser.add_argument('--no-scan', action='store_true', help='Use the index as is, without rescanning changes')
+    parser.add_argument('--workers', type=int, default=None, help='Decoder processes for the rescan')
+    parser.add_argument('--max-items', type=int, default=10, help='Clusters printed')
+
+    main(parser.parse_args())
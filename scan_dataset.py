@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Dataset Integrity Scanner for Deepfake Detection
+Decodes every image of a dataset across a process pool and records its size,
+mode, dimensions, content hash (SHA-256) and perceptual hashes (pHash, dHash)
+in an SQLite index next to the data. Reports:
+
+    - corrupt or truncated files (anything PIL cannot fully decode)
+    - grayscale images (colourfulness below curation.GRAYSCALE_THRESHOLD)
+    - exact duplicates (same SHA-256) and near duplicates (same pHash)
+    - cross-split leakage: duplicates shared between Train/Validation/Test
+      (split folders, or the split manifest of a flat Real/Fake dataset)
+    - label conflicts: the same content filed under both Real and Fake
+
+The index is incremental: files whose size and modification time have not
+changed since the last scan are not decoded again, and deleted files are
+dropped from the index.
+
+Usage:
+    python scan_dataset.py --dataset-path Dataset
+    python scan_dataset.py --dataset-path dataset --workers 8 --report scan_report.json
+"""
+
+import os
+import io
+import time
+import json
+import sqlite3
+import hashlib
+import argparse
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+from curation import image_colorfulness, GRAYSCALE_THRESHOLD
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.webp', '.tif', '.tiff')
+SPLITS = ('train', 'validation', 'test')
+LABELS = ('real', 'fake')
+DEFAULT_INDEX_NAME = '.dataset_index.sqlite'
+# Written by model/split_manifest.py at the dataset root
+SPLIT_MANIFEST_FILE = 'split_manifest.json'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    split TEXT,
+    label TEXT,
+    size INTEGER,
+    mtime REAL,
+    sha256 TEXT,
+    format TEXT,
+    mode TEXT,
+    width INTEGER,
+    height INTEGER,
+    phash TEXT,
+    dhash TEXT,
+    grayscale INTEGER,
+    error TEXT,
+    scanned_at REAL
+);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+CREATE INDEX IF NOT EXISTS files_phash ON files (phash);
+"""
+
+COLUMNS = ('path', 'split', 'label', 'size', 'mtime', 'sha256', 'format', 'mode', 'width', 'height',
+           'phash', 'dhash', 'grayscale', 'error', 'scanned_at')
+
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so dct(x) = M @ x"""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    m = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    m[0] /= np.sqrt(2.0)
+    return m
+
+
+_DCT32 = _dct_matrix(32)
+
+
+def _bits_to_hex(bits):
+    """Pack a boolean array (64 bits) into a 16-character hex string"""
+    return np.packbits(bits.reshape(-1).astype(np.uint8)).tobytes().hex()
+
+
+def phash(img):
+    """
+    64-bit DCT perceptual hash: the low-frequency 8x8 DCT coefficients of a
+    32x32 grayscale thumbnail, thresholded at their median.
+    """
+    pixels = np.asarray(img.convert('L').resize((32, 32), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT32 @ pixels @ _DCT32.T)[:8, :8]
+    # The DC term only reflects overall brightness; leave it out of the median
+    median = np.median(low.reshape(-1)[1:])
+    return _bits_to_hex(low > median)
+
+
+def dhash(img):
+    """64-bit difference hash: brightness gradients of a 9x8 grayscale thumbnail"""
+    pixels = np.asarray(img.convert('L').resize((9, 8), Image.LANCZOS), dtype=np.int16)
+    return _bits_to_hex(pixels[:, 1:] > pixels[:, :-1])
+
+
+def split_and_label(rel_path):
+    """Infer (split, label) from a path relative to the dataset root, e.g. Train/Fake/x.jpg"""
+    parts = [p.lower() for p in rel_path.replace('\\', '/').split('/')[:-1]]
+    split = next((p for p in parts if p in SPLITS), None)
+    label = next((p for p in parts if p in LABELS), None)
+    return split, label
+
+
+def load_manifest_splits(dataset_path):
+    """{relative path: split} from the dataset's split manifest ({} if it has none)"""
+    path = os.path.join(dataset_path, SPLIT_MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return {rel_path: split.lower() for split, entries in manifest['splits'].items() for rel_path, _ in entries}
+
+
+def apply_split_manifest(dataset_path, conn):
+    """
+    Set each indexed file's split from the split manifest, where it lists the file
+
+    Flat datasets have no split folders, so split_and_label() finds no split
+    for them; their Train/Validation/Test assignment lives in the manifest.
+    Runs over the whole index (no decoding), so a manifest created or
+    verified after the scan is picked up without rescanning.
+
+    Returns:
+        Number of rows whose split changed
+    """
+    splits = load_manifest_splits(dataset_path)
+    updates = []
+    for path, split in conn.execute("SELECT path, split FROM files").fetchall():
+        new_split = splits.get(path) or split_and_label(path)[0]
+        if new_split != split:
+            updates.append((new_split, path))
+    conn.executemany("UPDATE files SET split = ? WHERE path = ?", updates)
+    conn.commit()
+    return len(updates)
+
+
+def scan_file(task):
+    """
+    Worker: hash and fully decode one file
+
+    Args:
+        task: (absolute path, relative path, size, mtime)
+
+    Returns:
+        Row dict for the index (error is set for unreadable/corrupt files)
+    """
+    path, rel_path, size, mtime = task
+    split, label = split_and_label(rel_path)
+    row = dict.fromkeys(COLUMNS)
+    row.update(path=rel_path, split=split, label=label, size=size, mtime=mtime, scanned_at=time.time())
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        row['sha256'] = hashlib.sha256(data).hexdigest()
+
+        # verify() catches structural damage; load() catches truncated pixel data
+        with Image.open(io.BytesIO(data)) as img:
+            img.verify()
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()
+            row.update(format=img.format, mode=img.mode, width=img.width, height=img.height)
+            row['phash'] = phash(img)
+            row['dhash'] = dhash(img)
+            row['grayscale'] = int(image_colorfulness(img) < GRAYSCALE_THRESHOLD)
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    return row
+
+
+def open_index(index_path):
+    """Open (and create if needed) the SQLite scan index"""
+    conn = sqlite3.connect(index_path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def list_images(dataset_path):
+    """Yield (absolute path, relative path, size, mtime) for every image under dataset_path"""
+    for root, dirs, files in os.walk(dataset_path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                st = os.stat(path)
+                yield path, os.path.relpath(path, dataset_path), st.st_size, st.st_mtime
+
+
+def update_index(dataset_path, conn, workers=None, rescan=False, chunksize=16):
+    """
+    Bring the index up to date with the files on disk
+
+    Returns:
+        (number of files scanned, number of stale rows removed)
+    """
+    known = {path: (size, mtime) for path, size, mtime in conn.execute("SELECT path, size, mtime FROM files")}
+    tasks = []
+    seen = set()
+    for task in list_images(dataset_path):
+        seen.add(task[1])
+        if rescan or known.get(task[1]) != (task[2], task[3]):
+            tasks.append(task)
+
+    stale = [(path,) for path in known if path not in seen]
+    conn.executemany("DELETE FROM files WHERE path = ?", stale)
+
+    print(f"📂 {len(seen)} images on disk | {len(seen) - len(tasks)} unchanged | {len(tasks)} to scan"
+          + (f" | {len(stale)} removed" if stale else ""))
+
+    if tasks:
+        insert = f"INSERT OR REPLACE INTO files ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = pool.map(scan_file, tasks, chunksize=chunksize)
+            batch = []
+            for row in tqdm(rows, total=len(tasks), desc="Scanning", unit="img"):
+                batch.append(tuple(row[c] for c in COLUMNS))
+                if len(batch) >= 500:
+                    conn.executemany(insert, batch)
+                    conn.commit()
+                    batch = []
+            conn.executemany(insert, batch)
+    conn.commit()
+    apply_split_manifest(dataset_path, conn)
+    return len(tasks), len(stale)
+
+
+def duplicate_groups(conn, column):
+    """
+    Groups of files sharing `column` (sha256 or phash)
+
+    Returns:
+        List of lists of {'path', 'split', 'label', 'sha256'} dicts, largest groups first
+    """
+    groups = defaultdict(list)
+    query = f"""SELECT {column}, path, split, label, sha256 FROM files
+                WHERE {column} IN (SELECT {column} FROM files WHERE error IS NULL
+                                   GROUP BY {column} HAVING COUNT(*) > 1)
+                ORDER BY path"""
+    for key, path, split, label, sha in conn.execute(query):
+        groups[key].append({'path': path, 'split': split, 'label': label, 'sha256': sha})
+    if column == 'phash':
+        # Keep only groups with different content; identical files are reported as exact duplicates
+        groups = {k: g for k, g in groups.items() if len({f['sha256'] for f in g}) > 1}
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def build_report(conn):
+    """Collect all findings from the index into a JSON-serialisable dict"""
+    corrupt = [{'path': p, 'error': e} for p, e in
+               conn.execute("SELECT path, error FROM files WHERE error IS NOT NULL ORDER BY path")]
+    grayscale = [p for (p,) in conn.execute("SELECT path FROM files WHERE grayscale = 1 ORDER BY path")]
+    exact = duplicate_groups(conn, 'sha256')
+    near = duplicate_groups(conn, 'phash')
+
+    leakage = [g for g in exact + near if len({f['split'] for f in g}) > 1]
+    conflicts = [g for g in exact + near if len({f['label'] for f in g if f['label']}) > 1]
+
+    splits = defaultdict(lambda: defaultdict(int))
+    for split, label, count in conn.execute("SELECT split, label, COUNT(*) FROM files GROUP BY split, label"):
+        splits[split or '-'][label or '-'] = count
+
+    return {
+        'total': conn.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+        'splits': {s: dict(c) for s, c in splits.items()},
+        'corrupt': corrupt,
+        'grayscale': grayscale,
+        'exact_duplicates': exact,
+        'near_duplicates': near,
+        'split_leakage': leakage,
+        'label_conflicts': conflicts
+    }
+
+
+def print_report(report, max_items=10):
+    def show(items, fmt):
+        for item in items[:max_items]:
+            print(f"     {fmt(item)}")
+        if len(items) > max_items:
+            print(f"     ... and {len(items) - max_items} more")
+
+    def group_fmt(group):
+        return ", ".join(f"{f['path']}" for f in group)
+
+    print("\n" + "="*70)
+    print(f"Images indexed: {report['total']}")
+    for split, labels in sorted(report['splits'].items()):
+        print(f"  {split:<12} " + ", ".join(f"{label}: {n}" for label, n in sorted(labels.items())))
+    print("-"*70)
+
+    checks = [
+        ("Corrupt / unreadable", report['corrupt'], lambda c: f"{c['path']} ({c['error']})"),
+        ("Grayscale", report['grayscale'], str),
+        ("Exact duplicate groups", report['exact_duplicates'], group_fmt),
+        ("Near duplicate groups (same pHash)", report['near_duplicates'], group_fmt),
+        ("Groups leaking across splits", report['split_leakage'], group_fmt),
+        ("Groups with conflicting labels", report['label_conflicts'], group_fmt),
+    ]
+    for title, items, fmt in checks:
+        icon = "✓" if not items else "⚠️ "
+        print(f"{icon} {title}: {len(items)}")
+        show(items, fmt)
+    print("="*70 + "\n")
+
+
+def main(args):
+    dataset_path = os.path.abspath(args.dataset_path)
+    if not os.path.isdir(dataset_path):
+        raise FileNotFoundError(f"Dataset path does not exist: {dataset_path}")
+    index_path = args.index or os.path.join(dataset_path, DEFAULT_INDEX_NAME)
+
+    print("\n" + "="*70)
+    print(" "*20 + "🔍 DATASET INTEGRITY SCAN 🔍")
+    print("="*70)
+    print(f"Dataset: {dataset_path}")
+    print(f"Index:   {index_path}")
+    print(f"Workers: {args.workers or os.cpu_count()}")
+    print("="*70)
+
+    conn = open_index(index_path)
+    start = time.perf_counter()
+    scanned, _ = update_index(dataset_path, conn, workers=args.workers, rescan=args.rescan,
+                              chunksize=args.chunksize)
+    elapsed = time.perf_counter() - start
+    if scanned:
+        print(f"⏱️  Scanned {scanned} images in {elapsed:.1f}s ({scanned / elapsed:.1f} img/s)")
+
+    report = build_report(conn)
+    conn.close()
+    print_report(report, max_items=args.max_items)
+
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"✓ Report saved to: {args.report}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Validate and index a deepfake image dataset')
+    parser.add_argument('--dataset-path', type=str, default='dataset',
+                        help='Dataset root (Train/Validation/Test or flat Real/Fake)')
+    parser.add_argument('--index', type=str, default=None,
+                        help=f'SQLite index file (default: <dataset>/{DEFAULT_INDEX_NAME})')
+    parser.add_argument('--workers', type=int, default=None, help='Decoder processes (default: all cores)')
+    parser.add_argument('--chunksize', type=int, default=16, help='Files handed to a worker at a time')
+    parser.add_argument('--rescan', action='store_true', help='Decode every file again, ignoring the index')
+    parser.add_argument('--report', type=str, default=None, help='Write the full findings as JSON')
+    parser.add_argument('--max-items', type=int, default=10, help='Examples printed per finding')
+
+    main(parser.parse_args())
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Bulk Downloader Check Against a Local Stub Server
+Starts an aiohttp server on 127.0.0.1 that serves distinct images, duplicate
+content, a non-image, a 404, a URL that fails with 500 twice and one that
+answers 503 + Retry-After once, then runs BulkDownloader against it and
+checks the saved / duplicate / rejected / failed / skipped counts, the files
+on disk, the Retry-After pause and the resume from the manifest.
+
+Usage:
+    python -m pytest -q test_bulk_downloader.py
+    python test_bulk_downloader.py
+"""
+
+import os
+import time
+import asyncio
+import tempfile
+
+from aiohttp import web
+
+from bulk_downloader import BulkDownloader, Manifest, MANIFEST_NAME
+
+PNG_MAGIC = b'\x89PNG\r\n\x1a\n'
+RETRY_AFTER = 1
+
+
+def fake_png(n):
+    """Bytes that sniff as a PNG, distinct per n"""
+    return PNG_MAGIC + f"image {n}".encode()
+
+
+class StubServer:
+    """Image endpoints with scripted failures; counts and times every request per path"""
+
+    def __init__(self):
+        self.hits = {}
+        self.hit_times = {}
+        self.runner = None
+        self.base_url = None
+
+    def _count(self, request):
+        path = request.path
+        self.hits[path] = self.hits.get(path, 0) + 1
+        self.hit_times.setdefault(path, []).append(time.monotonic())
+        return self.hits[path]
+
+    async def image(self, request):
+        self._count(request)
+        return web.Response(body=fake_png(request.match_info['n']), content_type='image/png')
+
+    async def duplicate(self, request):
+        # Same content as /img/<n> under another URL
+        self._count(request)
+        return web.Response(body=fake_png(request.match_info['n']), content_type='image/png')
+
+    async def flaky(self, request):
+        if self._count(request) <= 2:
+            return web.Response(status=500)
+        return web.Response(body=fake_png('flaky'), content_type='image/png')
+
+    async def busy(self, request):
+        if self._count(request) == 1:
+            return web.Response(status=503, headers={'Retry-After': str(RETRY_AFTER)})
+        return web.Response(body=fake_png('busy'), content_type='image/png')
+
+    async def text(self, request):
+        self._count(request)
+        return web.Response(text="<html>not an image</html>", content_type='text/html')
+
+    async def missing(self, request):
+        self._count(request)
+        return web.Response(status=404)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/img/{n}', self.image)
+        app.router.add_get('/dup/{n}', self.duplicate)
+        app.router.add_get('/flaky', self.flaky)
+        app.router.add_get('/busy', self.busy)
+        app.router.add_get('/text', self.text)
+        app.router.add_get('/missing', self.missing)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+    def jobs(self, paths):
+        return [(path, self.base_url + path) for path in paths]
+
+
+def make_downloader(output_dir):
+    # Fast backoff and a generous rate so the only real wait is the Retry-After pause
+    return BulkDownloader(output_dir, prefix='test', rate=50, burst=10, concurrency=4, retries=3,
+                          backoff=0.01, timeout=5)
+
+
+async def _download(output_dir, paths):
+    server = StubServer()
+    await server.start()
+    try:
+        stats = await make_downloader(output_dir).run(server.jobs(paths))
+    finally:
+        await server.stop()
+    return stats, server
+
+
+FIRST_RUN = ['/img/1', '/img/2', '/dup/1', '/flaky', '/busy', '/text', '/missing']
+
+
+def test_counts_retries_and_dedup():
+    with tempfile.TemporaryDirectory() as output_dir:
+        stats, server = asyncio.run(_download(output_dir, FIRST_RUN))
+
+        assert stats == {'saved': 4, 'duplicate': 1, 'rejected': 1, 'failed': 1, 'skipped': 0}, stats
+        # Two 500s then success; 404 is not retried
+        assert server.hits['/flaky'] == 3
+        assert server.hits['/missing'] == 1
+        # 503 + Retry-After pauses the host before the retry
+        first, second = server.hit_times['/busy']
+        assert second - first >= RETRY_AFTER * 0.9, second - first
+
+        images = sorted(f for f in os.listdir(output_dir) if f != MANIFEST_NAME)
+        assert len(images) == 4, images
+        assert not [f for f in images if f.endswith('.part')]
+        assert all(f.startswith('test_') and f.endswith('.png') for f in images)
+
+        manifest = Manifest(os.path.join(output_dir, MANIFEST_NAME))
+        manifest.close()
+        assert len(manifest.hashes) == 4
+        assert manifest.done_keys == set(FIRST_RUN) - {'/missing'}
+
+
+def test_resume_skips_finished_jobs():
+    with tempfile.TemporaryDirectory() as output_dir:
+        asyncio.run(_download(output_dir, FIRST_RUN))
+        # Rerun with one new image and one new URL whose content was saved in the first run
+        stats, server = asyncio.run(_download(output_dir, FIRST_RUN + ['/img/3', '/dup/2']))
+
+        assert stats == {'saved': 1, 'duplicate': 1, 'rejected': 0, 'failed': 1, 'skipped': 6}, stats
+        # Finished URLs are not requested again; the failed one is retried
+        assert set(server.hits) == {'/img/3', '/dup/2', '/missing'}, server.hits
+        images = [f for f in os.listdir(output_dir) if f != MANIFEST_NAME]
+        assert len(images) == 5, images
+
+
+if __name__ == "__main__":
+    for check in (test_counts_retries_and_dedup, test_resume_skips_finished_jobs):
+        check()
+        print(f"✅ {check.__name__}")